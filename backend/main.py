@@ -10,7 +10,17 @@ from decouple import config
 # Import database engine and models for reports
 from services.database.connect import engine as report_engine
 import models.report as report_models
-from routers import dashboard, history, homepage
+from routers import dashboard, history, homepage, reports, storage
+from services.database.migrate import upgrade_schema
+from services.database.connect import SessionLocal
+from services.images.phash import photo_hash_index
+from services.helpers.recent_reports import recent_report_index
+from services.helpers.districts import district_resolver
+from services.storage.service import STORAGE_BACKEND, MEDIA_ROOT, MEDIA_URL_PATH, get_storage
+from services.storage.sweeper import run_periodic_sweep
+from services.ai.worker import WORKER_IN_API, run_worker
+from fastapi.staticfiles import StaticFiles
+import asyncio
 # Remove the old photos import
 # from routers import photos  # Import the photos router
 
@@ -29,6 +39,7 @@ except ImportError:
 # Create tables (DEV ONLY). Keep your original report tables + auth tables.
 report_models.Base.metadata.create_all(bind=report_engine)
 Base.metadata.create_all(bind=engine)
+upgrade_schema()  # add columns introduced after the tables were first created
 
 # Initialize FastAPI application
 app = FastAPI(title="Sabah Road Care API", version="0.1.0")
@@ -50,8 +61,46 @@ app.include_router(homepage.router, prefix="/api", tags=["Homepage"])
 app.include_router(dashboard.router, prefix="/api", tags=["dashboard"])
 app.include_router(user_router, prefix="/api", tags=["users"])
 app.include_router(history.router, prefix="/api", tags=["history"])
+app.include_router(reports.router, prefix="/api", tags=["reports"])
 app.include_router(profilepic.router)
 
+# Local storage backend: serve stored photos straight from disk
+if STORAGE_BACKEND == "local":
+    get_storage()  # creates MEDIA_ROOT
+    app.mount(MEDIA_URL_PATH, StaticFiles(directory=MEDIA_ROOT), name="media")
+    app.include_router(storage.router)  # stand-in for signed direct uploads
+
+
+def _warm_indexes():
+    photo_hash_index.load()
+    db = SessionLocal()
+    try:
+        recent_report_index.load_from_db(db)
+    finally:
+        db.close()
+    district_resolver.ensure_loaded()
+
+
+@app.on_event("startup")
+async def warm_indexes():
+    # Build in-memory lookup structures in the background so the first
+    # submissions don't pay for loading them
+    asyncio.get_running_loop().run_in_executor(None, _warm_indexes)
+
+
+@app.on_event("startup")
+async def start_orphan_sweeper():
+    # Periodically delete stored photos no report references (one worker only)
+    app.state.orphan_sweeper = asyncio.create_task(run_periodic_sweep())
+
+
+@app.on_event("startup")
+async def start_analysis_worker():
+    # Analyze submitted reports in the background; more workers can run
+    # separately with python -m services.ai.worker
+    if WORKER_IN_API:
+        app.state.analysis_worker = asyncio.create_task(run_worker())
+
 
 # Authentication endpoint to get access token
 @app.post("/auth/token", response_model=schemas.Token, tags=["auth"])
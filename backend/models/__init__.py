@@ -1,3 +1,8 @@
 from models.users import Base
 from models.users import User
-from .report import PotholeReport
\ No newline at end of file
+from .report import PotholeReport
+from .upload import PendingSubmission
+from .sequence import CaseIdSequence
+from .idempotency import IdempotencyKey
+from .incident import PotholeIncident, IncidentReporter
+from .analysis_job import AnalysisJob
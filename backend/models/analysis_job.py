@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from services.database.connect import Base
+
+
+class AnalysisJob(Base):
+    """
+    Pending AI analysis of a report. Enqueued in the same transaction as the
+    report and claimed by workers with FOR UPDATE SKIP LOCKED
+    (see services/ai/jobs.py), so the submit request never waits for the model.
+    """
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    case_id = Column(String, ForeignKey("pothole_reports.case_id", ondelete="CASCADE"), nullable=False, unique=True)
+
+    status = Column(String(16), nullable=False, default="queued")  # queued / running / done / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # retry backoff
+    locked_by = Column(String(64), nullable=True)
+    locked_at = Column(DateTime(timezone=True), nullable=True)  # lease start; stale leases are reclaimed
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Claim query: next due queued jobs
+        Index("ix_analysis_jobs_status_run_after", "status", "run_after"),
+    )
+
+    def __repr__(self):
+        return f"<AnalysisJob(case_id='{self.case_id}', status='{self.status}', attempts={self.attempts})>"
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy.sql import func
+from services.database.connect import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Outcome of a request sent with an Idempotency-Key header, per user.
+    Replays of a completed request get the stored response back.
+    """
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of endpoint + request fields
+
+    status = Column(String(16), nullable=False, default="in_progress")  # in_progress / completed
+    status_code = Column(Integer, nullable=True)
+    response = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(user_id={self.user_id}, key='{self.key}', status='{self.status}')>"
@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Float, ForeignKey
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from services.database.connect import Base
+
+
+class PotholeIncident(Base):
+    """
+    A cluster of reports of the same pothole (reports within the cluster
+    radius of its centroid). Aggregates are kept up to date on every insert
+    by services/helpers/incidents.py, so readers never re-scan reports.
+    """
+    __tablename__ = "pothole_incidents"
+
+    id = Column(Integer, primary_key=True, index=True)
+    district = Column(String, nullable=False, index=True)
+
+    # Centroid of the member reports
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    grid_cell = Column(BigInteger, nullable=False, index=True)  # dup_utils.grid_cell of the centroid
+
+    # Live aggregates
+    report_count = Column(Integer, nullable=False, default=0)
+    unique_user_count = Column(Integer, nullable=False, default=0)
+    community_multiplier = Column(Float, nullable=False, default=1.0)
+    first_seen = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_seen = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    # Relationships
+    reports = relationship("PotholeReport", back_populates="incident", passive_deletes=True)
+
+    def __repr__(self):
+        return f"<PotholeIncident(id={self.id}, report_count={self.report_count}, unique_user_count={self.unique_user_count})>"
+
+
+class IncidentReporter(Base):
+    """Distinct users who reported an incident (backs unique_user_count)"""
+    __tablename__ = "incident_reporters"
+
+    incident_id = Column(Integer, ForeignKey("pothole_incidents.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Float, ForeignKey, JSON, Boolean, Index, event
 from sqlalchemy.sql import func
 from services.database.connect import Base
+from services.helpers.dup_utils import grid_cell
 from sqlalchemy.orm import relationship
 
 class PotholeReport(Base):
@@ -16,11 +17,12 @@ class PotholeReport(Base):
     district = Column(String, nullable=False, index=True)  # Added index for performance
     latitude = Column(Float, nullable=False, index=True)   # Added index for location queries
     longitude = Column(Float, nullable=False, index=True)  # Added index for location queries
+    grid_cell = Column(BigInteger, nullable=True)          # dup_utils.grid_cell(lat, lon), set on insert/update
     description = Column(Text, nullable=True)
 
     # Timestamps
     date_created = Column(DateTime(timezone=True), server_default=func.now())
-    last_date_status_update = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    last_date_status_update = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
 
     # Status and Classification
     severity = Column(String, nullable=False, default="Analyzing")  # Low/Medium/High from AI
@@ -40,6 +42,7 @@ class PotholeReport(Base):
     similar_reports_count = Column(Integer, default=0)     # Number of reports in same area
     unique_users_count = Column(Integer, default=0)        # Number of unique users reporting
     community_multiplier = Column(Float, default=1.0)      # Calculated multiplier
+    incident_id = Column(Integer, ForeignKey("pothole_incidents.id", ondelete="SET NULL"), nullable=True, index=True)
 
     # AI Analysis Details (store full analysis)
     ai_analysis_details = Column(JSON, nullable=True)
@@ -48,9 +51,25 @@ class PotholeReport(Base):
     photo_top = Column(Text, nullable=False)    # Cloudinary URL
     photo_far = Column(Text, nullable=False)    # Cloudinary URL
     photo_close = Column(Text, nullable=False)  # Cloudinary URL
+    photo_metadata = Column(JSON, nullable=True)  # {top|far|close: {gps, taken_at, width, height, bytes}}
+    photo_variants = Column(JSON, nullable=True)  # {top|far|close: {thumb, card, full}} URLs generated at upload
+
+    # Perceptual hashes (64-bit dHash stored as signed BIGINT) for near-duplicate photo detection
+    phash_top = Column(BigInteger, nullable=True)
+    phash_far = Column(BigInteger, nullable=True)
+    phash_close = Column(BigInteger, nullable=True)
+    phash_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)  # when the hashes were written (index refresh watermark)
 
     # Relationships
     user = relationship("User", back_populates="reports")
+    incident = relationship("PotholeIncident", back_populates="reports")
+
+    __table_args__ = (
+        # Proximity queries: a handful of neighboring cells, each a range scan by date
+        Index("ix_pothole_reports_grid_cell_date_created", "grid_cell", "date_created"),
+        # A user's recent reports (72-hour duplicate block)
+        Index("ix_pothole_reports_user_id_date_created", "user_id", "date_created"),
+    )
 
     def __repr__(self):
         return f"<PotholeReport(case_id='{self.case_id}', severity='{self.severity}', priority='{self.priority}')>"
@@ -76,6 +95,31 @@ class PotholeReport(Base):
             "close": self.photo_close
         }
 
+    @property
+    def photo_variants_dict(self):
+        """Helper property to get thumb/card/full URLs of every photo (derived for older reports)"""
+        from services.storage.service import StorageService
+
+        stored = self.photo_variants or {}
+        return {
+            image_type: stored.get(image_type) or (StorageService.derived_variants(url) if url else None)
+            for image_type, url in self.photos_dict.items()
+        }
+
+    @property
+    def thumbnail_url(self):
+        """Thumbnail of the top-view photo, for lists"""
+        return (self.photo_variants_dict.get("top") or {}).get("thumb")
+
+    @property
+    def photo_hashes_dict(self):
+        """Helper property to get the perceptual hash of each photo"""
+        return {
+            "top": self.phash_top,
+            "far": self.phash_far,
+            "close": self.phash_close
+        }
+
     @property
     def ai_measurements_dict(self):
         """Helper property to get AI measurements"""
@@ -92,4 +136,12 @@ class PotholeReport(Base):
             "similar_reports": self.similar_reports_count,
             "unique_users": self.unique_users_count,
             "multiplier": self.community_multiplier
-        }
\ No newline at end of file
+        }
+
+
+@event.listens_for(PotholeReport, "before_insert")
+@event.listens_for(PotholeReport, "before_update")
+def _set_grid_cell(mapper, connection, report):
+    """Keep grid_cell in sync with the coordinates"""
+    if report.latitude is not None and report.longitude is not None:
+        report.grid_cell = grid_cell(report.latitude, report.longitude)
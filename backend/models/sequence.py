@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String
+from services.database.connect import Base
+
+
+class CaseIdSequence(Base):
+    """
+    Last case ID sequence number handed out per district code and month.
+    Rows are created on the first report of a month (see services/helpers/gencaseid.py).
+    """
+    __tablename__ = "case_id_sequences"
+
+    district_code = Column(String(3), primary_key=True)  # e.g. KKI
+    period = Column(String(7), primary_key=True)          # YYYY_MM
+    last_value = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CaseIdSequence(district_code='{self.district_code}', period='{self.period}', last_value={self.last_value})>"
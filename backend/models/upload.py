@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy.sql import func
+from services.database.connect import Base
+
+
+class PendingSubmission(Base):
+    """
+    A report whose photos are being uploaded straight to storage.
+    Created when upload tickets are issued; finalized into a PotholeReport.
+    """
+    __tablename__ = "pending_submissions"
+
+    id = Column(String(36), primary_key=True)  # uuid4
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    keys = Column(JSON, nullable=False)  # {top|far|close: storage key}
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    # Set once finalized, in the same commit as the report (no FK, so flush order doesn't matter)
+    case_id = Column(String, nullable=True)
+
+    def __repr__(self):
+        return f"<PendingSubmission(id='{self.id}', user_id={self.user_id}, case_id='{self.case_id}')>"
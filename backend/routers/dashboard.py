@@ -4,6 +4,10 @@ from sqlalchemy import func
 from typing import Optional
 import models
 from services.database.connect import get_db
+from services.ai.jobs import AnalysisQueue
+from services.ai.scheduler import model_scheduler
+from services.ai.pothole_analyzer import pothole_analyzer
+from services.ai.classical import cascade_stats
 import logging
 
 # Set up logging
@@ -128,6 +132,57 @@ def export_dashboard(
     # For PDF format, you'd need to implement PDF generation
     return {"message": "PDF export not implemented yet"}
 
+@router.get("/dashboard/incidents")
+def get_incidents(
+    district: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """Most reported potholes, from the live incident cluster aggregates."""
+    query = db.query(models.PotholeIncident)
+    if district:
+        query = query.filter(models.PotholeIncident.district == district)
+
+    incidents = (
+        query.order_by(models.PotholeIncident.report_count.desc(), models.PotholeIncident.last_seen.desc())
+        .limit(limit)
+        .all()
+    )
+    # Thumbnail of each incident's latest report, in one query
+    latest_reports = (
+        db.query(models.PotholeReport)
+        .filter(models.PotholeReport.incident_id.in_([incident.id for incident in incidents]))
+        .distinct(models.PotholeReport.incident_id)
+        .order_by(models.PotholeReport.incident_id, models.PotholeReport.date_created.desc())
+        .all()
+    ) if incidents else []
+    thumbnails = {report.incident_id: report.thumbnail_url for report in latest_reports}
+    return [
+        {
+            "incident_id": incident.id,
+            "district": incident.district,
+            "latitude": incident.latitude,
+            "longitude": incident.longitude,
+            "report_count": incident.report_count,
+            "unique_users": incident.unique_user_count,
+            "community_multiplier": incident.community_multiplier,
+            "first_seen": incident.first_seen,
+            "last_seen": incident.last_seen,
+            "thumbnail_url": thumbnails.get(incident.id),
+        }
+        for incident in incidents
+    ]
+
+@router.get("/dashboard/analysis-queue")
+def get_analysis_queue(db: Session = Depends(get_db)):
+    """Depth and age of the AI analysis queue, and recent submit-to-analysis latency."""
+    metrics = AnalysisQueue.metrics(db)
+    metrics["model_scheduler"] = model_scheduler.stats()  # this API process only
+    metrics["batching"] = pothole_analyzer.batcher.stats()
+    metrics["cascade"] = dict(cascade_stats)  # analyses settled locally vs sent to the model
+    logger.info(f"Analysis queue: {metrics}")
+    return metrics
+
 def get_color(severity):
     """Get color for severity level."""
     colors = {
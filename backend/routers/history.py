@@ -39,4 +39,11 @@ def get_user_reports(
         query = query.filter(models.PotholeReport.severity == severity)
 
     reports = query.order_by(models.PotholeReport.date_created.desc()).all()
-    return reports
+    # Every column as before, plus the list thumbnail
+    return [
+        {
+            **{attr.key: getattr(report, attr.key) for attr in report.__mapper__.column_attrs},
+            "thumbnail_url": report.thumbnail_url,
+        }
+        for report in reports
+    ]
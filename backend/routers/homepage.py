@@ -1,19 +1,33 @@
-from fastapi import APIRouter, Depends, Form, File, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, Form, File, UploadFile, HTTPException, Header
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import Dict, Optional
 from models import PotholeReport
+import asyncio
 import models
 from services.database.connect import get_db
-from services.cloudinary.service import CloudinaryService
+from services.storage.service import StorageService
+from services.storage.direct_upload import DirectUploadService
 from services.helpers.gencaseid import gen_case_id
+from services.helpers.districts import resolve_district
 from services.helpers.duplication import DuplicationService  # 🆕 Import duplication service
+from services.helpers.idempotency import IdempotencyService, request_fingerprint
+from services.helpers.recent_reports import recent_report_index
+from services.helpers.incidents import IncidentService
+from services.helpers.duplicate_cache import duplicate_check_cache
+from services.ai.jobs import AnalysisQueue
+from services.ai.pothole_analyzer import pothole_analyzer
+from services.images.ingest import ingest_image
+from services.images.preprocess import ProcessedImage, preprocess_image
+from services.images.phash import photo_hash_index, to_signed
 from services.auth.security import get_current_user
+from schemas.report import BatchDuplicateCheckRequest
 
 router = APIRouter()
 
 @router.post("/report")
 async def submit_report(
-    district: str = Form(...),
+    district: Optional[str] = Form(None),  # ignored when boundaries are loaded
     latitude: float = Form(...),
     longitude: float = Form(...),
     address: str = Form(...),
@@ -21,17 +35,133 @@ async def submit_report(
     photo_top: UploadFile = File(...),
     photo_far: UploadFile = File(...),
     photo_close: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
+    async def submit():
+        return await _submit_report(
+            district, latitude, longitude, address, remarks,
+            photo_top, photo_far, photo_close, db, current_user
+        )
+
+    if idempotency_key is None:
+        return await submit()
+    # 🔁 Retries with the same key get the original response, without redoing any work
+    fingerprint = request_fingerprint(
+        "report", district=district, latitude=latitude, longitude=longitude, address=address, remarks=remarks,
+        photos=[(p.filename, p.size) for p in (photo_top, photo_far, photo_close)]
+    )
+    return await IdempotencyService.run(db, current_user.id, idempotency_key, fingerprint, submit)
+
+
+async def _submit_report(
+    district: str,
+    latitude: float,
+    longitude: float,
+    address: str,
+    remarks: str,
+    photo_top: UploadFile,
+    photo_far: UploadFile,
+    photo_close: UploadFile,
+    db: Session,
+    current_user: models.User,
+):
+    # Stream photos into size-bounded buffers (rejects bad type/size early)
+    photos = {}
+    try:
+        for file, label in [
+            (photo_top, "top"),
+            (photo_far, "far"),
+            (photo_close, "close"),
+        ]:
+            photos[label] = await ingest_image(file)
+
+        # Downscale, strip EXIF and build thumb/card variants in the process pool
+        processed = await asyncio.gather(*(preprocess_image(photo) for photo in photos.values()))
+    finally:
+        for photo in photos.values():
+            photo.close()
+
+    return await _process_report(
+        district=district,
+        latitude=latitude,
+        longitude=longitude,
+        address=address,
+        remarks=remarks,
+        photos=dict(zip(photos.keys(), processed)),
+        db=db,
+        current_user=current_user,
+    )
+
+
+async def _process_report(
+    district: str,
+    latitude: float,
+    longitude: float,
+    address: str,
+    remarks: str,
+    photos: Dict[str, ProcessedImage],
+    db: Session,
+    current_user: models.User,
+):
+    photo_hashes = {label: photo.dhash for label, photo in photos.items()}
+
     # 🔍 DUPLICATE DETECTION - Check before processing
+    duplicate_analysis = _check_duplicates_or_raise(db, current_user, latitude, longitude, photo_hashes)
+
+    # District comes from the coordinates, not the client
+    district = resolve_district(latitude, longitude, district)
+
+    # Generate case ID
+    case_id = gen_case_id(district, db)
+
+    # ⚡ Provisional severity from local image features (milliseconds); the
+    # queued AI analysis replaces it, or confirms it without a model call
+    provisional = await pothole_analyzer.preanalyze(
+        photos["top"].variants["card"], photos["far"].variants["card"], photos["close"].variants["card"]
+    )
+
+    # Upload images to storage (all three in parallel, skipped if already stored)
+    # A failed upload cancels the others and removes anything already uploaded
+    upload_result = await StorageService.upload_pothole_images(images=photos)
+    if not upload_result["success"]:
+        raise HTTPException(status_code=500, detail=f"Failed to upload {upload_result['failed_type']} image")
+    uploaded = {label: result["secure_url"] for label, result in upload_result["images"].items()}
+    photo_metadata = {
+        label: {
+            **photos[label].metadata,
+            "width": photos[label].width,
+            "height": photos[label].height,
+            "bytes": len(photos[label].content),
+        }
+        for label, result in upload_result["images"].items()
+    }
+    photo_variants = {label: result["variants"] for label, result in upload_result["images"].items()}
+
+    report = _save_report(
+        db, current_user, case_id, district, latitude, longitude, address, remarks,
+        uploaded, duplicate_analysis, photo_metadata=photo_metadata, photo_hashes=photo_hashes,
+        photo_variants=photo_variants, provisional=provisional
+    )
+    return _report_response(case_id, duplicate_analysis, report, provisional)
+
+
+def _check_duplicates_or_raise(
+    db: Session,
+    current_user: models.User,
+    latitude: float,
+    longitude: float,
+    photo_hashes: Optional[Dict[str, int]] = None,
+) -> Dict:
     duplicate_analysis = DuplicationService.check_duplicate_submission(
         db=db,
         user_id=current_user.id,
         latitude=latitude,
         longitude=longitude,
         radius_meters=100,
-        base_severity="Low"
+        base_severity="Low",
+        photo_hashes=photo_hashes
     )
     
     # 🚫 BLOCKING: Prevent user duplicate submissions
@@ -48,36 +178,27 @@ async def submit_report(
                 "duplicate_details": user_duplicate
             }
         )
-    
-    # Generate case ID
-    case_id = gen_case_id(district, db)
+    return duplicate_analysis
 
-    # Upload images to Cloudinary
-    uploaded = {}
-    try:
-        for file, label in [
-            (photo_top, "top"),
-            (photo_far, "far"),
-            (photo_close, "close"),
-        ]:
-            file_content = await file.read()
-            upload_result = await CloudinaryService.upload_pothole_image(
-                file_content=file_content,
-                filename=file.filename,
-                image_type=label,
-                case_id=case_id
-            )
-            if not upload_result["success"]:
-                raise HTTPException(status_code=500, detail=f"Failed to upload {label} image")
-            uploaded[label] = upload_result["secure_url"]
-    except Exception as e:
-        # cleanup in case some uploaded
-        for url in uploaded.values():
-            public_id = url.split("/")[-1].split(".")[0]
-            await CloudinaryService.delete_image(public_id)
-        raise e
-
-    # Save report in DB with calculated priority and severity from duplication analysis
+
+def _save_report(
+    db: Session,
+    current_user: models.User,
+    case_id: str,
+    district: str,
+    latitude: float,
+    longitude: float,
+    address: str,
+    remarks: str,
+    uploaded: Dict[str, str],
+    duplicate_analysis: Dict,
+    photo_metadata: Optional[Dict] = None,
+    photo_hashes: Optional[Dict[str, int]] = None,
+    photo_variants: Optional[Dict[str, Dict[str, str]]] = None,
+    provisional: Optional[Dict] = None,
+) -> models.PotholeReport:
+    """Save report in DB with calculated priority and severity from duplication analysis"""
+    photo_hashes = photo_hashes or {}
     report = models.PotholeReport(
         case_id=case_id,
         district=district,
@@ -90,16 +211,38 @@ async def submit_report(
         photo_top=uploaded["top"],
         photo_far=uploaded["far"],
         photo_close=uploaded["close"],
+        photo_metadata=photo_metadata,
+        photo_variants=photo_variants or {label: StorageService.derived_variants(url) for label, url in uploaded.items()},
+        phash_top=to_signed(photo_hashes["top"]) if "top" in photo_hashes else None,
+        phash_far=to_signed(photo_hashes["far"]) if "far" in photo_hashes else None,
+        phash_close=to_signed(photo_hashes["close"]) if "close" in photo_hashes else None,
         status="Submitted",
         severity=duplicate_analysis['calculated_severity'],  # 📊 Use calculated severity
         priority=duplicate_analysis['calculated_priority'],  # 📊 Use calculated priority
         similar_reports_count=duplicate_analysis['similar_count'],  # 📊 Store similar count
+        ai_analysis_details={"provisional": provisional} if provisional else None,
         date_created=datetime.utcnow(),
     )
     db.add(report)
+    db.flush()
+    # Join (or open) the pothole's incident cluster, in the same transaction
+    IncidentService.add_report(db, report)
+    # 🤖 AI analysis runs in the background worker (services/ai/worker.py)
+    AnalysisQueue.enqueue(db, case_id)
     db.commit()
     db.refresh(report)
+    recent_report_index.add_report(report)
+    if photo_hashes:
+        photo_hash_index.add_report(case_id, photo_hashes)
+    return report
 
+
+def _report_response(
+    case_id: str,
+    duplicate_analysis: Dict,
+    report: Optional[models.PotholeReport] = None,
+    provisional: Optional[Dict] = None,
+) -> Dict:
     # 🎉 Enhanced response with duplication info
     response_message = "Report submitted successfully!"
     if duplicate_analysis['similar_count'] > 0:
@@ -116,11 +259,101 @@ async def submit_report(
         "duplicate_metadata": {
             "location_hash": duplicate_analysis['location_hash'],
             "similar_count": duplicate_analysis['similar_count'],
-            "severity_multiplier": duplicate_analysis['severity_multiplier']
-        }
+            "severity_multiplier": duplicate_analysis['severity_multiplier'],
+            "photo_matches": duplicate_analysis['photo_matches'][:5],
+            "matched_case_ids": duplicate_analysis['matched_case_ids']
+        },
+        "incident": IncidentService.summary(report.incident) if report is not None else None,
+        "ai_analysis": "queued",  # severity/priority above are provisional until it completes
+        "provisional_analysis": {
+            "severity": provisional["severity"],
+            "confidence": provisional["confidence"],
+            "depth_cm": provisional["measurements"]["depth_cm"],
+        } if provisional else None
     }
 
 
+# 🆕 Two-phase submission: photos go straight to storage, not through the API
+@router.post("/report/uploads")
+def request_upload_tickets(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Step 1: get short-lived signed upload tickets for the top/far/close photos.
+    Upload each photo with its ticket, then call /report/finalize.
+    """
+    return DirectUploadService.create_pending_submission(db, current_user.id)
+
+
+@router.post("/report/uploads/{pending_id}/tickets")
+def renew_upload_tickets(
+    pending_id: str,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    New upload tickets for an unfinished submission, once the previous ones
+    expired. Photos already uploaded are kept; partial uploads resume.
+    """
+    return DirectUploadService.renew_upload_tickets(db, current_user.id, pending_id)
+
+
+@router.post("/report/finalize")
+async def finalize_report(
+    pending_id: str = Form(...),
+    district: Optional[str] = Form(None),  # ignored when boundaries are loaded
+    latitude: float = Form(...),
+    longitude: float = Form(...),
+    address: str = Form(...),
+    remarks: str = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Step 2: create the report once all three photos are in storage.
+    Directly uploaded photos skip server-side preprocessing; their perceptual
+    hashes are filled in later by services.db.backfill_photo_hashes.
+    """
+    async def finalize():
+        return await _finalize_report(pending_id, district, latitude, longitude, address, remarks, db, current_user)
+
+    if idempotency_key is None:
+        return await finalize()
+    fingerprint = request_fingerprint(
+        "report/finalize", pending_id=pending_id, district=district, latitude=latitude,
+        longitude=longitude, address=address, remarks=remarks
+    )
+    return await IdempotencyService.run(db, current_user.id, idempotency_key, fingerprint, finalize)
+
+
+async def _finalize_report(
+    pending_id: str,
+    district: str,
+    latitude: float,
+    longitude: float,
+    address: str,
+    remarks: str,
+    db: Session,
+    current_user: models.User,
+):
+    pending = DirectUploadService.get_open_submission(db, current_user.id, pending_id)
+    uploaded = await DirectUploadService.verify_uploads(pending)
+
+    duplicate_analysis = _check_duplicates_or_raise(db, current_user, latitude, longitude)
+    district = resolve_district(latitude, longitude, district)
+    case_id = gen_case_id(district, db)
+
+    # Commits the pending row (locked above) together with the report
+    pending.case_id = case_id
+    report = _save_report(
+        db, current_user, case_id, district, latitude, longitude, address, remarks,
+        uploaded, duplicate_analysis
+    )
+    return _report_response(case_id, duplicate_analysis, report)
+
+
 @router.get("/recent-submissions")
 def get_recent_submissions(
     db: Session = Depends(get_db),
@@ -143,6 +376,7 @@ def get_recent_submissions(
             "status": report.status,
             "priority": getattr(report, 'priority', 'Medium'),  
             "severity": getattr(report, 'severity', 'Low'),     
+            "thumbnail_url": report.thumbnail_url,
         }
         for report in reports
     ]
@@ -159,17 +393,24 @@ def check_duplicates_preview(
     """
     Optional endpoint to check duplicates before submission
     Frontend can call this to show warnings/info to users
+    Served from a short-lived cache while the user drags the map pin
     """
+    radius_meters = 100
+    cache_key = duplicate_check_cache.key(current_user.id, latitude, longitude, radius_meters)
+    cached = duplicate_check_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     duplicate_analysis = DuplicationService.check_duplicate_submission(
         db=db,
         user_id=current_user.id,
         latitude=latitude,
         longitude=longitude,
-        radius_meters=100,
+        radius_meters=radius_meters,
         base_severity="Low"
     )
     
-    return {
+    preview = {
         "can_submit": duplicate_analysis['can_submit'],
         "is_blocked": duplicate_analysis['is_blocked'],
         "user_duplicates_count": len(duplicate_analysis['user_duplicates']),
@@ -181,3 +422,37 @@ def check_duplicates_preview(
         "user_duplicates": duplicate_analysis['user_duplicates'][:3],  
         "similar_reports": duplicate_analysis['similar_reports'][:5],  
     }
+    duplicate_check_cache.put(cache_key, latitude, longitude, preview)
+    return preview
+
+
+@router.post("/check-duplicates/batch")
+def check_duplicates_batch(
+    request: BatchDuplicateCheckRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Check many GPS points (survey crews, district imports) against existing
+    reports in one call. Results come back in the order of the points.
+    """
+    results = DuplicationService.check_duplicate_points(
+        db=db,
+        points=[(point.latitude, point.longitude) for point in request.points],
+        radius_meters=request.radius_meters,
+        days_back=request.days_back
+    )
+    return {
+        "radius_meters": request.radius_meters,
+        "days_back": request.days_back,
+        "results": [
+            {"ref": point.ref, "latitude": point.latitude, "longitude": point.longitude, **result}
+            for point, result in zip(request.points, results)
+        ]
+    }
+
+
+@router.get("/check-duplicates/cache-stats")
+def duplicate_cache_stats(current_user: models.User = Depends(get_current_user)):
+    """Hit/miss counters of the /check-duplicates preview cache (this worker)"""
+    return duplicate_check_cache.stats()
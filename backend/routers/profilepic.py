@@ -3,7 +3,9 @@ from sqlalchemy.orm import Session
 from services.database.connect import get_db
 from models import users as models
 from services.auth.security import get_current_user  # Import the get_current_user dependency
-from services.cloudinary.service import CloudinaryService
+from services.storage.service import StorageService
+from services.images.ingest import MAX_PROFILE_PICTURE_SIZE, PROFILE_PICTURE_KINDS, ingest_image
+from services.images.preprocess import preprocess_profile_image
 
 router = APIRouter(
     prefix="/profile",
@@ -11,8 +13,17 @@ router = APIRouter(
 )
 
 # Config
-MAX_FILE_SIZE = 5 * 1024 * 1024  # 5 MB
-ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "webp"}
+MAX_FILE_SIZE = MAX_PROFILE_PICTURE_SIZE  # 5 MB
+
+async def _delete_unshared_picture(url: str, user_id: int, db: Session):
+    """Identical pictures share one stored object; only delete it when no other user points at it"""
+    shared = (
+        db.query(models.User.id)
+        .filter(models.User.profile_picture == url, models.User.id != user_id)
+        .first()
+    )
+    if not shared:
+        await StorageService.delete_by_url(url)
 
 @router.get("/me")
 async def get_my_profile(current_user: models.User = Depends(get_current_user)):
@@ -34,32 +45,16 @@ async def upload_profile_picture(
     current_user: models.User = Depends(get_current_user)
 ):
     """ Upload or replace the current user's profile picture """
-    # Validate extension
-    file_extension = file.filename.split(".")[-1].lower()
-    if file_extension not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
-        )
-
-    # Validate size
-    file_content = await file.read()
-    if len(file_content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Max: {MAX_FILE_SIZE // (1024*1024)}MB"
-        )
+    # Validate type (magic bytes) and size while streaming the upload
+    picture = await ingest_image(file, max_size=MAX_FILE_SIZE, allowed_kinds=PROFILE_PICTURE_KINDS)
+    try:
+        # Resize, strip EXIF and re-encode in the process pool
+        processed = await preprocess_profile_image(picture)
+    finally:
+        picture.close()
 
-    # Delete old picture if exists
-    if current_user.profile_picture:
-        public_id = current_user.profile_picture.split("/")[-1].split(".")[0]
-        await CloudinaryService.delete_image(public_id)
-
-    # Upload new picture
-    upload_result = await CloudinaryService.upload_profile_image(
-        file_content=file_content,
-        filename=file.filename
-    )
+    # Upload new picture (content-addressed, so re-uploading the same picture is free)
+    upload_result = await StorageService.upload_profile_image(image=processed)
 
     if not upload_result["success"]:
         raise HTTPException(
@@ -67,6 +62,11 @@ async def upload_profile_picture(
             detail=f"Failed to upload profile picture: {upload_result.get('error')}"
         )
 
+    # Delete old picture (and its variants) if nobody uses it any more
+    old_picture = current_user.profile_picture
+    if old_picture and old_picture != upload_result["secure_url"]:
+        await _delete_unshared_picture(old_picture, current_user.id, db)
+
     # Save new URL in DB
     current_user.profile_picture = upload_result["secure_url"]
     db.commit()
@@ -83,8 +83,7 @@ async def delete_profile_picture(
     if not current_user.profile_picture:
         raise HTTPException(status_code=404, detail="No profile picture found.")
 
-    public_id = current_user.profile_picture.split("/")[-1].split(".")[0]
-    await CloudinaryService.delete_image(public_id)
+    await _delete_unshared_picture(current_user.profile_picture, current_user.id, db)
 
     # Remove from DB
     current_user.profile_picture = None
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+import models
+from services.database.connect import get_db
+from services.auth.security import get_current_user
+from services.helpers.nearby import NearbyService, MAX_RESULTS, MAX_SEARCH_RADIUS_METERS
+
+router = APIRouter()
+
+
+@router.get("/reports/nearby")
+def get_nearby_reports(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the point"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitude of the point"),
+    limit: int = Query(20, ge=1, le=MAX_RESULTS, description="Number of reports (k)"),
+    radius: Optional[float] = Query(None, gt=0, le=MAX_SEARCH_RADIUS_METERS, description="Max distance in meters"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    severity: Optional[str] = Query(None, description="Filter by severity"),
+    since_days: Optional[int] = Query(None, ge=1, description="Only reports from the last N days"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """The reports closest to a point, nearest first, paginated by distance."""
+    return NearbyService.nearest(
+        db,
+        latitude=lat,
+        longitude=lng,
+        limit=limit,
+        max_distance=radius,
+        status=status,
+        severity=severity,
+        since_days=since_days,
+        cursor=cursor,
+    )
@@ -0,0 +1,87 @@
+import asyncio
+import re
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from services.images.ingest import REPORT_PHOTO_KINDS, SIGNATURE_LENGTH, detect_image_kind
+from services.storage.service import UPLOAD_URL_PATH, get_storage
+
+# Local stand-in for direct-to-storage uploads (only mounted with STORAGE_BACKEND=local).
+# Resumable: clients PUT chunks with Content-Range and can HEAD to find the offset
+# to resume from after a dropped connection.
+router = APIRouter(prefix=UPLOAD_URL_PATH, tags=["storage"])
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+def _claims(token: str) -> dict:
+    try:
+        return get_storage().verify_upload_token(token)
+    except ValueError:
+        raise HTTPException(status_code=403, detail="Invalid or expired upload ticket")
+
+
+@router.head("/{token}")
+async def upload_status(token: str):
+    """How many bytes of this upload the server already has"""
+    storage = get_storage()
+    key = _claims(token)["key"]
+    if await storage.exists(key):
+        size = (await storage.stat(key))["bytes"]
+        return Response(headers={"Upload-Offset": str(size), "Upload-Complete": "1"})
+    return Response(headers={"Upload-Offset": str(storage.uploaded_offset(key)), "Upload-Complete": "0"})
+
+
+@router.put("/{token}")
+async def upload_chunk(token: str, request: Request):
+    """Upload a whole photo, or one chunk of it when Content-Range is given"""
+    storage = get_storage()
+    claims = _claims(token)
+    key, max_bytes = claims["key"], claims["max_bytes"]
+
+    if await storage.exists(key):
+        raise HTTPException(status_code=409, detail="Photo already uploaded")
+
+    content_range = request.headers.get("content-range")
+    if content_range:
+        match = _CONTENT_RANGE.fullmatch(content_range.strip())
+        if not match:
+            raise HTTPException(status_code=400, detail="Malformed Content-Range")
+        start, end, total = (int(g) for g in match.groups())
+        if end < start or end >= total:
+            raise HTTPException(status_code=416, detail="Content-Range out of bounds")
+    else:
+        start, end, total = 0, None, None
+
+    if total is not None and total > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Photo too large. Max: {max_bytes // (1024 * 1024)}MB")
+
+    if content_range is None:
+        # Single-request upload: start over, discarding any earlier partial upload
+        await asyncio.to_thread(storage.discard_partial, key)
+    else:
+        offset = storage.uploaded_offset(key)
+        if start != offset:
+            # Client must resume exactly where the server left off
+            return Response(status_code=409, headers={"Upload-Offset": str(offset)})
+
+    position = start
+    async for chunk in request.stream():
+        if not chunk:
+            continue
+        if position == 0 and detect_image_kind(chunk[:SIGNATURE_LENGTH]) not in REPORT_PHOTO_KINDS:
+            raise HTTPException(status_code=400, detail="Invalid file type")
+        if position + len(chunk) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Photo too large. Max: {max_bytes // (1024 * 1024)}MB")
+        if end is not None and position + len(chunk) > end + 1:
+            # Nothing past the declared range is written
+            raise HTTPException(status_code=400, detail="Chunk longer than its Content-Range")
+        position = await asyncio.to_thread(storage.write_chunk, key, position, chunk)
+
+    if end is not None and position != end + 1:
+        raise HTTPException(status_code=400, detail="Chunk shorter than its Content-Range")
+
+    if total is None or position == total:
+        await asyncio.to_thread(storage.complete_upload, key)
+        return {"key": key, "bytes": position, "complete": True}
+
+    return Response(status_code=202, headers={"Upload-Offset": str(position)})
@@ -1,2 +1,2 @@
 from .user import UserOut, UserCreate, UserUpdate, Token, UserBase, TokenPayload
-from .report import CaseBase, CaseCreate, CaseResponse
+from .report import CaseBase, CaseCreate, CaseResponse, DuplicateCheckPoint, BatchDuplicateCheckRequest
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, Dict
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, Dict, List
 from datetime import datetime
 
 # ---- Shared base schema ----
@@ -29,3 +29,14 @@ class CaseResponse(CaseBase):
 
     class Config:
         from_attributes = True
+
+# ---- Batch duplicate check ----
+class DuplicateCheckPoint(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    ref: Optional[str] = None  # caller's own identifier, echoed back
+
+class BatchDuplicateCheckRequest(BaseModel):
+    points: List[DuplicateCheckPoint] = Field(..., min_length=1, max_length=5000)
+    radius_meters: int = Field(100, ge=1, le=1000)
+    days_back: int = Field(30, ge=1, le=3650)
@@ -0,0 +1,96 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from decouple import config
+
+from services.ai.scheduler import AnalysisDeferred
+
+# Cases per model request; 1 disables batching. Batches only fill when at
+# least this many analyses run concurrently (ANALYSIS_WORKER_CONCURRENCY).
+MODEL_BATCH_SIZE = config('MODEL_BATCH_SIZE', default=1, cast=int)
+# How long the first case of a batch waits for others to join
+MODEL_BATCH_WINDOW_MS = config('MODEL_BATCH_WINDOW_MS', default=250, cast=int)
+
+# (images_b64 {top, far, close}, report_text)
+BatchCase = Tuple[Dict[str, str], Optional[str]]
+
+
+class AnalysisBatcher:
+    """
+    Gathers concurrent analysis requests for up to `window` seconds (or until
+    `max_cases` are waiting) and analyzes them with one model request.
+
+    submit() resolves to the parsed analysis of the case, or None when the
+    batch answer had nothing valid for it (or the batch held only this case):
+    the caller then analyzes the case on its own. AnalysisDeferred from the
+    batch call is raised to every case in it.
+    """
+
+    def __init__(
+        self,
+        analyze_batch: Callable[[List[BatchCase]], Awaitable[List[Optional[Dict]]]],
+        max_cases: int = MODEL_BATCH_SIZE,
+        window: float = MODEL_BATCH_WINDOW_MS / 1000,
+    ):
+        self.analyze_batch = analyze_batch
+        self.max_cases = max_cases
+        self.window = window
+        self._pending: List[Tuple[BatchCase, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = set()
+        self.counters = {"batches": 0, "batched_cases": 0, "split_failures": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_cases > 1
+
+    async def submit(self, images_b64: Dict[str, str], report_text: Optional[str]) -> Optional[Dict]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(((images_b64, report_text), future))
+        if len(self._pending) >= self.max_cases:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_cases], self._pending[self.max_cases:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        if not batch:
+            return
+        if len(batch) == 1:
+            # Nobody joined: the single-case prompt is the better request
+            batch[0][1].set_result(None)
+            return
+        task = asyncio.create_task(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[BatchCase, asyncio.Future]]) -> None:
+        futures = [future for _, future in batch]
+        try:
+            results = await self.analyze_batch([case for case, _ in batch])
+        except AnalysisDeferred as e:
+            # Model unavailable: every case in the batch is deferred
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except Exception as e:
+            print(f"⚠️ Batch analysis of {len(batch)} cases failed, analyzing them one by one: {e}")
+            results = [None] * len(batch)
+
+        self.counters["batches"] += 1
+        self.counters["batched_cases"] += len(batch)
+        self.counters["split_failures"] += sum(1 for result in results if result is None)
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict:
+        return {"enabled": self.enabled, "max_cases": self.max_cases, **self.counters}
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from decouple import config
+
+# On-disk store shared by every process on the host (API workers, analysis workers)
+AI_CACHE_PATH = config('AI_CACHE_PATH', default='data/ai_analysis_cache.sqlite3')
+AI_CACHE_MAX_MB = config('AI_CACHE_MAX_MB', default=256, cast=int)  # 0 disables the cache
+
+
+def analysis_cache_key(images: Iterable[bytes], prompt: str, model: str, settings: Dict) -> str:
+    """
+    SHA-256 over the image payloads, the exact prompt, the model name and the
+    severity settings: changing any of them yields new keys, so stale entries
+    are never read again and simply age out of the LRU.
+    """
+    digest = hashlib.sha256()
+    for image in images:
+        digest.update(hashlib.sha256(image).digest())
+    digest.update(hashlib.sha256(prompt.encode("utf-8")).digest())
+    digest.update(model.encode("utf-8") + b"\0")
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """
+    Size-bounded LRU of parsed model analyses in a SQLite file. Lookups are
+    a primary-key read (well under a millisecond); when the stored payloads
+    exceed max_bytes, least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = AI_CACHE_PATH, max_bytes: int = AI_CACHE_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")  # concurrent readers across processes
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_analyses_last_used ON analyses (last_used)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM analyses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE analyses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, analysis: Dict) -> None:
+        if not self.enabled:
+            return
+        value = json.dumps(analysis)
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO analyses (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, value, len(value), time.time()),
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop least recently used entries until the payloads fit in max_bytes"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM analyses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM analyses ORDER BY last_used"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM analyses WHERE key = ?", victims)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Process-wide singleton
+analysis_cache = AnalysisCache()
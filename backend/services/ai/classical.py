@@ -0,0 +1,149 @@
+import asyncio
+import io
+import math
+from typing import Dict, Optional
+
+import numpy as np
+from decouple import config
+from PIL import Image, ImageOps
+
+from services.images.preprocess import get_process_pool
+
+# Local pre-analysis in front of the vision model. Its provisional result is
+# always recorded; with PREANALYSIS_SETTLE_LOCALLY, clearly intact roads it is
+# confident about are kept from the model. Potholes always go to the model
+PREANALYSIS_ENABLED = config('PREANALYSIS_ENABLED', default=True, cast=bool)
+PREANALYSIS_SETTLE_LOCALLY = config('PREANALYSIS_SETTLE_LOCALLY', default=True, cast=bool)
+PREANALYSIS_ACCEPT_CONFIDENCE = config('PREANALYSIS_ACCEPT_CONFIDENCE', default=0.8, cast=float)
+
+# Features are computed on a small grayscale rendition
+FEATURE_DIMENSION = 256
+EDGE_THRESHOLD = 0.12        # gradient magnitude (0-1 luminance per pixel) counted as an edge
+DARK_RATIO = 0.55            # darker than this share of the median road luminance
+# Rough width of the ground covered by the top-view photo, for size estimates
+TOP_VIEW_WIDTH_CM = 150.0
+
+# Calibrated on the photos in "Test Photo/" (tests/test_classical.py): intact
+# roads there have edge density 0.05-0.08 and, under tree shadows, dark areas
+# up to 0.21 with a shadow contrast up to ~0.62. Potholes have edge density
+# from 0.12, or (the smooth-rimmed 10 inch set) shadow contrast above 0.8.
+FLAT_MAX_EDGE_DENSITY = 0.1
+FLAT_MAX_SHADOW_CONTRAST = 0.7
+CLEAR_DARK_AREA = 0.1
+SHADOW_FLOOR = 0.55           # contrast of ordinary road shading: no depth evidence
+CLEAR_SHADOW_CONTRAST = 0.65
+# Shadows can't tell a 3 inch pothole from a 1 metre one (both sets reach a
+# contrast of 0.65-0.7), so pothole estimates stay below the accept confidence
+POTHOLE_MAX_CONFIDENCE = 0.75
+# Depth proxy: shadow contrast above the floor, scaled so the 3 inch and
+# 10 inch sets land in the Low and Medium severity bands
+DEPTH_SCALE_CM = 40.0
+
+# "confident": provisional results at or above the accept confidence, settled or not
+cascade_stats = {"local": 0, "escalated": 0, "confident": 0}
+
+
+def image_features(data: bytes) -> Dict[str, float]:
+    """
+    Edge density, dark-region area and shadow contrast of one photo.
+    Runs inside the process pool, so it must stay a module-level function.
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("L", (FEATURE_DIMENSION, FEATURE_DIMENSION))
+        img = ImageOps.exif_transpose(img).convert("L")
+        img.thumbnail((FEATURE_DIMENSION, FEATURE_DIMENSION))
+        pixels = np.asarray(img, dtype=np.float32) / 255.0
+
+    # Edges: forward-difference gradient magnitude
+    dx = np.abs(np.diff(pixels, axis=1))[:-1, :]
+    dy = np.abs(np.diff(pixels, axis=0))[:, :-1]
+    edge_density = float(np.mean(np.hypot(dx, dy) > EDGE_THRESHOLD))
+
+    # Dark regions relative to the road surface (the median pixel)
+    road = float(np.median(pixels))
+    dark = pixels < road * DARK_RATIO
+    dark_area = float(dark.mean())
+
+    # Depth proxy: how much darker the dark region is than the road around it
+    shadow_contrast = 0.0
+    if dark_area > 0.001 and road > 0:
+        shadow_contrast = float((road - pixels[dark].mean()) / road)
+
+    return {"edge_density": edge_density, "dark_area": dark_area, "shadow_contrast": shadow_contrast}
+
+
+def _clip(value: float) -> float:
+    return max(0.0, min(1.0, value))
+
+
+def provisional_analysis(features: Dict[str, Dict[str, float]]) -> Dict:
+    """
+    Combine the features of the top/far/close photos into a provisional
+    analysis in the same shape as a parsed model answer (severity is applied
+    by the caller from the depth estimate).
+    """
+    top, close = features["top"], features["close"]
+    dark_area = max(top["dark_area"], close["dark_area"])
+    edge_density = sum(f["edge_density"] for f in features.values()) / len(features)
+    shadow_contrast = max(close["shadow_contrast"], top["shadow_contrast"])
+
+    flat = edge_density < FLAT_MAX_EDGE_DENSITY and shadow_contrast < FLAT_MAX_SHADOW_CONTRAST
+    shadow = _clip((shadow_contrast - SHADOW_FLOOR) / (1 - SHADOW_FLOOR))
+    if flat:
+        # Further below the thresholds = surer it's an intact road
+        margin = min(
+            1 - edge_density / FLAT_MAX_EDGE_DENSITY,
+            (FLAT_MAX_SHADOW_CONTRAST - shadow_contrast) / (FLAT_MAX_SHADOW_CONTRAST - SHADOW_FLOOR),
+        )
+        confidence = 0.75 + 0.25 * _clip(margin)
+        depth_cm = 0.0
+    else:
+        # Pothole evidence: large dark area with deep shadows, seen in both views
+        strength = (
+            _clip(dark_area / CLEAR_DARK_AREA)
+            * _clip((shadow_contrast - SHADOW_FLOOR) / (CLEAR_SHADOW_CONTRAST - SHADOW_FLOOR))
+        )
+        agreement = 1 - abs(top["dark_area"] - close["dark_area"]) / max(dark_area, 1e-6)
+        confidence = 0.4 + (POTHOLE_MAX_CONFIDENCE - 0.4) * strength * _clip(agreement)
+        depth_cm = DEPTH_SCALE_CM * shadow * _clip(dark_area / CLEAR_DARK_AREA)
+
+    size_cm = math.sqrt(top["dark_area"]) * TOP_VIEW_WIDTH_CM
+    return {
+        "confidence": round(confidence, 3),
+        "scores": {
+            "size_vs_road_width": round(1 + 9 * _clip(dark_area / CLEAR_DARK_AREA), 1),
+            "depth_texture": round(1 + 9 * shadow, 1),
+            "cracks_edges": round(1 + 9 * _clip(edge_density / (2 * FLAT_MAX_EDGE_DENSITY)), 1),
+            # No surface_water: bright regions in these photos are sky and road
+            # markings as often as water, so luminance can't score it
+        },
+        "measurements": {
+            "length_cm": round(size_cm, 1),
+            "width_cm": round(size_cm, 1),
+            "depth_cm": round(depth_cm, 1),
+        },
+        "observations": {
+            "size_analysis": f"Local estimate: dark area {dark_area:.1%} of the frame",
+            "depth_analysis": f"Local estimate: shadow contrast {shadow_contrast:.2f}",
+            "surface_analysis": "Intact road surface" if flat else f"Local estimate: edge density {edge_density:.1%}",
+        },
+        "features": features,
+        "intact_road": flat,
+        "source": "classical",
+    }
+
+
+async def preanalyze(top_image: bytes, far_image: bytes, close_image: bytes) -> Optional[Dict]:
+    """Provisional analysis of three photos in the process pool; None if they can't be decoded"""
+    if not PREANALYSIS_ENABLED:
+        return None
+    loop = asyncio.get_running_loop()
+    images = {"top": top_image, "far": far_image, "close": close_image}
+    try:
+        features = await asyncio.gather(*(
+            loop.run_in_executor(get_process_pool(), image_features, data) for data in images.values()
+        ))
+    except Exception as e:  # undecodable photo, broken pool: never fail the caller
+        print(f"⚠️ Local pre-analysis failed: {e}")
+        return None
+    return provisional_analysis(dict(zip(images.keys(), features)))
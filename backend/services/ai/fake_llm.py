@@ -0,0 +1,109 @@
+"""
+Local stand-in for the Gemini generateContent REST API, for exercising the
+analysis worker and the model scheduler without paid calls.
+
+Answers with a random but well-formed pothole analysis (an array of them for
+batched requests) after a configurable latency, and can inject rate limiting
+(429), server errors (500/503) and hangs.
+
+Usage (from backend/):
+    python -m services.ai.fake_llm [--port 8090] [--latency 1.5] [--error-rate 0.1] [--rpm 60] [--hang-rate 0]
+
+Then start the API or worker with GEMINI_API_ENDPOINT=http://localhost:8090
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Fake Gemini")
+settings = {"latency": 1.5, "error_rate": 0.0, "rpm": 0, "hang_rate": 0.0}
+_recent_requests = deque()
+
+
+def _analysis() -> dict:
+    depth = round(random.uniform(1.0, 35.0), 1)
+    return {
+        "scores": {
+            "size_vs_road_width": random.randint(1, 10),
+            "depth_texture": random.randint(1, 10),
+            "cracks_edges": random.randint(1, 10),
+            "surface_water": random.randint(1, 10),
+        },
+        "severity": "Medium",
+        "measurements": {
+            "length_cm": round(random.uniform(10.0, 120.0), 1),
+            "width_cm": round(random.uniform(10.0, 90.0), 1),
+            "depth_cm": depth,
+        },
+        "confidence": round(random.uniform(0.6, 0.95), 2),
+        "observations": {
+            "size_analysis": "Fake analysis",
+            "depth_analysis": f"Fake depth of {depth} cm",
+            "surface_analysis": "Fake analysis",
+        },
+    }
+
+
+def _error(status: int, message: str, reason: str) -> JSONResponse:
+    return JSONResponse(status_code=status, content={"error": {"code": status, "message": message, "status": reason}})
+
+
+@app.post("/{version}/models/{model}:generateContent")
+async def generate_content(version: str, model: str, request: Request):
+    body = await request.json()
+    # Batched requests (services/ai/batching.py) label each case with a "CASE <n>" text part
+    cases = sum(
+        1
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+        if str(part.get("text", "")).startswith("CASE ")
+    )
+
+    if settings["rpm"]:
+        now = time.monotonic()
+        while _recent_requests and _recent_requests[0] < now - 60:
+            _recent_requests.popleft()
+        if len(_recent_requests) >= settings["rpm"]:
+            return _error(429, "Resource has been exhausted (e.g. check quota).", "RESOURCE_EXHAUSTED")
+        _recent_requests.append(now)
+
+    if random.random() < settings["hang_rate"]:
+        await asyncio.sleep(3600)  # exercises the caller's timeout
+    await asyncio.sleep(random.uniform(0.5, 1.5) * settings["latency"] * (1 + 0.2 * cases))
+    if random.random() < settings["error_rate"]:
+        return random.choice([
+            _error(500, "Internal error encountered.", "INTERNAL"),
+            _error(503, "The model is overloaded. Please try again later.", "UNAVAILABLE"),
+        ])
+
+    answer = [{"case": n, **_analysis()} for n in range(1, cases + 1)] if cases else _analysis()
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": json.dumps(answer)}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": 0, "totalTokenCount": 0},
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a fake Gemini API server")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=1.5, help="Mean response time in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500/503")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute before answering 429 (0 = unlimited)")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Share of requests that never answer")
+    args = parser.parse_args()
+
+    settings.update(latency=args.latency, error_rate=args.error_rate, rpm=args.rpm, hang_rate=args.hang_rate)
+    print(f"✅ Fake Gemini listening on http://localhost:{args.port}")
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
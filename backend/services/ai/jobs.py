@@ -0,0 +1,114 @@
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from decouple import config
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+import models
+
+MAX_ATTEMPTS = config('ANALYSIS_MAX_ATTEMPTS', default=5, cast=int)
+# A running job whose worker hasn't finished within the lease is claimed again
+LEASE_SECONDS = config('ANALYSIS_LEASE_SECONDS', default=600, cast=int)
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+# Due queued jobs plus expired leases, oldest first; concurrent claimers skip
+# each other's rows instead of waiting on them
+_CLAIM = text("""
+    UPDATE analysis_jobs
+    SET status = 'running', attempts = attempts + 1, locked_by = :worker, locked_at = now()
+    WHERE id IN (
+        SELECT id FROM analysis_jobs
+        WHERE (status = 'queued' AND run_after <= now())
+           OR (status = 'running' AND locked_at < now() - make_interval(secs => :lease))
+        ORDER BY run_after
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, case_id, attempts
+""")
+
+_METRICS = text("""
+    SELECT
+        count(*) FILTER (WHERE status = 'queued') AS queued,
+        count(*) FILTER (WHERE status = 'queued' AND run_after <= now()) AS due,
+        count(*) FILTER (WHERE status = 'running') AS running,
+        count(*) FILTER (WHERE status = 'failed') AS failed,
+        count(*) FILTER (WHERE status = 'done' AND completed_at >= now() - interval '1 hour') AS done_last_hour,
+        EXTRACT(EPOCH FROM now() - min(created_at) FILTER (WHERE status IN ('queued', 'running'))) AS oldest_pending_seconds,
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM completed_at - created_at))
+            FILTER (WHERE status = 'done' AND completed_at >= now() - interval '1 hour') AS p50_latency_seconds,
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM completed_at - created_at))
+            FILTER (WHERE status = 'done' AND completed_at >= now() - interval '1 hour') AS p95_latency_seconds
+    FROM analysis_jobs
+""")
+
+
+class AnalysisQueue:
+    """Durable queue of report analyses on the analysis_jobs table"""
+
+    @staticmethod
+    def enqueue(db: Session, case_id: str) -> None:
+        """
+        Queue (or re-queue) the analysis of a report. Not committed here, so
+        it can share the transaction that saves the report.
+        """
+        statement = insert(models.AnalysisJob).values(case_id=case_id, status="queued", attempts=0)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[models.AnalysisJob.case_id],
+            set_={"status": "queued", "attempts": 0, "run_after": func.now(), "last_error": None,
+                  "locked_by": None, "locked_at": None, "completed_at": None},
+        ))
+
+    @staticmethod
+    def claim(db: Session, worker: str, limit: int) -> List[Dict]:
+        """Lease up to `limit` due jobs to `worker`"""
+        rows = db.execute(_CLAIM, {"worker": worker, "limit": limit, "lease": LEASE_SECONDS}).mappings().all()
+        db.commit()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def complete(db: Session, job_id: int) -> None:
+        db.query(models.AnalysisJob).filter(models.AnalysisJob.id == job_id).update(
+            {"status": "done", "locked_by": None, "locked_at": None, "last_error": None,
+             "completed_at": func.now()},
+            synchronize_session=False,
+        )
+
+    @staticmethod
+    def retry_or_fail(db: Session, job_id: int, attempts: int, error: str, delay: Optional[float] = None) -> str:
+        """Schedule another attempt with exponential backoff, or give up after MAX_ATTEMPTS"""
+        if attempts >= MAX_ATTEMPTS:
+            values = {"status": "failed", "completed_at": func.now()}
+        else:
+            if delay is None:
+                delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+            values = {"status": "queued", "run_after": func.now() + timedelta(seconds=delay)}
+        db.query(models.AnalysisJob).filter(models.AnalysisJob.id == job_id).update(
+            {**values, "locked_by": None, "locked_at": None, "last_error": error[:2000]},
+            synchronize_session=False,
+        )
+        db.commit()
+        return values["status"]
+
+    @staticmethod
+    def defer(db: Session, job_id: int, delay: float, reason: str) -> None:
+        """Put a job back without using up an attempt (the model was unavailable, not the job at fault)"""
+        db.query(models.AnalysisJob).filter(models.AnalysisJob.id == job_id).update(
+            {"status": "queued", "attempts": models.AnalysisJob.attempts - 1,
+             "run_after": func.now() + timedelta(seconds=max(delay, 1)),
+             "locked_by": None, "locked_at": None, "last_error": f"Deferred: {reason}"[:2000]},
+            synchronize_session=False,
+        )
+        db.commit()
+
+    @staticmethod
+    def metrics(db: Session) -> Dict:
+        """Queue depth, age of the oldest pending job and recent end-to-end latency"""
+        row = db.execute(_METRICS).mappings().one()
+        return {
+            key: round(float(value), 1) if key.endswith("_seconds") and value is not None else value
+            for key, value in row.items()
+        }
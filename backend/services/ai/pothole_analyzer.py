@@ -1,8 +1,9 @@
 import os
+import asyncio
 import base64
 import json
-from dataclasses import dataclass
-from typing import Dict, Optional
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
 
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
@@ -12,6 +13,13 @@ from datetime import datetime, timedelta  # kept if you log/use later
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage
 
+from services.ai.batching import AnalysisBatcher, BatchCase
+from services.ai.cache import analysis_cache, analysis_cache_key
+from services.ai.classical import (
+    PREANALYSIS_ACCEPT_CONFIDENCE, PREANALYSIS_SETTLE_LOCALLY, cascade_stats, preanalyze
+)
+from services.ai.scheduler import AnalysisDeferred, model_scheduler
+
 
 # =========================
 # Config & Globals
@@ -42,6 +50,9 @@ CFG = SeverityConfig()
 # Load environment variables
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")  # Vision-capable model
+# Alternative API endpoint, e.g. the local fake server (python -m services.ai.fake_llm)
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
 
 
 # =========================
@@ -59,10 +70,20 @@ class PotholeAnalyzer:
 
     def __init__(self):
         self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash-exp",  # Vision-capable model
+            model=GEMINI_MODEL,
             temperature=0.0,               # Consistent responses
-            api_key=GEMINI_API_KEY
+            api_key=GEMINI_API_KEY,
+            max_retries=0,                 # Retries/backoff are done by model_scheduler
+            **self._endpoint_options()
         )
+        # Optional: analyze concurrent cases with one multi-image request (MODEL_BATCH_SIZE)
+        self.batcher = AnalysisBatcher(self._analyze_batch)
+
+    @staticmethod
+    def _endpoint_options() -> Dict:
+        if not GEMINI_API_ENDPOINT:
+            return {}
+        return {"client_options": {"api_endpoint": GEMINI_API_ENDPOINT}, "transport": "rest"}
 
     async def analyze_pothole_priority(
         self,
@@ -88,7 +109,7 @@ class PotholeAnalyzer:
 
             # Step 2: Calculate community engagement
             community_data = self._calculate_community_metrics(
-                latitude, longitude, db
+                latitude, longitude, db, case_id=case_id
             )
 
             # Step 3: Apply priority rules
@@ -114,12 +135,17 @@ class PotholeAnalyzer:
                 "measurements": base_analysis["measurements"],
                 "confidence": base_analysis["confidence"],
                 "analysis_details": {
+                    # "classical" when settled by the local pre-analysis
+                    "source": base_analysis.get("source", "model"),
                     "base_analysis": base_analysis,
                     "community_data": community_data,
                     "priority_calculation": final_priority
                 }
             }
 
+        except AnalysisDeferred as e:
+            print(f"⏳ AI analysis deferred for {case_id}: {e.reason}")
+            raise
         except Exception as e:
             print(f"❌ AI analysis failed for {case_id}: {str(e)}")
             return self._get_fallback_response()
@@ -135,23 +161,83 @@ class PotholeAnalyzer:
     ) -> Dict:
         """
         Send images to Gemini AI for analysis and parse response.
+        Identical photos + prompt + model + severity settings are served from
+        the on-disk analysis cache without calling the model, and intact roads
+        the local pre-analysis is confident about never reach the model.
         """
         try:
+            prompt = self._create_analysis_prompt(report_text)
+            cache_key = analysis_cache_key(
+                (top_image, far_image, close_image), prompt, GEMINI_MODEL, asdict(CFG)
+            )
+            cached = await self._cached_analysis(cache_key)
+            if cached is not None:
+                print("   ⚡ Using cached AI analysis")
+                return cached
+
+            provisional = await self.preanalyze(top_image, far_image, close_image)
+            if provisional is not None:
+                confident = provisional["confidence"] >= PREANALYSIS_ACCEPT_CONFIDENCE
+                cascade_stats["confident"] += confident
+                if confident and provisional["intact_road"] and PREANALYSIS_SETTLE_LOCALLY:
+                    cascade_stats["local"] += 1
+                    print(f"   🧮 Using local pre-analysis (confidence {provisional['confidence']:.2f})")
+                    return provisional
+                cascade_stats["escalated"] += 1
+
             images_b64 = {
                 "top": base64.b64encode(top_image).decode("utf-8"),
                 "far": base64.b64encode(far_image).decode("utf-8"),
                 "close": base64.b64encode(close_image).decode("utf-8"),
             }
 
-            prompt = self._create_analysis_prompt(report_text)
-            ai_response = await self._call_gemini_vision(prompt, images_b64)
-
-            return self._parse_ai_response(ai_response)
-
+            analysis = None
+            if self.batcher.enabled:
+                analysis = await self.batcher.submit(images_b64, report_text)
+            if analysis is None:
+                ai_response = await self._call_gemini_vision(prompt, images_b64)
+                analysis = self._parse_ai_response(ai_response)
+            if not analysis.get("fallback"):
+                await self._store_analysis(cache_key, analysis)
+            if provisional is not None:
+                # Kept next to the model's answer, to calibrate the local thresholds against
+                analysis = {**analysis, "provisional": {
+                    "confidence": provisional["confidence"],
+                    "severity": provisional["severity"],
+                    "measurements": provisional["measurements"],
+                }}
+            return analysis
+
+        except AnalysisDeferred:
+            raise  # model unavailable: analyze later rather than guess
         except Exception as e:
             print(f"Image analysis failed: {str(e)}")
             return self._get_default_analysis()
 
+    async def preanalyze(self, top_image: bytes, far_image: bytes, close_image: bytes) -> Optional[Dict]:
+        """
+        Fast local estimate (classical image features, in the process pool)
+        with severity from the same depth rule; None when unavailable.
+        """
+        provisional = await preanalyze(top_image, far_image, close_image)
+        if provisional is not None:
+            provisional["severity"] = self._severity_from_depth_inches(provisional["measurements"])
+        return provisional
+
+    async def _cached_analysis(self, cache_key: str) -> Optional[Dict]:
+        """Cached analysis for the key, or None (a broken cache never fails the analysis)"""
+        try:
+            return await asyncio.to_thread(analysis_cache.get, cache_key)
+        except Exception as e:
+            print(f"⚠️ AI cache read failed: {e}")
+            return None
+
+    async def _store_analysis(self, cache_key: str, analysis: Dict) -> None:
+        try:
+            await asyncio.to_thread(analysis_cache.put, cache_key, analysis)
+        except Exception as e:
+            print(f"⚠️ AI cache write failed: {e}")
+
     def _create_analysis_prompt(self, report_text: Optional[str]) -> str:
         """
         Prompt for Gemini Vision. We will OVERRIDE severity locally using depth-only rule.
@@ -201,7 +287,8 @@ CONTEXT: This is a road in Sabah, Malaysia.
 
     async def _call_gemini_vision(self, prompt: str, images_b64: Dict) -> str:
         """
-        Send request to Gemini Vision API
+        Send request to Gemini Vision API (through the rate-aware scheduler;
+        raises AnalysisDeferred when the model can't be reached in time)
         """
         message_content = [
             {"type": "text", "text": prompt},
@@ -209,62 +296,176 @@ CONTEXT: This is a road in Sabah, Malaysia.
             {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{images_b64['far']}"}},
             {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{images_b64['close']}"}},
         ]
-        response = await self.llm.ainvoke([HumanMessage(content=message_content)])
+        response = await model_scheduler.call(
+            lambda: self.llm.ainvoke([HumanMessage(content=message_content)])
+        )
         return response.content.strip()
 
+    # ---------- Step 1b: Batched AI Image Analysis ----------
+
+    def _create_batch_prompt(self, case_count: int) -> str:
+        """
+        Prompt for several cases in one request: each case is a "CASE <n>" text
+        part followed by its top, far and close images.
+        """
+        return f"""
+TASK: Analyze pothole damage for {case_count} separate cases and return JSON.
+
+Each case starts with a text part "CASE <n>" (optionally with the user's report),
+followed by exactly 3 images of that case: top-view, far-view, and close-up.
+Analyze every case independently; never mix images of different cases.
+
+ANALYSIS CRITERIA (for context/logging only):
+1. Size vs road width (score 1-10)
+2. Depth & texture contrast (score 1-10)
+3. Cracks & edge quality (score 1-10)
+4. Surface condition & water pooling (score 1-10)
+
+RETURN ONLY A JSON ARRAY WITH ONE OBJECT PER CASE, IN CASE ORDER:
+[
+    {{
+        "case": <n>,
+        "scores": {{
+            "size_vs_road_width": <1-10>,
+            "depth_texture": <1-10>,
+            "cracks_edges": <1-10>,
+            "surface_water": <1-10>
+        }},
+        "severity": "<Low|Medium|High>",
+        "measurements": {{
+            "length_cm": <estimated_length>,
+            "width_cm": <estimated_width>,
+            "depth_cm": <estimated_depth>
+        }},
+        "confidence": <0.0-1.0>,
+        "observations": {{
+            "size_analysis": "<brief_description>",
+            "depth_analysis": "<brief_description>",
+            "surface_analysis": "<brief_description>"
+        }}
+    }}
+]
+
+SEVERITY NOTE: Final severity will be computed strictly by depth in inches on our side.
+
+Return ONLY the JSON array with exactly {case_count} objects, no other text.
+
+CONTEXT: These are roads in Sabah, Malaysia.
+"""
+
+    async def _analyze_batch(self, cases: List[BatchCase]) -> List[Optional[Dict]]:
+        """One model request for several cases; None for cases without a valid answer"""
+        message_content = [{"type": "text", "text": self._create_batch_prompt(len(cases))}]
+        for number, (images_b64, report_text) in enumerate(cases, start=1):
+            label = f"CASE {number}"
+            if report_text:
+                label += f" - USER REPORT: {report_text}"
+            message_content.append({"type": "text", "text": label})
+            for view in ("top", "far", "close"):
+                message_content.append(
+                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{images_b64[view]}"}}
+                )
+
+        print(f"   📦 Analyzing {len(cases)} cases in one request")
+        response = await model_scheduler.call(
+            lambda: self.llm.ainvoke([HumanMessage(content=message_content)])
+        )
+        return self._parse_batch_response(response.content.strip(), len(cases))
+
+    def _parse_batch_response(self, ai_response: str, case_count: int) -> List[Optional[Dict]]:
+        """
+        Split a batched answer into per-case analyses, validated like single
+        ones. Cases that are missing, duplicated or lack a depth estimate are
+        None (analyzed again on their own).
+        """
+        try:
+            data = json.loads(self._strip_code_fence(ai_response))
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Batch JSON parsing error: {e}")
+            return [None] * case_count
+        if isinstance(data, dict):
+            data = data.get("cases", [])
+        if not isinstance(data, list):
+            return [None] * case_count
+
+        by_case: Dict[int, Optional[Dict]] = {}
+        for position, item in enumerate(data, start=1):
+            if not isinstance(item, dict):
+                continue
+            number = item.get("case", position)
+            if not isinstance(number, int) or not 1 <= number <= case_count:
+                continue
+            try:
+                float(item["measurements"]["depth_cm"])
+                analysis = self._normalize_analysis(item)
+            except (AttributeError, KeyError, TypeError, ValueError):
+                analysis = None
+            # The same case answered twice is ambiguous
+            by_case[number] = None if number in by_case else analysis
+        return [by_case.get(number) for number in range(1, case_count + 1)]
+
+    @staticmethod
+    def _strip_code_fence(ai_response: str) -> str:
+        cleaned = ai_response.strip()
+        if cleaned.startswith("```json"):
+            cleaned = cleaned[7:-3].strip()
+        elif cleaned.startswith("```"):
+            cleaned = cleaned[3:-3].strip()
+        return cleaned
+
     def _parse_ai_response(self, ai_response: str) -> Dict:
         """
         Parse and validate JSON. OVERRIDES severity using depth-only inches rule.
         """
         try:
-            cleaned = ai_response.strip()
-            if cleaned.startswith("```json"):
-                cleaned = cleaned[7:-3].strip()
-            elif cleaned.startswith("```"):
-                cleaned = cleaned[3:-3].strip()
-
-            data = json.loads(cleaned)
-
-            # Scores (kept for logs)
-            scores = data.get("scores", {})
-            for key in ["size_vs_road_width", "depth_texture", "cracks_edges", "surface_water"]:
-                val = scores.get(key, 5)
-                if not isinstance(val, (int, float)):
-                    val = 5
-                scores[key] = max(1, min(10, float(val)))
-
-            # Measurements (cm)
-            measurements = data.get("measurements", {})
-            for key in ["length_cm", "width_cm", "depth_cm"]:
-                val = measurements.get(key, 0.0)
-                try:
-                    val = float(val)
-                except (TypeError, ValueError):
-                    val = 0.0
-                measurements[key] = max(0.0, val)
-
-            # Confidence
-            confidence = data.get("confidence", 0.5)
-            if not isinstance(confidence, (int, float)) or not (0.0 <= float(confidence) <= 1.0):
-                confidence = 0.5
-            confidence = float(confidence)
-
-            # FINAL SEVERITY (depth-only, in inches)
-            severity = self._severity_from_depth_inches(measurements)
-
-            return {
-                "severity": severity,
-                "confidence": confidence,
-                "scores": scores,
-                "measurements": measurements,
-                "observations": data.get("observations", {})
-            }
+            data = json.loads(self._strip_code_fence(ai_response))
+            return self._normalize_analysis(data)
 
         except (json.JSONDecodeError, ValueError) as e:
             print(f"JSON parsing error: {e}")
             print(f"AI Response: {ai_response}")
             return self._get_default_analysis()
 
+    def _normalize_analysis(self, data: Dict) -> Dict:
+        """Clamp/default the fields of one parsed analysis and apply the depth rule"""
+        if not isinstance(data, dict):
+            raise ValueError("Analysis is not a JSON object")
+
+        # Scores (kept for logs)
+        scores = data.get("scores", {})
+        for key in ["size_vs_road_width", "depth_texture", "cracks_edges", "surface_water"]:
+            val = scores.get(key, 5)
+            if not isinstance(val, (int, float)):
+                val = 5
+            scores[key] = max(1, min(10, float(val)))
+
+        # Measurements (cm)
+        measurements = data.get("measurements", {})
+        for key in ["length_cm", "width_cm", "depth_cm"]:
+            val = measurements.get(key, 0.0)
+            try:
+                val = float(val)
+            except (TypeError, ValueError):
+                val = 0.0
+            measurements[key] = max(0.0, val)
+
+        # Confidence
+        confidence = data.get("confidence", 0.5)
+        if not isinstance(confidence, (int, float)) or not (0.0 <= float(confidence) <= 1.0):
+            confidence = 0.5
+        confidence = float(confidence)
+
+        # FINAL SEVERITY (depth-only, in inches)
+        severity = self._severity_from_depth_inches(measurements)
+
+        return {
+            "severity": severity,
+            "confidence": confidence,
+            "scores": scores,
+            "measurements": measurements,
+            "observations": data.get("observations", {})
+        }
+
     def _severity_from_depth_inches(self, measurements: Dict) -> str:
         """
         Final severity rule (depth only):
@@ -283,37 +484,48 @@ CONTEXT: This is a road in Sabah, Malaysia.
 
     # ---------- Step 2: Community Metrics ----------
 
-    def _calculate_community_metrics(self, latitude: float, longitude: float, db: Session) -> Dict:
+    def _calculate_community_metrics(
+        self, latitude: float, longitude: float, db: Session, case_id: Optional[str] = None
+    ) -> Dict:
         """
         Calculate community engagement metrics around (lat,lng).
+        Reads the live aggregates of the report's incident cluster when it has
+        one; otherwise counts reports within ~50 m.
         """
         try:
-            lat_range = 0.0005  # ~50m
-            lng_range = 0.0005
-
             # Local import to avoid circulars; ensure models.PotholeReport exists
             import models
-
-            similar_reports = db.query(models.PotholeReport).filter(
-                models.PotholeReport.latitude.between(latitude - lat_range, latitude + lat_range),
-                models.PotholeReport.longitude.between(longitude - lng_range, longitude + lng_range),
-            ).count()
-
-            unique_users = db.query(
-                func.count(func.distinct(models.PotholeReport.user_id))
-            ).filter(
-                models.PotholeReport.latitude.between(latitude - lat_range, latitude + lat_range),
-                models.PotholeReport.longitude.between(longitude - lng_range, longitude + lng_range),
-            ).scalar() or 0
-
-            if similar_reports >= 8 and unique_users >= 5:
-                multiplier = 3.0
-            elif similar_reports >= 5 and unique_users >= 3:
-                multiplier = 2.0
-            elif similar_reports >= 2:
-                multiplier = 1.5
+            from services.helpers.dup_utils import METERS_PER_DEGREE_LAT, neighbor_cells
+            from services.helpers.incidents import community_multiplier
+
+            incident = None
+            if case_id:
+                incident = (
+                    db.query(models.PotholeIncident)
+                    .join(models.PotholeReport, models.PotholeReport.incident_id == models.PotholeIncident.id)
+                    .filter(models.PotholeReport.case_id == case_id)
+                    .first()
+                )
+
+            if incident is not None:
+                similar_reports, unique_users = incident.report_count, incident.unique_user_count
             else:
-                multiplier = 1.0
+                lat_range = 0.0005  # ~50m
+                lng_range = 0.0005
+
+                # Grid cells use the (grid_cell, date_created) index; bounds trim the cell edges
+                in_area = (
+                    models.PotholeReport.grid_cell.in_(neighbor_cells(latitude, longitude, lat_range * METERS_PER_DEGREE_LAT)),
+                    models.PotholeReport.latitude.between(latitude - lat_range, latitude + lat_range),
+                    models.PotholeReport.longitude.between(longitude - lng_range, longitude + lng_range),
+                )
+
+                similar_reports, unique_users = db.query(
+                    func.count(),
+                    func.count(func.distinct(models.PotholeReport.user_id))
+                ).filter(*in_area).one()
+
+            multiplier = community_multiplier(similar_reports, unique_users)
 
             return {
                 "similar_reports": similar_reports,
@@ -375,7 +587,8 @@ CONTEXT: This is a road in Sabah, Malaysia.
                 "size_analysis": "Unable to analyze - using defaults",
                 "depth_analysis": "Unable to analyze - using defaults",
                 "surface_analysis": "Unable to analyze - using defaults"
-            }
+            },
+            "fallback": True  # not a real analysis; the worker retries these
         }
 
     def _get_fallback_response(self) -> Dict:
@@ -0,0 +1,216 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from decouple import config
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    _PROVIDER_TRANSIENT = (
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.BadGateway,
+        google_exceptions.GatewayTimeout,
+        google_exceptions.DeadlineExceeded,
+    )
+except ImportError:
+    _PROVIDER_TRANSIENT = ()
+
+MODEL_MAX_CONCURRENCY = config('MODEL_MAX_CONCURRENCY', default=4, cast=int)
+MODEL_REQUESTS_PER_MINUTE = config('MODEL_REQUESTS_PER_MINUTE', default=15, cast=float)
+MODEL_BURST = config('MODEL_BURST', default=3, cast=int)
+MODEL_CALL_TIMEOUT_SECONDS = config('MODEL_CALL_TIMEOUT_SECONDS', default=60, cast=float)
+# Total budget of one analysis call including rate-limit waits and retries
+MODEL_DEADLINE_SECONDS = config('MODEL_DEADLINE_SECONDS', default=180, cast=float)
+MODEL_MAX_RETRIES = config('MODEL_MAX_RETRIES', default=3, cast=int)
+MODEL_BACKOFF_BASE_SECONDS = 1.0
+MODEL_BACKOFF_MAX_SECONDS = 30.0
+BREAKER_FAILURE_THRESHOLD = config('MODEL_BREAKER_FAILURES', default=5, cast=int)
+BREAKER_COOLDOWN_SECONDS = config('MODEL_BREAKER_COOLDOWN_SECONDS', default=60, cast=float)
+
+_HTTP_TRANSIENT = {408, 429, 500, 502, 503, 504}
+
+
+class AnalysisDeferred(Exception):
+    """The model is unavailable right now; try the analysis again after retry_after seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def is_transient(error: BaseException) -> bool:
+    """Timeouts, rate limits, server errors and network failures (worth retrying)"""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, *_PROVIDER_TRANSIENT)):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return isinstance(code, int) and code in _HTTP_TRANSIENT
+
+
+class TokenBucket:
+    """Requests-per-minute limit with a small burst allowance"""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token; returns how long to wait before using it (0 when available now)"""
+        self._refill()
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive transient failures; while open every
+    call is deferred. After the cooldown one probe call is let through: success
+    closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.probing else "open"
+
+    def before_call(self) -> Optional[float]:
+        """None if the call may proceed, else seconds until it is worth trying again"""
+        if self.opened_at is None:
+            return None
+        remaining = self.opened_at + self.cooldown - time.monotonic()
+        if remaining > 0:
+            return remaining
+        # Let one probe through; others wait another cooldown (also covers a probe that never reports back)
+        self.probing = True
+        self.opened_at = time.monotonic()
+        return None
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self.probing or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+
+class ModelScheduler:
+    """
+    Gate in front of the vision model: bounded concurrency, a requests-per-minute
+    token bucket, a per-call timeout inside an overall deadline, jittered
+    exponential backoff on transient errors and a circuit breaker. When the
+    model can't be reached in time the call raises AnalysisDeferred rather
+    than letting callers fall back to default values.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = MODEL_MAX_CONCURRENCY,
+        requests_per_minute: float = MODEL_REQUESTS_PER_MINUTE,
+        burst: int = MODEL_BURST,
+        call_timeout: float = MODEL_CALL_TIMEOUT_SECONDS,
+        deadline: float = MODEL_DEADLINE_SECONDS,
+        max_retries: int = MODEL_MAX_RETRIES,
+    ):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = TokenBucket(requests_per_minute, burst)
+        self.breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN_SECONDS)
+        self.call_timeout = call_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.in_flight = 0
+        self.counters = {"calls": 0, "retries": 0, "timeouts": 0, "deferred": 0, "failed": 0}
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Full jitter: uniform in [0, min(max, base * 2^attempt)]"""
+        return random.uniform(0, min(MODEL_BACKOFF_MAX_SECONDS, MODEL_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    def _defer(self, reason: str, retry_after: float) -> AnalysisDeferred:
+        self.counters["deferred"] += 1
+        return AnalysisDeferred(reason, retry_after)
+
+    async def call(self, make_call: Callable[[], Awaitable[Any]], deadline: Optional[float] = None) -> Any:
+        """Run make_call() (a fresh coroutine per attempt) under the scheduler's limits"""
+        expires = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            wait = self.breaker.before_call()
+            if wait is not None:
+                raise self._defer("Model circuit breaker is open", wait)
+
+            delay = self.bucket.reserve()
+            if time.monotonic() + delay >= expires:
+                self.bucket.refund()
+                raise self._defer("Model rate limit: no request slot before the deadline", delay)
+            if delay:
+                await asyncio.sleep(delay)
+
+            async with self.semaphore:
+                remaining = expires - time.monotonic()
+                if remaining <= 0:
+                    raise self._defer("Deadline passed while waiting for a model slot", self._backoff(attempt))
+                self.in_flight += 1
+                self.counters["calls"] += 1
+                try:
+                    result = await asyncio.wait_for(make_call(), timeout=min(self.call_timeout, remaining))
+                    self.breaker.success()
+                    return result
+                except Exception as e:
+                    if not is_transient(e):
+                        # The model answered (e.g. a rejected request): not an availability problem
+                        self.breaker.success()
+                        self.counters["failed"] += 1
+                        raise
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.counters["timeouts"] += 1
+                    self.breaker.failure()
+                    error = e
+                finally:
+                    self.in_flight -= 1
+
+            backoff = self._backoff(attempt)
+            attempt += 1
+            if attempt > self.max_retries or time.monotonic() + backoff >= expires:
+                raise self._defer(f"Model unavailable: {type(error).__name__}: {error}", max(backoff, BREAKER_COOLDOWN_SECONDS / 2))
+            self.counters["retries"] += 1
+            print(f"   🔁 Model call failed ({type(error).__name__}), retrying in {backoff:.1f}s")
+            await asyncio.sleep(backoff)
+
+    def stats(self) -> Dict:
+        return {
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "in_flight": self.in_flight,
+            "tokens": round(max(self.bucket.tokens, 0.0), 2),
+            **self.counters,
+        }
+
+
+# Process-wide singleton: limits apply to every analysis in this process
+model_scheduler = ModelScheduler()
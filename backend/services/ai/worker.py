@@ -0,0 +1,182 @@
+"""
+Run queued AI analyses (analysis_jobs) with PotholeAnalyzer and write the
+results back to the reports.
+
+Any number of workers can run side by side: jobs are claimed with
+FOR UPDATE SKIP LOCKED, and a job whose worker died is claimed again once
+its lease expires. Failed analyses are retried with exponential backoff;
+analyses deferred by the model scheduler (rate limits, open circuit breaker)
+are re-queued without using up an attempt.
+The API also runs a worker in-process unless ANALYSIS_WORKER_IN_API=False.
+
+Usage (from backend/):
+    python -m services.ai.worker [--concurrency 4] [--enqueue-pending]
+"""
+import argparse
+import asyncio
+import os
+import socket
+from typing import Dict
+
+from decouple import config
+from sqlalchemy import text
+
+import models
+from services.ai.jobs import AnalysisQueue
+from services.ai.pothole_analyzer import pothole_analyzer
+from services.ai.scheduler import AnalysisDeferred
+from services.database.connect import SessionLocal
+from services.storage.service import StorageService
+
+WORKER_CONCURRENCY = config('ANALYSIS_WORKER_CONCURRENCY', default=4, cast=int)
+WORKER_IN_API = config('ANALYSIS_WORKER_IN_API', default=True, cast=bool)
+POLL_SECONDS = config('ANALYSIS_POLL_SECONDS', default=2.0, cast=float)
+# Photo variant sent to the model: 800 px is plenty and much smaller to fetch and upload
+ANALYSIS_VARIANT = "card"
+
+_ENQUEUE_PENDING = text("""
+    INSERT INTO analysis_jobs (case_id, status, attempts, run_after, created_at)
+    SELECT case_id, 'queued', 0, now(), now()
+    FROM pothole_reports
+    WHERE NOT ai_analysis_completed
+    ON CONFLICT (case_id) DO NOTHING
+""")
+
+
+class AnalysisError(Exception):
+    """The analyzer could not produce a real result (retry later)"""
+
+
+def _worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _claim(worker: str, limit: int):
+    db = SessionLocal()
+    try:
+        return AnalysisQueue.claim(db, worker, limit)
+    finally:
+        db.close()
+
+
+async def _fetch_photos(report: models.PotholeReport) -> Dict[str, bytes]:
+    variants = report.photo_variants_dict
+    urls = {
+        label: (variants.get(label) or {}).get(ANALYSIS_VARIANT) or url
+        for label, url in report.photos_dict.items()
+    }
+    photos = await asyncio.gather(*(StorageService.fetch_image(url) for url in urls.values()))
+    return dict(zip(urls.keys(), photos))
+
+
+def _result_values(result: Dict) -> Dict:
+    measurements = result["measurements"]
+    return {
+        "severity": result["base_severity"],
+        "priority": result["final_priority"],
+        "ai_analysis_completed": True,
+        "ai_confidence": result["confidence"],
+        "pothole_length_cm": measurements.get("length_cm"),
+        "pothole_width_cm": measurements.get("width_cm"),
+        "pothole_depth_cm": measurements.get("depth_cm"),
+        "similar_reports_count": result["similar_reports"],
+        "unique_users_count": result["unique_users"],
+        "community_multiplier": result["community_multiplier"],
+        "ai_analysis_details": result["analysis_details"],
+        # An analysis is not a status change
+        "last_date_status_update": models.PotholeReport.last_date_status_update,
+    }
+
+
+async def run_job(job: Dict) -> str:
+    """Analyze one claimed report; returns the job's new status"""
+    db = SessionLocal()
+    try:
+        report = db.get(models.PotholeReport, job["case_id"])
+        if report is None:
+            AnalysisQueue.complete(db, job["id"])  # report deleted meanwhile
+            db.commit()
+            return "done"
+
+        photos = await _fetch_photos(report)
+        result = await pothole_analyzer.analyze_pothole_priority(
+            top_image=photos["top"],
+            far_image=photos["far"],
+            close_image=photos["close"],
+            case_id=report.case_id,
+            report_text=report.description,
+            latitude=report.latitude,
+            longitude=report.longitude,
+            db=db,
+        )
+        if not result["success"] or result["analysis_details"]["base_analysis"].get("fallback"):
+            raise AnalysisError("Analyzer returned default values")
+
+        db.query(models.PotholeReport).filter(models.PotholeReport.case_id == report.case_id).update(
+            _result_values(result), synchronize_session=False
+        )
+        AnalysisQueue.complete(db, job["id"])
+        db.commit()
+        return "done"
+    except AnalysisDeferred as e:
+        db.rollback()
+        AnalysisQueue.defer(db, job["id"], e.retry_after, e.reason)
+        return "queued"
+    except Exception as e:
+        db.rollback()
+        status = AnalysisQueue.retry_or_fail(db, job["id"], job["attempts"], f"{type(e).__name__}: {e}")
+        print(f"❌ Analysis of {job['case_id']} failed (attempt {job['attempts']}, {status}): {e}")
+        return status
+    finally:
+        db.close()
+
+
+async def run_worker(concurrency: int = WORKER_CONCURRENCY, poll_seconds: float = POLL_SECONDS):
+    """Claim and run jobs forever, at most `concurrency` at a time"""
+    worker = _worker_name()
+    in_flight = set()
+    print(f"🤖 Analysis worker {worker} started (concurrency {concurrency})")
+    while True:
+        free = concurrency - len(in_flight)
+        jobs = []
+        if free:
+            try:
+                jobs = await asyncio.to_thread(_claim, worker, free)
+            except Exception as e:
+                print(f"❌ Claiming analysis jobs failed: {e}")
+        for job in jobs:
+            task = asyncio.create_task(run_job(job))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        if len(in_flight) >= concurrency:
+            await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+        elif not jobs:
+            await asyncio.sleep(poll_seconds)
+
+
+def enqueue_pending() -> int:
+    """Queue every report that has no completed analysis and no job yet"""
+    db = SessionLocal()
+    try:
+        count = db.execute(_ENQUEUE_PENDING).rowcount
+        db.commit()
+        return count
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued AI analyses of pothole reports")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY)
+    parser.add_argument("--enqueue-pending", action="store_true",
+                        help="Queue reports that were never analyzed, then exit")
+    args = parser.parse_args()
+
+    if args.enqueue_pending:
+        print(f"✅ Queued {enqueue_pending()} reports for analysis")
+    else:
+        try:
+            asyncio.run(run_worker(concurrency=args.concurrency))
+        except KeyboardInterrupt:
+            print("✅ Analysis worker stopped")
@@ -1,153 +1,207 @@
 # backend/services/cloudinary/service.py
+import asyncio
+import functools
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
+import cloudinary.exceptions
+import cloudinary.utils
 from decouple import config
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Iterable, List, Optional
 
-# Configure Cloudinary
-cloudinary.config(
-    cloud_name=config('CLOUDINARY_CLOUD_NAME'),
-    api_key=config('CLOUDINARY_API_KEY'),
-    api_secret=config('CLOUDINARY_API_SECRET')
+from services.storage.base import StorageBackend
+from services.images.preprocess import VARIANT_DIMENSIONS
+
+# The Cloudinary SDK is synchronous (blocking HTTP). Run its calls on a bounded
+# thread pool so an upload never stalls the event loop of the uvicorn worker.
+UPLOAD_WORKERS = config('CLOUDINARY_UPLOAD_WORKERS', default=8, cast=int)
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="cloudinary")
+
+# Applied by Cloudinary before storing a direct upload: cap the size, re-encode
+# (which also drops EXIF), mirroring services/images/preprocess.py
+DIRECT_UPLOAD_TRANSFORMATION = "c_limit,w_2048,h_2048,q_80"
+DIRECT_UPLOAD_FORMAT = "webp"
+# Variants are derived on Cloudinary's side for direct uploads; generate them at
+# upload time (eager) so the first viewer doesn't wait for the transformation
+DIRECT_UPLOAD_EAGER = "|".join(
+    f"c_limit,w_{dimension},h_{dimension},q_auto" for dimension in VARIANT_DIMENSIONS.values()
 )
+# Cloudinary chunked uploads need chunks of at least 5 MB (except the last one)
+DIRECT_UPLOAD_CHUNK_SIZE = 6 * 1024 * 1024
 
-class CloudinaryService:
-    @staticmethod
-    async def upload_profile_image(file_content: bytes, filename: str) -> dict:
-        """
-        Upload user profile picture to Cloudinary
-        """
-        try:
-            folder_path = "profile_pictures"
-            public_id = f"{folder_path}/{filename.split('.')[0]}"
-            
-            result = cloudinary.uploader.upload(
-                file_content,
-                public_id=public_id,
-                folder=folder_path,
-                resource_type="image",
-                format="jpg",
-                quality="auto",
-                fetch_format="auto"
-            )
-            
-            return {
-                "success": True,
-                "public_id": result["public_id"],
-                "secure_url": result["secure_url"]
-            }
-        except Exception as e:
-            return {"success": False, "error": str(e)}
-
-    @staticmethod  # ✅ FIXED: Added missing @staticmethod
-    async def upload_pothole_image(
-        file_content: bytes, 
-        filename: str, 
-        image_type: str,  # ✅ FIXED: Moved to match homepage router call
-        case_id: str
-    ) -> Dict[str, Any]:
-        """
-        Upload pothole image to Cloudinary
-        
-        Args:
-            file_content: Image file content in bytes
-            filename: Original filename
-            image_type: Type of image ('top', 'far', 'close')
-            case_id: Case ID to organize images
-            
-        Returns:
-            Dict containing upload result with public_id and secure_url
-        """
-        try:
-            # ✅ FIXED: Map image types to consistent naming
-            image_type_mapping = {
-                "top": "top_view",
-                "far": "far_view", 
-                "close": "close_up"
-            }
-            
-            # Create folder structure: pothole_reports/case_id/
-            folder_path = f"pothole_reports/{case_id}"
-            
-            # Generate public_id with mapped image type
-            mapped_type = image_type_mapping.get(image_type, image_type)
-            public_id = f"{folder_path}/{mapped_type}_{filename.split('.')[0]}"
-            
-            # Upload to Cloudinary
-            result = cloudinary.uploader.upload(
-                file_content,
-                public_id=public_id,
-                folder=folder_path,
-                resource_type="image",
-                format="jpg",  # Convert all images to jpg for consistency
-                quality="auto",  # Optimize quality
-                fetch_format="auto"  # Auto-select best format
+# Admin API limits: resources() pages hold up to 500 items, delete_resources()
+# takes up to 100 public IDs per call
+LIST_PAGE_SIZE = 500
+DELETE_BATCH_SIZE = 100
+
+# .../image/upload/[v123/]<public_id>.<ext>
+_DELIVERY_URL = re.compile(r"/image/upload/(?:v\d+/)?(?P<key>[^?#]+)$")
+
+
+async def _run_blocking(func, *args, **kwargs):
+    """Run a blocking Cloudinary SDK call on the upload executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+async def _upload(file_content, **options) -> Dict[str, Any]:
+    """
+    Upload on the executor. If the caller is cancelled before the upload
+    starts, it never runs; if it is already in flight, wait for it to finish
+    and delete the image so cancellation never leaves an orphan behind.
+    """
+    future = _executor.submit(functools.partial(cloudinary.uploader.upload, file_content, **options))
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        if not future.cancelled():
+            try:
+                result = await asyncio.wrap_future(future)
+                await _run_blocking(cloudinary.uploader.destroy, result["public_id"])
+            except Exception:
+                pass
+        raise
+
+
+def _split_key(key: str):
+    """'pothole_reports/ab/abc.webp' -> ('pothole_reports/ab/abc', 'webp')"""
+    public_id, _, extension = key.rpartition(".")
+    return (public_id, extension) if public_id else (key, None)
+
+
+class CloudinaryStorage(StorageBackend):
+    """Cloudinary-backed object storage. Keys map to public_id + format."""
+
+    name = "cloudinary"
+
+    def __init__(self):
+        self._configured = False
+
+    def _configure(self):
+        # Configured on first use rather than at import time, so the local
+        # backend works without Cloudinary credentials
+        if not self._configured:
+            cloudinary.config(
+                cloud_name=config('CLOUDINARY_CLOUD_NAME'),
+                api_key=config('CLOUDINARY_API_KEY'),
+                api_secret=config('CLOUDINARY_API_SECRET'),
+                secure=True
             )
-            
-            return {
-                "success": True,
-                "public_id": result["public_id"],
-                "secure_url": result["secure_url"],
-                "width": result.get("width"),
-                "height": result.get("height"),
-                "format": result.get("format"),
-                "bytes": result.get("bytes")
-            }
-            
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
-    
-    @staticmethod
-    async def delete_image(public_id: str) -> Dict[str, Any]:
-        """Delete image from Cloudinary"""
+            self._configured = True
+
+    async def put(self, key: str, content: bytes) -> Dict[str, Any]:
+        self._configure()
+        public_id, extension = _split_key(key)
+        result = await _upload(
+            content,
+            public_id=public_id,
+            format=extension,
+            resource_type="image",
+            overwrite=False,
+            unique_filename=False
+        )
+        return {
+            "key": key,
+            "url": result["secure_url"],
+            "width": result.get("width"),
+            "height": result.get("height"),
+            "bytes": result.get("bytes")
+        }
+
+    async def stat(self, key: str) -> Optional[Dict[str, Any]]:
+        self._configure()
+        public_id, _ = _split_key(key)
         try:
-            result = cloudinary.uploader.destroy(public_id)
-            return {
-                "success": True,
-                "result": result["result"]  # 'ok' if successful
-            }
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
-    
-    @staticmethod
-    async def get_image_urls_for_case(case_id: str) -> Dict[str, str]:
+            resource = await _run_blocking(cloudinary.api.resource, public_id)
+            return {"key": key, "bytes": resource.get("bytes")}
+        except cloudinary.exceptions.NotFound:
+            return None
+
+    async def delete(self, key: str) -> bool:
+        self._configure()
+        public_id, _ = _split_key(key)
+        result = await _run_blocking(cloudinary.uploader.destroy, public_id)
+        return result.get("result") == "ok"
+
+    async def list_keys(self, prefix: str, page_size: int = LIST_PAGE_SIZE) -> AsyncIterator[List[Dict[str, Any]]]:
+        self._configure()
+        cursor = None
+        while True:
+            options = {"type": "upload", "prefix": prefix, "max_results": min(page_size, LIST_PAGE_SIZE)}
+            if cursor:
+                options["next_cursor"] = cursor
+            result = await _run_blocking(cloudinary.api.resources, **options)
+            page = [
+                {
+                    "key": f"{resource['public_id']}.{resource['format']}" if resource.get("format") else resource["public_id"],
+                    "bytes": resource.get("bytes"),
+                    "created_at": datetime.fromisoformat(resource["created_at"].replace("Z", "+00:00"))
+                }
+                for resource in result.get("resources", [])
+            ]
+            if page:
+                yield page
+            cursor = result.get("next_cursor")
+            if not cursor:
+                break
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        """One Admin API call per 100 keys instead of one destroy per image"""
+        self._configure()
+        public_ids = [_split_key(key)[0] for key in keys]
+        batches = [public_ids[i:i + DELETE_BATCH_SIZE] for i in range(0, len(public_ids), DELETE_BATCH_SIZE)]
+        results = await asyncio.gather(*(_run_blocking(cloudinary.api.delete_resources, batch) for batch in batches))
+        return sum(
+            1 for result in results for status in result.get("deleted", {}).values() if status == "deleted"
+        )
+
+    def url(self, key: str) -> str:
+        self._configure()
+        public_id, extension = _split_key(key)
+        return cloudinary.CloudinaryImage(public_id).build_url(format=extension, secure=True)
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        if not url or "res.cloudinary.com" not in url:
+            return None
+        match = _DELIVERY_URL.search(url)
+        return match.group("key") if match else None
+
+    def upload_ticket(self, key: str, expires_in: int, max_bytes: int) -> Dict[str, Any]:
         """
-        Get all image URLs for a specific case
+        Signed parameters for a direct browser/mobile upload to Cloudinary.
+        Cloudinary rejects signatures older than an hour; the shorter expiry is
+        enforced when the submission is finalized. max_bytes cannot be signed,
+        so it is checked against the stored object at finalize time.
         """
-        try:
-            folder_path = f"pothole_reports/{case_id}"
-            result = cloudinary.api.resources(
-                type="upload",
-                prefix=folder_path,
-                max_results=10
-            )
-            
-            image_urls = {}
-            for resource in result.get("resources", []):
-                public_id = resource["public_id"]
-                # ✅ FIXED: Updated to match new naming convention
-                if "top_view" in public_id:
-                    image_urls["top"] = resource["secure_url"]
-                elif "far_view" in public_id:
-                    image_urls["far"] = resource["secure_url"]
-                elif "close_up" in public_id:
-                    image_urls["close"] = resource["secure_url"]
-            
-            return image_urls
-            
-        except Exception as e:
-            return {"error": str(e)}
-    
-    @staticmethod
-    def get_optimized_url(public_id: str, width: int = None, height: int = None) -> str:
-        """Get optimized image URL with transformations"""
+        self._configure()
+        cfg = cloudinary.config()
+        public_id, _ = _split_key(key)
+        params = {
+            "public_id": public_id,
+            "timestamp": int(time.time()),
+            "overwrite": "false",
+            "format": DIRECT_UPLOAD_FORMAT,
+            "transformation": DIRECT_UPLOAD_TRANSFORMATION,
+            "eager": DIRECT_UPLOAD_EAGER,
+        }
+        signature = cloudinary.utils.api_sign_request(params, cfg.api_secret)
+        return {
+            "method": "POST",
+            "url": cloudinary.utils.cloudinary_api_url("upload", resource_type="image"),
+            "fields": {**params, "api_key": cfg.api_key, "signature": signature},
+            "resumable": True,
+            "chunk_size": DIRECT_UPLOAD_CHUNK_SIZE,
+            "protocol": "POST chunks with 'Content-Range' and a shared 'X-Unique-Upload-Id' header"
+        }
+
+    def transformed_url(self, key: str, width: int = None, height: int = None) -> str:
+        """Delivery URL with resize/format/quality transformations"""
+        self._configure()
+        public_id, _ = _split_key(key)
         transformation = []
         if width:
             transformation.append(f"w_{width}")
@@ -155,44 +209,15 @@ class CloudinaryService:
             transformation.append(f"h_{height}")
         transformation.extend(["c_fill", "f_auto", "q_auto"])
         return cloudinary.CloudinaryImage(public_id).build_url(
-            transformation=transformation
+            transformation=transformation, secure=True
         )
 
-    @staticmethod
-    async def delete_case_images(case_id: str) -> Dict[str, Any]:
-        """
-        ✅ NEW: Delete all images for a specific case
-        Useful for cleanup when report is deleted
-        """
-        try:
-            folder_path = f"pothole_reports/{case_id}"
-            
-            # Get all resources in the case folder
-            result = cloudinary.api.resources(
-                type="upload",
-                prefix=folder_path,
-                max_results=10
-            )
-            
-            deleted_count = 0
-            errors = []
-            
-            # Delete each image
-            for resource in result.get("resources", []):
-                delete_result = await CloudinaryService.delete_image(resource["public_id"])
-                if delete_result["success"]:
-                    deleted_count += 1
-                else:
-                    errors.append(delete_result["error"])
-            
-            return {
-                "success": len(errors) == 0,
-                "deleted_count": deleted_count,
-                "errors": errors
-            }
-            
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
\ No newline at end of file
+    def variant_url(self, key: str, dimension: int) -> str:
+        """Matches the eager transformations requested for direct uploads"""
+        self._configure()
+        public_id, extension = _split_key(key)
+        return cloudinary.CloudinaryImage(public_id).build_url(
+            raw_transformation=f"c_limit,w_{dimension},h_{dimension},q_auto",
+            format=extension,
+            secure=True
+        )
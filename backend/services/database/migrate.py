@@ -0,0 +1,46 @@
+from sqlalchemy import text
+from services.database.connect import engine
+from services.helpers.dup_utils import GRID_CELL_DEGREES, GRID_COLUMNS
+from services.storage.sweeper import photo_identity_sql
+
+# create_all() only creates missing tables; columns added to existing tables
+# are applied here. Every statement must be idempotent (IF NOT EXISTS).
+SCHEMA_UPGRADES = [
+    "ALTER TABLE pothole_reports ADD COLUMN IF NOT EXISTS photo_metadata JSON",
+    "ALTER TABLE pothole_reports ADD COLUMN IF NOT EXISTS phash_top BIGINT",
+    "ALTER TABLE pothole_reports ADD COLUMN IF NOT EXISTS phash_far BIGINT",
+    "ALTER TABLE pothole_reports ADD COLUMN IF NOT EXISTS phash_close BIGINT",
+    # Existing rows take the time of this upgrade; the backfill stamps the rows it hashes
+    "ALTER TABLE pothole_reports ADD COLUMN IF NOT EXISTS phash_at TIMESTAMPTZ DEFAULT now()",
+    "CREATE INDEX IF NOT EXISTS ix_pothole_reports_phash_at ON pothole_reports (phash_at)",
+    "ALTER TABLE pothole_reports ADD COLUMN IF NOT EXISTS photo_variants JSON",
+    "ALTER TABLE pothole_reports ADD COLUMN IF NOT EXISTS grid_cell BIGINT",
+    # Cells of rows created before the column (same arithmetic as dup_utils.grid_cell)
+    f"""UPDATE pothole_reports
+        SET grid_cell = FLOOR((latitude + 90) / {GRID_CELL_DEGREES})::BIGINT * {GRID_COLUMNS}
+                      + FLOOR((longitude + 180) / {GRID_CELL_DEGREES})::BIGINT
+        WHERE grid_cell IS NULL AND latitude IS NOT NULL AND longitude IS NOT NULL""",
+    "CREATE INDEX IF NOT EXISTS ix_pothole_reports_grid_cell_date_created ON pothole_reports (grid_cell, date_created)",
+    "CREATE INDEX IF NOT EXISTS ix_pothole_reports_user_id_date_created ON pothole_reports (user_id, date_created)",
+    "CREATE INDEX IF NOT EXISTS ix_pothole_reports_last_date_status_update ON pothole_reports (last_date_status_update)",
+    "ALTER TABLE pothole_reports ADD COLUMN IF NOT EXISTS incident_id INTEGER REFERENCES pothole_incidents(id) ON DELETE SET NULL",
+    "CREATE INDEX IF NOT EXISTS ix_pothole_reports_incident_id ON pothole_reports (incident_id)",
+    # Orphan sweeper: which stored photos a report still points at
+    *(
+        f"CREATE INDEX IF NOT EXISTS ix_pothole_reports_{column}_identity "
+        f"ON pothole_reports (({photo_identity_sql(column)}))"
+        for column in ("photo_top", "photo_far", "photo_close")
+    ),
+]
+
+
+def upgrade_schema():
+    """Apply pending column additions to an existing database"""
+    with engine.begin() as conn:
+        for statement in SCHEMA_UPGRADES:
+            conn.execute(text(statement))
+
+
+if __name__ == "__main__":
+    upgrade_schema()
+    print("Database schema upgraded successfully!")
@@ -0,0 +1,53 @@
+"""
+Backfill the grid_cell column of existing pothole reports.
+
+New reports get their cell on insert (see models/report.py), and
+upgrade_schema() fills in older rows in one UPDATE at startup. This does the
+same in batches, for tables too large for one transaction, computing the
+cell in SQL with the same arithmetic as services.helpers.dup_utils.grid_cell.
+
+Usage (from backend/):
+    python -m services.db.backfill_grid_cells [--batch-size 5000]
+"""
+import argparse
+
+from sqlalchemy import text
+
+from services.database.connect import engine
+from services.helpers.dup_utils import GRID_CELL_DEGREES, GRID_COLUMNS
+
+_BACKFILL_BATCH = text("""
+    UPDATE pothole_reports
+    SET grid_cell = FLOOR((latitude + 90) / :cell_degrees)::BIGINT * :columns
+                  + FLOOR((longitude + 180) / :cell_degrees)::BIGINT
+    WHERE case_id IN (
+        SELECT case_id FROM pothole_reports
+        WHERE grid_cell IS NULL
+        LIMIT :batch_size
+    )
+""")
+
+
+def backfill_grid_cells(batch_size: int = 5000) -> int:
+    updated = 0
+    while True:
+        # One short transaction per batch to keep row locks brief
+        with engine.begin() as conn:
+            count = conn.execute(_BACKFILL_BATCH, {
+                "cell_degrees": GRID_CELL_DEGREES,
+                "columns": GRID_COLUMNS,
+                "batch_size": batch_size,
+            }).rowcount
+        if not count:
+            return updated
+        updated += count
+        print(f"   Updated {updated} reports")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill grid cells of pothole reports")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    total = backfill_grid_cells(batch_size=args.batch_size)
+    print(f"✅ Backfilled grid cells for {total} reports")
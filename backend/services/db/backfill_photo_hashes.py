@@ -0,0 +1,114 @@
+"""
+Backfill perceptual hashes for existing pothole reports.
+
+Downloads the three photos of every report that has no hashes yet, computes
+their dHash on the image process pool and writes them back in bulk.
+
+Usage (from backend/):
+    python -m services.db.backfill_photo_hashes [--batch-size 200] [--download-workers 16]
+"""
+import argparse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import bindparam, func, update
+
+from services.database.connect import SessionLocal
+from services.images.phash import IMAGE_TYPES, dhash_bytes, to_signed
+from services.images.preprocess import get_process_pool
+from models.report import PotholeReport
+
+DOWNLOAD_TIMEOUT = 30
+
+# Executemany update; hashes are not a status change, so last_date_status_update
+# is written back unchanged instead of firing its onupdate. phash_at moves so
+# running API workers pick the hashes up on their next index refresh
+_table = PotholeReport.__table__
+_UPDATE = (
+    update(_table)
+    .where(_table.c.case_id == bindparam("report_id"))
+    .values(
+        last_date_status_update=_table.c.last_date_status_update,
+        phash_at=func.now(),
+        **{f"phash_{t}": bindparam(f"hash_{t}") for t in IMAGE_TYPES},
+    )
+)
+
+
+def _download(url: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as response:
+        return response.read()
+
+
+def _hash_url(downloads: ThreadPoolExecutor, url: str):
+    """Download on a thread, hash on the process pool; None when the photo is unusable"""
+    try:
+        data = downloads.submit(_download, url).result()
+        return get_process_pool().submit(dhash_bytes, data).result()
+    except Exception as e:
+        print(f"   ⚠️ Could not hash {url}: {e}")
+        return None
+
+
+def backfill_photo_hashes(batch_size: int = 200, download_workers: int = 16) -> int:
+    db = SessionLocal()
+    updated = 0
+    last_case_id = ""
+    try:
+        with ThreadPoolExecutor(max_workers=download_workers) as downloads, \
+                ThreadPoolExecutor(max_workers=download_workers) as hashers:
+            while True:
+                # Keyset pagination so each batch is an index range scan
+                rows = (
+                    db.query(
+                        PotholeReport.case_id,
+                        PotholeReport.photo_top,
+                        PotholeReport.photo_far,
+                        PotholeReport.photo_close,
+                    )
+                    .filter(PotholeReport.phash_top.is_(None), PotholeReport.case_id > last_case_id)
+                    .order_by(PotholeReport.case_id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not rows:
+                    break
+                last_case_id = rows[-1].case_id
+
+                jobs = {
+                    (row.case_id, image_type): hashers.submit(
+                        _hash_url, downloads, getattr(row, f"photo_{image_type}")
+                    )
+                    for row in rows
+                    for image_type in IMAGE_TYPES
+                }
+
+                mappings = []
+                for row in rows:
+                    hashes = {t: jobs[(row.case_id, t)].result() for t in IMAGE_TYPES}
+                    if any(value is None for value in hashes.values()):
+                        continue
+                    mappings.append({
+                        "report_id": row.case_id,
+                        **{f"hash_{t}": to_signed(value) for t, value in hashes.items()},
+                    })
+
+                if mappings:
+                    db.execute(_UPDATE, mappings)
+                db.commit()
+                updated += len(mappings)
+                print(f"   Hashed {updated} reports (last: {last_case_id})")
+    finally:
+        db.close()
+
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill perceptual photo hashes")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--download-workers", type=int, default=16)
+    args = parser.parse_args()
+
+    total = backfill_photo_hashes(batch_size=args.batch_size, download_workers=args.download_workers)
+    print(f"✅ Backfilled photo hashes for {total} reports")
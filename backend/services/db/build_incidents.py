@@ -0,0 +1,51 @@
+"""
+Cluster existing pothole reports into incidents.
+
+New reports join their incident on insert (see routers/homepage.py). This
+replays the same online clustering over reports that have no incident yet,
+oldest first. Each report commits on its own, like a submission, so the
+neighborhood advisory locks it takes (IncidentService._lock_area) are held
+for one report instead of piling up across a batch.
+
+Usage (from backend/):
+    python -m services.db.build_incidents [--batch-size 500]
+"""
+import argparse
+
+from services.database.connect import SessionLocal
+from services.helpers.incidents import IncidentService
+from models.report import PotholeReport
+
+
+def build_incidents(batch_size: int = 500) -> int:
+    db = SessionLocal()
+    clustered = 0
+    try:
+        while True:
+            reports = (
+                db.query(PotholeReport)
+                .filter(PotholeReport.incident_id.is_(None))
+                .order_by(PotholeReport.date_created, PotholeReport.case_id)
+                .limit(batch_size)
+                .all()
+            )
+            if not reports:
+                break
+            for report in reports:
+                IncidentService.add_report(db, report)
+                db.commit()
+            clustered += len(reports)
+            print(f"   Clustered {clustered} reports")
+    finally:
+        db.close()
+
+    return clustered
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cluster existing reports into incidents")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    total = build_incidents(batch_size=args.batch_size)
+    print(f"✅ Clustered {total} reports into incidents")
@@ -10,6 +10,7 @@ from database.connect import Base, engine
 from models.users import User
 from models.report import PotholeReport
 from auth.security import get_password_hash
+from helpers.gencaseid import DISTRICT_CODES
 
 # --- Load environment variables ---
 load_dotenv()
@@ -41,12 +42,7 @@ EXTRA_EMAILS = [
 ALL_EMAILS = TEAM_EMAILS + EXTRA_EMAILS
 
 # --- Data pools ---
-districts = [
-    "Kota Kinabalu", "Sandakan", "Tawau", "Penampang", "Putatan",
-    "Papar", "Tuaran", "Kudat", "Beaufort", "Ranau",
-    "Kota Belud", "Keningau", "Semporna", "Kuala Penyu", 
-    "Lahad Datu", "Others"
-]
+districts = list(DISTRICT_CODES)  # same names and codes the API accepts
 
 statuses = ["Submitted", "Under Review", "In Progress", "Completed", "Rejected"]
 severity_levels = ["Low", "Medium", "High"]
@@ -164,7 +160,7 @@ def calculate_community_data():
 # --- Helpers ---
 def generate_case_id(district, created_date, sequence_counters):
     """Generate case_id: SRC_DISTRICTCODE_YYYY_MM_####"""
-    district_code = district.split()[0][:3].upper()
+    district_code = DISTRICT_CODES[district]
     year_part = str(created_date.year)
     month_part = f"{created_date.month:02d}"
     counter_key = f"{district_code}_{year_part}_{month_part}"
@@ -0,0 +1,94 @@
+"""
+Reassign the district of existing pothole reports (and incidents) from their
+coordinates, using the same boundary lookup as report submission
+(services.helpers.districts), so per-district dashboard filters agree with
+where the reports actually are.
+
+Rows are streamed and only those whose district changes are written, in bulk.
+Case IDs keep the district code they were issued with. Points outside every
+district are left as they are and counted.
+
+Usage (from backend/):
+    python -m services.db.reassign_districts [--batch-size 5000] [--dry-run]
+"""
+import argparse
+from collections import Counter
+from typing import Dict, List
+
+from sqlalchemy import bindparam, update
+
+from services.database.connect import SessionLocal
+from services.helpers.districts import district_resolver
+from models.incident import PotholeIncident
+from models.report import PotholeReport
+
+
+def _reassign(model, key, batch_size: int, dry_run: bool) -> Dict[str, int]:
+    reader = SessionLocal()
+    writer = SessionLocal()
+    changes: Counter = Counter()
+    scanned = unresolved = 0
+    pending: List[Dict] = []
+
+    table = model.__table__
+    statement = update(table).where(table.c[key.key] == bindparam("row_key"))
+    if "last_date_status_update" in table.c:
+        # A district correction is not a status change: don't fire the onupdate
+        statement = statement.values(last_date_status_update=table.c.last_date_status_update)
+
+    def flush():
+        nonlocal pending
+        if pending and not dry_run:
+            writer.execute(statement, pending)
+            writer.commit()
+        pending = []
+
+    try:
+        stream = (
+            reader.query(key, model.district, model.latitude, model.longitude)
+            .order_by(key)
+            .execution_options(yield_per=batch_size)
+        )
+        for row in stream:
+            scanned += 1
+            district = district_resolver.resolve(row.latitude, row.longitude)
+            if district is None:
+                unresolved += 1
+                continue
+            if district != row.district:
+                changes[(row.district, district)] += 1
+                pending.append({"row_key": getattr(row, key.key), "district": district})
+                if len(pending) >= batch_size:
+                    flush()
+        flush()
+    finally:
+        reader.close()
+        writer.close()
+
+    for (old, new), count in changes.most_common():
+        print(f"   {old} → {new}: {count}")
+    return {"scanned": scanned, "changed": sum(changes.values()), "unresolved": unresolved}
+
+
+def reassign_districts(batch_size: int = 5000, dry_run: bool = False) -> Dict[str, Dict[str, int]]:
+    if not district_resolver.ensure_loaded():
+        raise SystemExit("District boundaries are not available; set DISTRICT_BOUNDARIES_PATH")
+
+    print("📍 Reports")
+    reports = _reassign(PotholeReport, PotholeReport.case_id, batch_size, dry_run)
+    print("📍 Incidents")
+    incidents = _reassign(PotholeIncident, PotholeIncident.id, batch_size, dry_run)
+    return {"reports": reports, "incidents": incidents}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reassign report districts from their coordinates")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    args = parser.parse_args()
+
+    result = reassign_districts(batch_size=args.batch_size, dry_run=args.dry_run)
+    verb = "Would reassign" if args.dry_run else "Reassigned"
+    for name, stats in result.items():
+        print(f"✅ {verb} {stats['changed']} of {stats['scanned']} {name} "
+              f"({stats['unresolved']} outside every district)")
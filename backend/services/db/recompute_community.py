@@ -0,0 +1,198 @@
+"""
+Recompute similar_reports_count, unique_users_count and community_multiplier
+for every pothole report.
+
+For each report, "similar" reports are other users' reports within the radius
+filed in the window before it, the same rule the submit-time duplicate check
+applies. Rather than one radius query per report, reports are streamed
+sorted by grid_cell (row-major, so grid row by grid row) and swept with a
+window of three grid rows: once row r+1 has been read, every report in row r
+can be compared against its 3x3 neighboring cells in memory. Memory stays
+bounded by three rows of reports; results are written back in bulk.
+
+Usage (from backend/):
+    python -m services.db.recompute_community [--radius 100] [--days 30] [--batch-size 5000]
+"""
+import argparse
+from datetime import timezone
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy import bindparam, update
+
+from services.database.connect import SessionLocal
+from services.helpers.dup_utils import GRID_COLUMNS, haversine_matrix
+from services.helpers.incidents import community_multiplier
+from models.report import PotholeReport
+
+# Neighboring cells only cover the radius while it is below the cell size (~110 m)
+MAX_RADIUS_METERS = 100
+# Reports of one cell compared at a time (bounds the pairwise distance matrix)
+BLOCK_SIZE = 512
+
+# Bulk UPDATE by case_id (SET columns come from the parameter keys). A recount
+# is not a status change: last_date_status_update must not fire its onupdate.
+_UPDATE = (
+    update(PotholeReport.__table__)
+    .where(PotholeReport.__table__.c.case_id == bindparam("report_id"))
+    .values(last_date_status_update=PotholeReport.__table__.c.last_date_status_update)
+)
+
+
+class _Cell:
+    """Reports of one grid cell as parallel arrays"""
+
+    def __init__(self, rows):
+        self.case_ids = [row.case_id for row in rows]
+        self.latitudes = np.array([row.latitude for row in rows], dtype=np.float64)
+        self.longitudes = np.array([row.longitude for row in rows], dtype=np.float64)
+        self.user_ids = np.array([row.user_id for row in rows], dtype=np.int64)
+        self.timestamps = np.array([_timestamp(row.date_created) for row in rows], dtype=np.float64)
+
+
+def _timestamp(value) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _concat(cells: List[_Cell]):
+    return (
+        np.concatenate([c.latitudes for c in cells]),
+        np.concatenate([c.longitudes for c in cells]),
+        np.concatenate([c.user_ids for c in cells]),
+        np.concatenate([c.timestamps for c in cells]),
+    )
+
+
+def _compute_row(rows: Dict[int, Dict[int, _Cell]], row: int, radius: float, window: float) -> List[Dict]:
+    """Community metrics of every report in grid row `row`"""
+    mappings = []
+    for column, cell in rows[row].items():
+        neighbors = [
+            rows[r][c]
+            for r in (row - 1, row, row + 1) if r in rows
+            for c in (column - 1, column, column + 1) if c in rows[r]
+        ]
+        latitudes, longitudes, user_ids, timestamps = _concat(neighbors)
+
+        for start in range(0, len(cell.case_ids), BLOCK_SIZE):
+            block = slice(start, start + BLOCK_SIZE)
+            block_users = cell.user_ids[block][:, None]
+            block_times = cell.timestamps[block][:, None]
+            similar = (
+                (haversine_matrix(cell.latitudes[block], cell.longitudes[block], latitudes, longitudes) <= radius)
+                & (user_ids[None, :] != block_users)
+                & (timestamps[None, :] <= block_times)
+                & (timestamps[None, :] >= block_times - window)
+            )
+            counts = similar.sum(axis=1)
+            for offset, case_id in enumerate(cell.case_ids[block]):
+                similar_count = int(counts[offset])
+                unique_users = int(np.unique(user_ids[similar[offset]]).size) + 1  # + the reporter
+                mappings.append({
+                    "case_id": case_id,
+                    "similar_reports_count": similar_count,
+                    "unique_users_count": unique_users,
+                    "community_multiplier": community_multiplier(similar_count + 1, unique_users),
+                })
+    return mappings
+
+
+def _write_mappings(writer, mappings: List[Dict]) -> None:
+    writer.execute(_UPDATE, [
+        {"report_id": m["case_id"], **{k: v for k, v in m.items() if k != "case_id"}} for m in mappings
+    ])
+    writer.commit()
+
+
+def recompute_community(radius: float = MAX_RADIUS_METERS, days: int = 30, batch_size: int = 5000) -> int:
+    if radius > MAX_RADIUS_METERS:
+        raise ValueError(f"Radius must be at most {MAX_RADIUS_METERS} m (one grid cell)")
+    window = days * 86400
+
+    reader = SessionLocal()
+    writer = SessionLocal()
+    updated = 0
+    pending: List[Dict] = []
+
+    def write(mappings):
+        nonlocal updated, pending
+        pending.extend(mappings)
+        if len(pending) >= batch_size:
+            _write_mappings(writer, pending)
+            updated += len(pending)
+            pending = []
+            print(f"   Updated {updated} reports")
+
+    try:
+        skipped = reader.query(PotholeReport.case_id).filter(PotholeReport.grid_cell.is_(None)).count()
+        if skipped:
+            print(f"   ⚠️ {skipped} reports have no grid cell; run services.db.backfill_grid_cells first")
+
+        stream = (
+            reader.query(
+                PotholeReport.case_id,
+                PotholeReport.user_id,
+                PotholeReport.latitude,
+                PotholeReport.longitude,
+                PotholeReport.date_created,
+                PotholeReport.grid_cell,
+            )
+            .filter(PotholeReport.grid_cell.isnot(None))
+            .order_by(PotholeReport.grid_cell, PotholeReport.date_created)
+            .execution_options(yield_per=batch_size)
+        )
+
+        rows: Dict[int, Dict[int, _Cell]] = {}   # grid row -> column -> reports
+        done_through = None                      # last grid row whose metrics were written
+        current_cell, current_rows = None, []
+
+        def close_cell():
+            if current_rows:
+                row, column = divmod(current_cell, GRID_COLUMNS)
+                rows.setdefault(row, {})[column] = _Cell(current_rows)
+
+        def sweep(up_to_row):
+            """Compute rows whose neighbors are complete, then drop rows no longer needed"""
+            nonlocal done_through
+            for row in sorted(r for r in rows if r <= up_to_row and (done_through is None or r > done_through)):
+                write(_compute_row(rows, row, radius, window))
+                done_through = row
+            for row in [r for r in rows if done_through is not None and r < done_through]:
+                del rows[row]
+
+        for report in stream:
+            if report.grid_cell != current_cell:
+                close_cell()
+                previous_row = current_cell // GRID_COLUMNS if current_cell is not None else None
+                current_cell, current_rows = report.grid_cell, []
+                new_row = current_cell // GRID_COLUMNS
+                if previous_row is not None and new_row != previous_row:
+                    # Rows before new_row are complete: rows up to new_row - 2 have
+                    # both neighbors read
+                    sweep(new_row - 2)
+            current_rows.append(report)
+
+        close_cell()
+        sweep(max(rows) if rows else -1)
+
+        if pending:
+            _write_mappings(writer, pending)
+            updated += len(pending)
+    finally:
+        reader.close()
+        writer.close()
+
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute community metrics of all pothole reports")
+    parser.add_argument("--radius", type=float, default=MAX_RADIUS_METERS)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    total = recompute_community(radius=args.radius, days=args.days, batch_size=args.batch_size)
+    print(f"✅ Recomputed community metrics for {total} reports")
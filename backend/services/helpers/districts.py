@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+from decouple import config
+from fastapi import HTTPException
+
+from .gencaseid import DISTRICTS
+
+# GeoJSON FeatureCollection of Sabah district boundaries (Polygon/MultiPolygon),
+# with the district name in DISTRICT_NAME_PROPERTY. Not shipped with the repo;
+# without it, the client-supplied district is validated against DISTRICTS as before.
+DISTRICT_BOUNDARIES_PATH = config('DISTRICT_BOUNDARIES_PATH', default='data/sabah_districts.geojson')
+DISTRICT_NAME_PROPERTY = config('DISTRICT_NAME_PROPERTY', default='name')
+# Raster cell size (~1.1 km): points in cells inside a single district resolve
+# with one array lookup, only cells crossed by a boundary need polygon tests
+RASTER_DEGREES = config('DISTRICT_RASTER_DEGREES', default=0.01, cast=float)
+
+OUTSIDE = 255   # raster value: cell touches no district
+BOUNDARY = 254  # raster value: cell crosses a boundary, test the polygons
+
+
+class DistrictResolver:
+    """Point -> district name, from boundary polygons"""
+
+    def __init__(self, path: str = DISTRICT_BOUNDARIES_PATH):
+        self.path = path
+        self.names: List[str] = []
+        self._geometries = []
+        self._tree = None
+        self._raster: Optional[np.ndarray] = None
+        self._origin = (0.0, 0.0)  # (min_lon, min_lat)
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.available = True
+
+    def _load(self) -> None:
+        """Build the polygons, tree and raster; called with self._lock held"""
+        try:
+            from shapely import STRtree, box, prepare
+            from shapely.geometry import shape
+        except ImportError:
+            print("⚠️ shapely is not installed, district resolution disabled")
+            self.available = False
+            return
+        if not os.path.exists(self.path):
+            print(f"⚠️ District boundaries not found at {self.path}, district resolution disabled")
+            self.available = False
+            return
+
+        with open(self.path, encoding="utf-8") as f:
+            features = json.load(f)["features"]
+
+        known = {name.lower(): name for name in DISTRICTS}
+        names, geometries = [], []
+        for feature in features:
+            raw_name = str(feature.get("properties", {}).get(DISTRICT_NAME_PROPERTY, ""))
+            name = known.get(raw_name.strip().lower())
+            if name is None:
+                print(f"⚠️ Skipping boundary of unknown district: {raw_name!r}")
+                continue
+            geometry = shape(feature["geometry"])
+            prepare(geometry)
+            names.append(name)
+            geometries.append(geometry)
+        if not geometries:
+            self.available = False
+            return
+
+        tree = STRtree(geometries)
+
+        # Raster over the bounding box of all districts
+        min_lon = min(g.bounds[0] for g in geometries)
+        min_lat = min(g.bounds[1] for g in geometries)
+        max_lon = max(g.bounds[2] for g in geometries)
+        max_lat = max(g.bounds[3] for g in geometries)
+        rows = int(np.ceil((max_lat - min_lat) / RASTER_DEGREES))
+        columns = int(np.ceil((max_lon - min_lon) / RASTER_DEGREES))
+        row_index, column_index = np.divmod(np.arange(rows * columns), columns)
+        cells = box(
+            min_lon + column_index * RASTER_DEGREES,
+            min_lat + row_index * RASTER_DEGREES,
+            min_lon + (column_index + 1) * RASTER_DEGREES,
+            min_lat + (row_index + 1) * RASTER_DEGREES,
+        )
+
+        raster = np.full(rows * columns, OUTSIDE, dtype=np.uint8)
+        touched, _ = tree.query(cells, predicate="intersects")
+        raster[touched] = BOUNDARY
+        inside, district = tree.query(cells, predicate="within")
+        raster[inside] = district
+
+        self.names = names
+        self._geometries = geometries
+        self._tree = tree
+        self._raster = raster.reshape(rows, columns)
+        self._origin = (min_lon, min_lat)
+        self.loaded = True  # last: resolve() reads the fields above without the lock
+        print(f"✅ Loaded {len(names)} district boundaries ({rows}x{columns} lookup grid)")
+
+    def ensure_loaded(self) -> bool:
+        """Load boundaries on first use; False when resolution is unavailable"""
+        if not self.loaded and self.available:
+            with self._lock:
+                # Another thread may have loaded them while this one waited
+                if not self.loaded and self.available:
+                    self._load()
+        return self.loaded
+
+    def resolve(self, latitude: float, longitude: float) -> Optional[str]:
+        """District containing the point, or None when it is outside every district"""
+        if not self.ensure_loaded():
+            return None
+        from shapely import Point
+
+        min_lon, min_lat = self._origin
+        row = int((latitude - min_lat) // RASTER_DEGREES)
+        column = int((longitude - min_lon) // RASTER_DEGREES)
+        rows, columns = self._raster.shape
+        if not (0 <= row < rows and 0 <= column < columns):
+            return None
+
+        value = self._raster[row, column]
+        if value == OUTSIDE:
+            return None
+        if value != BOUNDARY:
+            return self.names[value]
+
+        point = Point(longitude, latitude)
+        for candidate in self._tree.query(point):
+            if self._geometries[candidate].covers(point):
+                return self.names[candidate]
+        return None
+
+
+# Process-wide singleton
+district_resolver = DistrictResolver()
+
+
+def resolve_district(latitude: float, longitude: float, claimed: Optional[str] = None) -> str:
+    """
+    District of a report, derived from its coordinates when boundaries are
+    available; otherwise the client-supplied name, validated.
+    """
+    if district_resolver.ensure_loaded():
+        district = district_resolver.resolve(latitude, longitude)
+        if district is None:
+            raise HTTPException(status_code=400, detail="Location is outside Sabah's districts")
+        return district
+
+    if claimed not in DISTRICTS:
+        raise HTTPException(status_code=400, detail=f"Invalid district: {claimed}")
+    return claimed
@@ -1,6 +1,14 @@
 import math
+from typing import List
+import numpy as np
 from geopy.distance import geodesic
 
+# Spatial grid for index-driven proximity queries: 0.001° cells (~111 m north-south,
+# ~110 m east-west in Sabah), numbered row-major from (-90, -180)
+GRID_CELL_DEGREES = 0.001
+GRID_COLUMNS = 360000  # 360 / GRID_CELL_DEGREES
+METERS_PER_DEGREE_LAT = 111000
+
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate distance between two coordinates in meters"""
     try:
@@ -19,6 +27,57 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
         c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
         return R * c
 
+# Mean Earth radius (IUGG). Against the WGS84 geodesic used by calculate_distance,
+# the spherical haversine is off by at most ~0.6% at Sabah's latitudes (north-south
+# distances read slightly long, east-west slightly short): under 0.6 m at 100 m.
+EARTH_RADIUS_METERS = 6371008.8
+HAVERSINE_TOLERANCE = 0.006  # relative
+
+
+def haversine_distances(latitude: float, longitude: float, latitudes, longitudes) -> np.ndarray:
+    """Distances in meters from one point to arrays of points, in one vectorized pass"""
+    lat1 = math.radians(latitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=np.float64))
+    delta_lat = lat2 - lat1
+    delta_lon = np.radians(np.asarray(longitudes, dtype=np.float64) - longitude)
+
+    a = np.sin(delta_lat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(delta_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def haversine_matrix(latitudes1, longitudes1, latitudes2, longitudes2) -> np.ndarray:
+    """Pairwise distances in meters, shape (len(points1), len(points2))"""
+    lat1 = np.radians(np.asarray(latitudes1, dtype=np.float64))[:, None]
+    lon1 = np.radians(np.asarray(longitudes1, dtype=np.float64))[:, None]
+    lat2 = np.radians(np.asarray(latitudes2, dtype=np.float64))[None, :]
+    lon2 = np.radians(np.asarray(longitudes2, dtype=np.float64))[None, :]
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
 def generate_location_hash(latitude: float, longitude: float, precision: int = 4) -> str:
     """Generate a location hash for duplicate detection"""
     return f"{round(latitude, precision)}_{round(longitude, precision)}"
+
+
+def _cell_index(latitude: float, longitude: float):
+    # Same arithmetic as the SQL in services/db/backfill_grid_cells.py, so both agree exactly
+    return math.floor((latitude + 90) / GRID_CELL_DEGREES), math.floor((longitude + 180) / GRID_CELL_DEGREES)
+
+
+def grid_cell(latitude: float, longitude: float) -> int:
+    """Grid cell id stored in PotholeReport.grid_cell"""
+    row, column = _cell_index(latitude, longitude)
+    return row * GRID_COLUMNS + column
+
+
+def neighbor_cells(latitude: float, longitude: float, radius_meters: float) -> List[int]:
+    """Every grid cell overlapping the bounding box of a radius around a point (9 cells for 100 m)"""
+    lat_range = radius_meters / METERS_PER_DEGREE_LAT
+    lon_range = radius_meters / (METERS_PER_DEGREE_LAT * math.cos(math.radians(latitude)))
+    min_row, min_column = _cell_index(latitude - lat_range, longitude - lon_range)
+    max_row, max_column = _cell_index(latitude + lat_range, longitude + lon_range)
+    return [
+        row * GRID_COLUMNS + column
+        for row in range(min_row, max_row + 1)
+        for column in range(min_column, max_column + 1)
+    ]
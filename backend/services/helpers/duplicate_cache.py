@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from decouple import config
+
+from .dup_utils import generate_location_hash, grid_cell, neighbor_cells
+from .recent_reports import recent_report_index
+
+DUPLICATE_CACHE_SIZE = config('DUPLICATE_CACHE_SIZE', default=4096, cast=int)
+DUPLICATE_CACHE_TTL_SECONDS = config('DUPLICATE_CACHE_TTL_SECONDS', default=30, cast=int)
+
+CacheKey = Tuple[int, str, int]
+
+
+class DuplicateCheckCache:
+    """
+    Bounded LRU + TTL cache of duplicate-check previews, keyed on
+    (user_id, generate_location_hash(lat, lon), radius). Pins dragged a few
+    meters land in the same ~11 m location hash and are served from memory.
+
+    Every entry is registered under the grid cells its search radius covers;
+    a report saved in one of those cells drops the entry.
+    """
+
+    def __init__(self, maxsize: int = DUPLICATE_CACHE_SIZE, ttl: float = DUPLICATE_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Dict[str, Any], Tuple[int, ...]]]" = OrderedDict()
+        self._by_cell: Dict[int, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(user_id: int, latitude: float, longitude: float, radius_meters: int) -> CacheKey:
+        return (user_id, generate_location_hash(latitude, longitude), radius_meters)
+
+    def _drop(self, key: CacheKey) -> None:
+        _, _, cells = self._entries.pop(key)
+        for cell in cells:
+            keys = self._by_cell.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_cell[cell]
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: CacheKey, latitude: float, longitude: float, value: Dict[str, Any]) -> None:
+        cells = tuple(neighbor_cells(latitude, longitude, key[2]))
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, cells)
+            for cell in cells:
+                self._by_cell.setdefault(cell, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_point(self, latitude: float, longitude: float) -> None:
+        """A report was saved at (lat, lon): drop every preview whose radius covers its cell"""
+        with self._lock:
+            for key in list(self._by_cell.get(grid_cell(latitude, longitude), ())):
+                self._drop(key)
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# Process-wide singleton
+duplicate_check_cache = DuplicateCheckCache()
+
+# Reports saved by this worker, and those picked up from other workers by the
+# recent-report index refresh, invalidate the previews around them
+recent_report_index.listeners.append(
+    lambda report: duplicate_check_cache.invalidate_point(report.latitude, report.longitude)
+)
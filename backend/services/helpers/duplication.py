@@ -1,88 +1,123 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, or_
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from models import PotholeReport
 import math
+import time
+import numpy as np
 
 # Import utilities
-from .dup_utils import calculate_distance, generate_location_hash
+from .dup_utils import generate_location_hash, haversine_distances, neighbor_cells
+from .recent_reports import REFRESH_OVERLAP, REFRESH_SECONDS, RecentReport, recent_report_index
+from services.images.phash import photo_hash_index
 
 class DuplicationService:
     """Service for handling duplicate report detection and analysis"""
 
-    @staticmethod
-    def get_user_recent_reports(db: Session, user_id: int, hours_back: int = 72) -> List[PotholeReport]:
-        """Get user's recent reports within specified hours"""
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours_back)
-        return (
-            db.query(PotholeReport)
-            .filter(
-                and_(
-                    PotholeReport.user_id == user_id,
-                    PotholeReport.date_created >= cutoff_time
-                )
-            )
-            .all()
-        )
+    # Only the columns the analyses read (no AI details JSON or photo URLs)
+    CANDIDATE_COLUMNS = (
+        PotholeReport.case_id,
+        PotholeReport.user_id,
+        PotholeReport.latitude,
+        PotholeReport.longitude,
+        PotholeReport.date_created,
+        PotholeReport.status,
+        PotholeReport.severity,
+        PotholeReport.location,
+    )
 
     @staticmethod
-    def get_nearby_reports(
+    def get_candidate_reports(
         db: Session,
+        user_id: int,
         latitude: float,
         longitude: float,
         radius_meters: int = 100,
-        days_back: int = 30,
-        exclude_user_id: int = None
-    ) -> List[PotholeReport]:
-        """Get reports within specified radius and time range"""
-        cutoff_time = datetime.utcnow() - timedelta(days=days_back)
-
-        # Bounding box (fast DB filter)
+        hours_back: int = 72,
+        days_back: int = 30
+    ) -> Tuple[List[RecentReport], List[RecentReport]]:
+        """
+        One round trip for both checks: the user's own reports from the last
+        hours_back hours, and other users' reports near the point from the
+        last days_back days. Returns (own, others) as lightweight tuples.
+        """
+        now = datetime.utcnow()
+
+        # Bounding box (fast DB filter): grid cells drive the (grid_cell, date_created)
+        # index, the coordinate bounds trim the cell edges
         lat_range = radius_meters / 111000
         lon_range = radius_meters / (111000 * math.cos(math.radians(latitude)))
 
-        query = db.query(PotholeReport).filter(
-            and_(
-                PotholeReport.latitude.between(latitude - lat_range, latitude + lat_range),
-                PotholeReport.longitude.between(longitude - lon_range, longitude + lon_range),
-                PotholeReport.date_created >= cutoff_time
+        is_own = (PotholeReport.user_id == user_id).label("is_own")
+        rows = (
+            db.query(*DuplicationService.CANDIDATE_COLUMNS, is_own)
+            .filter(
+                or_(
+                    and_(
+                        PotholeReport.user_id == user_id,
+                        PotholeReport.date_created >= now - timedelta(hours=hours_back)
+                    ),
+                    and_(
+                        PotholeReport.grid_cell.in_(neighbor_cells(latitude, longitude, radius_meters)),
+                        PotholeReport.latitude.between(latitude - lat_range, latitude + lat_range),
+                        PotholeReport.longitude.between(longitude - lon_range, longitude + lon_range),
+                        PotholeReport.date_created >= now - timedelta(days=days_back),
+                        PotholeReport.user_id != user_id
+                    )
+                )
             )
+            .all()
         )
 
-        if exclude_user_id:
-            query = query.filter(PotholeReport.user_id != exclude_user_id)
+        own, others = [], []
+        for row in rows:
+            (own if row.is_own else others).append(RecentReport.from_row(row))
+        return own, others
 
-        return query.all()
+    @staticmethod
+    def get_user_reports(db: Session, user_id: int, since: datetime) -> List[RecentReport]:
+        """The user's reports created since `since` (served by the (user_id, date_created) index)"""
+        rows = (
+            db.query(*DuplicationService.CANDIDATE_COLUMNS)
+            .filter(PotholeReport.user_id == user_id, PotholeReport.date_created >= since)
+            .all()
+        )
+        return [RecentReport.from_row(row) for row in rows]
 
     @staticmethod
     def analyze_user_duplicates(
-        user_reports: List[PotholeReport],
+        user_reports: List[RecentReport],
         target_latitude: float,
         target_longitude: float,
         radius_meters: int = 100,
         blocking_hours: int = 72
     ) -> Dict[str, Any]:
         """Analyze user's duplicate submissions (blocking check)"""
-        current_time = datetime.utcnow()
+        current_time = time.time()
         duplicates = []
 
-        for report in user_reports:
-            distance = calculate_distance(target_latitude, target_longitude, report.latitude, report.longitude)
-
-            if distance <= radius_meters:
-                hours_ago = (current_time - report.date_created).total_seconds() / 3600
-                remaining_hours = max(0, blocking_hours - hours_ago)
+        # One vectorized haversine over all candidates instead of a geodesic solve per row
+        distances = haversine_distances(
+            target_latitude, target_longitude,
+            [report.latitude for report in user_reports],
+            [report.longitude for report in user_reports]
+        )
 
-                duplicates.append({
-                    'report_id': report.id,
-                    'case_id': report.case_id,
-                    'distance': round(distance, 2),
-                    'hours_ago': round(hours_ago, 1),
-                    'remaining_hours': round(remaining_hours, 1),
-                    'location': report.location,
-                    'status': report.status
-                })
+        for index in np.flatnonzero(distances <= radius_meters):
+            report = user_reports[index]
+            distance = float(distances[index])
+            hours_ago = (current_time - report.created_ts) / 3600
+            remaining_hours = max(0, blocking_hours - hours_ago)
+
+            duplicates.append({
+                'case_id': report.case_id,
+                'distance': round(distance, 2),
+                'hours_ago': round(hours_ago, 1),
+                'remaining_hours': round(remaining_hours, 1),
+                'location': report.location,
+                'status': report.status
+            })
 
         return {
             'has_duplicates': len(duplicates) > 0,
@@ -93,33 +128,36 @@ class DuplicationService:
 
     @staticmethod
     def analyze_similar_reports(
-        nearby_reports: List[PotholeReport],
+        nearby_reports: List[RecentReport],
         target_latitude: float,
         target_longitude: float,
         radius_meters: int = 100
     ) -> Dict[str, Any]:
         """Analyze similar reports for priority calculation"""
-        current_time = datetime.utcnow()
+        current_time = time.time()
         similar_reports = []
         unique_users = set()
 
-        for report in nearby_reports:
-            distance = calculate_distance(target_latitude, target_longitude, report.latitude, report.longitude)
-
-            if distance <= radius_meters:
-                hours_ago = (current_time - report.date_created).total_seconds() / 3600
+        distances = haversine_distances(
+            target_latitude, target_longitude,
+            [report.latitude for report in nearby_reports],
+            [report.longitude for report in nearby_reports]
+        )
 
-                similar_reports.append({
-                    'report_id': report.id,
-                    'case_id': report.case_id,
-                    'distance': round(distance, 2),
-                    'hours_ago': round(hours_ago, 1),
-                    'user_id': report.user_id,
-                    'status': report.status,
-                    'location': report.location,
-                    'severity': report.severity
-                })
-                unique_users.add(report.user_id)
+        for index in np.flatnonzero(distances <= radius_meters):
+            report = nearby_reports[index]
+            hours_ago = (current_time - report.created_ts) / 3600
+
+            similar_reports.append({
+                'case_id': report.case_id,
+                'distance': round(float(distances[index]), 2),
+                'hours_ago': round(hours_ago, 1),
+                'user_id': report.user_id,
+                'status': report.status,
+                'location': report.location,
+                'severity': report.severity
+            })
+            unique_users.add(report.user_id)
 
         return {
             'similar_reports': similar_reports,
@@ -167,10 +205,39 @@ class DuplicationService:
         latitude: float,
         longitude: float,
         radius_meters: int = 100,
-        base_severity: str = "Low"
+        base_severity: str = "Low",
+        photo_hashes: Optional[Dict[str, int]] = None
     ) -> Dict[str, Any]:
-        """Main method to check for duplicates and calculate priority"""
-        user_recent_reports = DuplicationService.get_user_recent_reports(db=db, user_id=user_id, hours_back=72)
+        """
+        Main method to check for duplicates and calculate priority.
+        When photo_hashes (dHash per image type) are given, previously submitted
+        photos that look the same are reported in 'photo_matches', wherever
+        they were reported from.
+        """
+        # ⚡ Answer from the in-memory index of recent reports; SQL only while it is cold
+        if recent_report_index.sync(db):
+            # The index can be up to a refresh behind on reports submitted through
+            # other workers; the user's latest ones come from SQL so the block holds
+            latest = DuplicationService.get_user_reports(
+                db, user_id, since=datetime.utcnow() - timedelta(seconds=REFRESH_SECONDS) - REFRESH_OVERLAP
+            )
+            user_recent_reports = list({
+                report.case_id: report
+                for report in recent_report_index.user_reports(user_id, hours_back=72) + latest
+            }.values())
+            nearby_reports = recent_report_index.nearby(
+                latitude, longitude, radius_meters, days_back=30, exclude_user_id=user_id
+            )
+        else:
+            user_recent_reports, nearby_reports = DuplicationService.get_candidate_reports(
+                db=db,
+                user_id=user_id,
+                latitude=latitude,
+                longitude=longitude,
+                radius_meters=radius_meters,
+                hours_back=72,
+                days_back=30
+            )
 
         user_analysis = DuplicationService.analyze_user_duplicates(
             user_reports=user_recent_reports,
@@ -179,15 +246,6 @@ class DuplicationService:
             radius_meters=radius_meters
         )
 
-        nearby_reports = DuplicationService.get_nearby_reports(
-            db=db,
-            latitude=latitude,
-            longitude=longitude,
-            radius_meters=radius_meters,
-            days_back=30,
-            exclude_user_id=user_id
-        )
-
         similar_analysis = DuplicationService.analyze_similar_reports(
             nearby_reports=nearby_reports,
             target_latitude=latitude,
@@ -203,6 +261,12 @@ class DuplicationService:
 
         location_hash = generate_location_hash(latitude, longitude)
 
+        # Photo matching needs the hash index; it is skipped while the index is
+        # still being built in the background (a full table scan)
+        photo_matches = []
+        if photo_hashes and photo_hash_index.sync(db):
+            photo_matches = photo_hash_index.find_matches(photo_hashes)
+
         return {
             'can_submit': user_analysis['can_submit'],
             'is_blocked': not user_analysis['can_submit'],
@@ -216,11 +280,81 @@ class DuplicationService:
             'severity_multiplier': priority_analysis['severity_multiplier'],
             'boost_reason': priority_analysis['boost_reason'],
             'location_hash': location_hash,
+            'photo_matches': photo_matches,
+            'matched_case_ids': sorted({m['case_id'] for m in photo_matches}),
             'analysis_timestamp': datetime.utcnow().isoformat(),
             'radius_meters': radius_meters,
             'summary_message': DuplicationService._generate_summary_message(user_analysis, similar_analysis, priority_analysis)
         }
 
+    @staticmethod
+    def check_duplicate_points(
+        db: Session,
+        points: List[Tuple[float, float]],
+        radius_meters: int = 100,
+        days_back: int = 30,
+        max_matches: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Duplicate check for many coordinates at once: one query over the union
+        of their grid cells, then vectorized distance matching per point
+        against the candidates of its own cells. Results are in input order.
+        """
+        point_cells = [neighbor_cells(lat, lon, radius_meters) for lat, lon in points]
+        all_cells = sorted({cell for cells in point_cells for cell in cells})
+
+        rows = (
+            db.query(
+                PotholeReport.case_id,
+                PotholeReport.user_id,
+                PotholeReport.latitude,
+                PotholeReport.longitude,
+                PotholeReport.status,
+                PotholeReport.severity,
+                PotholeReport.grid_cell,
+            )
+            .filter(
+                PotholeReport.grid_cell.in_(all_cells),
+                PotholeReport.date_created >= datetime.utcnow() - timedelta(days=days_back)
+            )
+            .all()
+        )
+
+        latitudes = np.array([row.latitude for row in rows], dtype=np.float64)
+        longitudes = np.array([row.longitude for row in rows], dtype=np.float64)
+        user_ids = np.array([row.user_id for row in rows], dtype=np.int64)
+        by_cell: Dict[int, List[int]] = {}
+        for position, row in enumerate(rows):
+            by_cell.setdefault(row.grid_cell, []).append(position)
+
+        results = []
+        for (latitude, longitude), cells in zip(points, point_cells):
+            candidates = np.array([i for cell in cells for i in by_cell.get(cell, ())], dtype=np.int64)
+            distances = haversine_distances(latitude, longitude, latitudes[candidates], longitudes[candidates])
+            inside = distances <= radius_meters
+            matched, matched_distances = candidates[inside], distances[inside]
+            order = np.argsort(matched_distances)
+
+            similar_count = int(matched.size)
+            unique_users = int(np.unique(user_ids[matched]).size)
+            priority = DuplicationService.calculate_priority_and_severity(similar_count, unique_users)
+            results.append({
+                'similar_count': similar_count,
+                'unique_users': unique_users,
+                'calculated_priority': priority['priority'],
+                'calculated_severity': priority['severity'],
+                'matches': [
+                    {
+                        'case_id': rows[matched[i]].case_id,
+                        'distance': round(float(matched_distances[i]), 2),
+                        'status': rows[matched[i]].status,
+                        'severity': rows[matched[i]].severity
+                    }
+                    for i in order[:max_matches]
+                ]
+            })
+        return results
+
     @staticmethod
     def _generate_summary_message(user_analysis: Dict, similar_analysis: Dict, priority_analysis: Dict) -> str:
         """Generate human-readable summary message"""
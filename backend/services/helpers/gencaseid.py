@@ -1,41 +1,68 @@
 from datetime import datetime
 from fastapi import HTTPException
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-import models
 
-# Sabah has 27 districts
-DISTRICTS = [
-    "Beaufort", "Beluran", "Keningau", "Kinabatangan", "Kota Belud",
-    "Kota Kinabalu", "Kota Marudu", "Kuala Penyu", "Kudat", "Kunak",
-    "Lahad Datu", "Nabawan", "Papar", "Penampang", "Pitas",
-    "Putatan", "Ranau", "Sandakan", "Semporna", "Sipitang",
-    "Tambunan", "Tawau", "Tenom", "Tongod", "Tuaran", "Telupid"
-]
+# Sabah districts → unique 3-letter case ID code. Mostly the first three
+# letters; the three "Kota" districts get distinct codes so they don't share
+# one counter (reports filed before this change keep their KOT IDs).
+DISTRICT_CODES = {
+    "Beaufort": "BEA", "Beluran": "BEL", "Kalabakan": "KAL", "Keningau": "KEN", "Kinabatangan": "KIN",
+    "Kota Belud": "KBD", "Kota Kinabalu": "KKI", "Kota Marudu": "KMR",
+    "Kuala Penyu": "KUA", "Kudat": "KUD", "Kunak": "KUN",
+    "Lahad Datu": "LAH", "Nabawan": "NAB", "Papar": "PAP", "Penampang": "PEN", "Pitas": "PIT",
+    "Putatan": "PUT", "Ranau": "RAN", "Sandakan": "SAN", "Semporna": "SEM", "Sipitang": "SIP",
+    "Tambunan": "TAM", "Tawau": "TAW", "Tenom": "TEN", "Tongod": "TON", "Tuaran": "TUA", "Telupid": "TEL"
+}
+DISTRICTS = list(DISTRICT_CODES)
+
+# Hot path: one row lock + update, no scan of pothole_reports
+_NEXT_SEQUENCE = text("""
+    UPDATE case_id_sequences
+    SET last_value = last_value + 1
+    WHERE district_code = :code AND period = :period
+    RETURNING last_value
+""")
+
+# First report of the month: create the row, continuing after any IDs that
+# already exist for this prefix (reports created before the sequence table)
+_START_SEQUENCE = text("""
+    INSERT INTO case_id_sequences (district_code, period, last_value)
+    VALUES (
+        :code, :period,
+        COALESCE((
+            SELECT MAX(CAST(RIGHT(case_id, 4) AS INTEGER))
+            FROM pothole_reports
+            WHERE case_id LIKE :pattern
+        ), 0) + 1
+    )
+    ON CONFLICT (district_code, period)
+    DO UPDATE SET last_value = case_id_sequences.last_value + 1
+    RETURNING last_value
+""")
 
 
 def gen_case_id(district: str, db: Session) -> str:
     """Generate case ID like SRC_BEA_2025_09_0001"""
 
-    if district not in DISTRICTS:
+    if district not in DISTRICT_CODES:
         raise HTTPException(status_code=400, detail=f"Invalid district: {district}")
 
-    # District → 3-letter code
-    district_code = district.replace(" ", "")[:3].upper()
+    district_code = DISTRICT_CODES[district]
 
     # Current year/month
     now = datetime.utcnow()
-    year = now.strftime("%Y")
-    month = now.strftime("%m")
-
-    # Count reports for this district in this month
-    prefix = f"SRC_{district_code}_{year}_{month}"
-    count = (
-        db.query(models.PotholeReport)
-        .filter(models.PotholeReport.case_id.like(f"{prefix}_%"))
-        .count()
-    )
+    period = now.strftime("%Y_%m")
+    prefix = f"SRC_{district_code}_{period}"
 
-    # Next sequence number (zero-padded to 4 digits)
-    sequence = str(count + 1).zfill(4)
+    # Allocated in its own short transaction: the row lock is released right
+    # away instead of being held while photos upload. A failed submission
+    # leaves a gap in the numbering, like any database sequence.
+    params = {"code": district_code, "period": period}
+    with db.get_bind().begin() as conn:
+        sequence = conn.execute(_NEXT_SEQUENCE, params).scalar()
+        if sequence is None:
+            sequence = conn.execute(_START_SEQUENCE, {**params, "pattern": f"{prefix}\\_%"}).scalar()
 
-    return f"{prefix}_{sequence}"
+    # Zero-padded to 4 digits
+    return f"{prefix}_{sequence:04d}"
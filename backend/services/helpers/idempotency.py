@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from decouple import config
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Completed keys are replayed for this long, then the key can be reused
+IDEMPOTENCY_TTL_HOURS = config('IDEMPOTENCY_TTL_HOURS', default=24, cast=int)
+# An in-progress key older than this belongs to a crashed worker and is taken over
+IDEMPOTENCY_STALE_SECONDS = config('IDEMPOTENCY_STALE_SECONDS', default=300, cast=int)
+# How long a concurrent request with the same key waits for the first one
+IDEMPOTENCY_WAIT_SECONDS = config('IDEMPOTENCY_WAIT_SECONDS', default=60, cast=int)
+MAX_KEY_LENGTH = 255
+
+# Claim the key: insert it, or take over an expired/abandoned row. Returns a
+# row only if this request now owns the key.
+_CLAIM = text("""
+    INSERT INTO idempotency_keys (user_id, key, fingerprint, status, created_at, updated_at)
+    VALUES (:user_id, :key, :fingerprint, 'in_progress', now(), now())
+    ON CONFLICT (user_id, key) DO UPDATE
+    SET fingerprint = EXCLUDED.fingerprint, status = 'in_progress',
+        status_code = NULL, response = NULL, created_at = now(), updated_at = now()
+    WHERE idempotency_keys.created_at < now() - make_interval(hours => :ttl_hours)
+       OR (idempotency_keys.status = 'in_progress'
+           AND idempotency_keys.updated_at < now() - make_interval(secs => :stale_seconds))
+    RETURNING user_id
+""")
+
+_FETCH = text("""
+    SELECT fingerprint, status, status_code, response
+    FROM idempotency_keys
+    WHERE user_id = :user_id AND key = :key
+""")
+
+_COMPLETE = text("""
+    UPDATE idempotency_keys
+    SET status = 'completed', status_code = :status_code, response = CAST(:response AS JSON), updated_at = now()
+    WHERE user_id = :user_id AND key = :key
+""")
+
+_RELEASE = text("DELETE FROM idempotency_keys WHERE user_id = :user_id AND key = :key AND status = 'in_progress'")
+
+# Wakes requests waiting on a key owned by the same worker immediately;
+# requests on other workers find out by polling
+_local_waiters: Dict[tuple, asyncio.Event] = {}
+
+
+def request_fingerprint(endpoint: str, **fields) -> str:
+    """Stable hash of what was submitted, to catch a key reused for a different request"""
+    payload = json.dumps({"endpoint": endpoint, **fields}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class IdempotencyService:
+    """Run a handler at most once per (user, Idempotency-Key)"""
+
+    @staticmethod
+    def _claim(db: Session, user_id: int, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """None if this request owns the key, otherwise the current state of the key"""
+        params = {"user_id": user_id, "key": key}
+        # Own transaction, so the claim is visible to other workers right away
+        with db.get_bind().begin() as conn:
+            claimed = conn.execute(_CLAIM, {
+                **params,
+                "fingerprint": fingerprint,
+                "ttl_hours": IDEMPOTENCY_TTL_HOURS,
+                "stale_seconds": IDEMPOTENCY_STALE_SECONDS,
+            }).first()
+            if claimed:
+                return None
+            row = conn.execute(_FETCH, params).mappings().first()
+        # Deleted between the two statements (owner failed): treat as in progress and retry
+        return dict(row) if row else {"fingerprint": fingerprint, "status": "in_progress"}
+
+    @staticmethod
+    def _finish(db: Session, user_id: int, key: str, status_code: Optional[int], response: Any = None):
+        params = {"user_id": user_id, "key": key}
+        with db.get_bind().begin() as conn:
+            if status_code is None:
+                conn.execute(_RELEASE, params)
+            else:
+                conn.execute(_COMPLETE, {
+                    **params,
+                    "status_code": status_code,
+                    "response": json.dumps(jsonable_encoder(response)),
+                })
+
+    @staticmethod
+    def _replay(state: Dict[str, Any]) -> JSONResponse:
+        return JSONResponse(
+            status_code=state["status_code"],
+            content=state["response"],
+            headers={"Idempotent-Replayed": "true"}
+        )
+
+    @staticmethod
+    async def run(
+        db: Session,
+        user_id: int,
+        key: str,
+        fingerprint: str,
+        handler: Callable[[], Awaitable[Any]],
+    ):
+        """
+        Execute handler once for this key. Replays get the stored response;
+        a concurrent request with the same key waits for the first to finish.
+        Client errors (4xx) are stored like successes; server errors and
+        crashes release the key so the request can be retried.
+        """
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + IDEMPOTENCY_WAIT_SECONDS
+        delay = 0.1
+        while True:
+            state = IdempotencyService._claim(db, user_id, key, fingerprint)
+            if state is None:
+                break
+            if state["fingerprint"] != fingerprint:
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key was already used for a different request"
+                )
+            if state["status"] == "completed":
+                return IdempotencyService._replay(state)
+            if loop.time() >= deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still being processed",
+                    headers={"Retry-After": "5"}
+                )
+            # ⏳ Wait for the owner of the key (same worker: woken by its event)
+            event = _local_waiters.get((user_id, key))
+            try:
+                await asyncio.wait_for(event.wait(), delay) if event else await asyncio.sleep(delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, 1.0)
+
+        waiter = _local_waiters[(user_id, key)] = asyncio.Event()
+        try:
+            result = await handler()
+        except HTTPException as e:
+            if e.status_code < 500:
+                IdempotencyService._finish(db, user_id, key, e.status_code, {"detail": e.detail})
+            else:
+                IdempotencyService._finish(db, user_id, key, None)
+            raise
+        except BaseException:
+            IdempotencyService._finish(db, user_id, key, None)
+            raise
+        else:
+            IdempotencyService._finish(db, user_id, key, 200, result)
+            return result
+        finally:
+            _local_waiters.pop((user_id, key), None)
+            waiter.set()
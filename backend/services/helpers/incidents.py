@@ -0,0 +1,180 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+import models
+from .dup_utils import grid_cell, haversine_distances, neighbor_cells
+
+# Reports within this distance of an incident's centroid belong to it
+CLUSTER_RADIUS_METERS = 100
+
+
+def community_multiplier(report_count: int, unique_users: int) -> float:
+    """Severity multiplier for community engagement (shared by AI priority and incidents)"""
+    if report_count >= 8 and unique_users >= 5:
+        return 3.0
+    if report_count >= 5 and unique_users >= 3:
+        return 2.0
+    if report_count >= 2:
+        return 1.5
+    return 1.0
+
+
+def _utc(value: datetime) -> datetime:
+    # Reports are created with naive UTC datetimes, incidents read back timezone-aware
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class IncidentService:
+    """
+    Online clustering of reports into incidents (DBSCAN-style): a new report
+    joins the incident whose centroid is within CLUSTER_RADIUS_METERS; when it
+    is within reach of several, they are merged into the largest one.
+    """
+
+    @staticmethod
+    def _lock_area(db: Session, cells: List[int]) -> None:
+        # Serialize clustering per neighborhood so two concurrent reports of a
+        # new pothole don't open two incidents. Sorted to avoid deadlocks;
+        # released when the transaction commits.
+        for cell in sorted(cells):
+            db.execute(text("SELECT pg_advisory_xact_lock(:cell)"), {"cell": cell})
+
+    @staticmethod
+    def _update_reports(db: Session, condition, values: Dict) -> None:
+        """
+        UPDATE reports with Core, leaving last_date_status_update alone: joining
+        an incident is not a status change (an ORM write would fire its onupdate)
+        """
+        table = models.PotholeReport.__table__
+        db.execute(
+            update(table)
+            .where(condition)
+            .values(**values, last_date_status_update=table.c.last_date_status_update)
+        )
+
+    @staticmethod
+    def _add_reporter(db: Session, incident_id: int, user_id: int) -> bool:
+        """Record the user as a reporter; True if they hadn't reported this incident yet"""
+        result = db.execute(
+            insert(models.IncidentReporter)
+            .values(incident_id=incident_id, user_id=user_id)
+            .on_conflict_do_nothing()
+            .returning(models.IncidentReporter.user_id)
+        )
+        return result.first() is not None
+
+    @staticmethod
+    def _merge(db: Session, target: models.PotholeIncident, others: List[models.PotholeIncident]) -> None:
+        """Fold other incidents into target (reports, reporters and aggregates)"""
+        other_ids = [incident.id for incident in others]
+        reports = models.PotholeReport.__table__.c
+        IncidentService._update_reports(db, reports.incident_id.in_(other_ids), {"incident_id": target.id})
+        db.execute(text("""
+            INSERT INTO incident_reporters (incident_id, user_id)
+            SELECT :target, user_id FROM incident_reporters WHERE incident_id = ANY(:others)
+            ON CONFLICT DO NOTHING
+        """), {"target": target.id, "others": other_ids})
+
+        total = target.report_count + sum(incident.report_count for incident in others)
+        target.latitude = (
+            target.latitude * target.report_count + sum(i.latitude * i.report_count for i in others)
+        ) / total
+        target.longitude = (
+            target.longitude * target.report_count + sum(i.longitude * i.report_count for i in others)
+        ) / total
+        target.report_count = total
+        target.first_seen = min(_utc(i.first_seen) for i in [target] + others)
+        target.last_seen = max(_utc(i.last_seen) for i in [target] + others)
+        for incident in others:
+            db.delete(incident)
+        db.flush()  # reporters of the merged incidents are deleted by cascade
+        target.unique_user_count = (
+            db.query(models.IncidentReporter).filter(models.IncidentReporter.incident_id == target.id).count()
+        )
+        target.community_multiplier = community_multiplier(target.report_count, target.unique_user_count)
+        # Every report of the merged incident now counts the reporters of all of them
+        IncidentService._update_reports(db, reports.incident_id == target.id, {
+            "unique_users_count": target.unique_user_count,
+            "community_multiplier": target.community_multiplier,
+        })
+
+    @staticmethod
+    def add_report(db: Session, report: models.PotholeReport) -> models.PotholeIncident:
+        """
+        Attach a new (flushed, uncommitted) report to its incident and update
+        the incident's aggregates. Commits with the caller's transaction.
+        """
+        seen_at = _utc(report.date_created or datetime.utcnow())
+        cells = neighbor_cells(report.latitude, report.longitude, CLUSTER_RADIUS_METERS)
+        IncidentService._lock_area(db, cells)
+
+        candidates = (
+            db.query(models.PotholeIncident)
+            .filter(models.PotholeIncident.grid_cell.in_(cells))
+            .all()
+        )
+        distances = haversine_distances(
+            report.latitude, report.longitude,
+            [incident.latitude for incident in candidates],
+            [incident.longitude for incident in candidates]
+        )
+        reachable = [incident for incident, distance in zip(candidates, distances) if distance <= CLUSTER_RADIUS_METERS]
+
+        if not reachable:
+            incident = models.PotholeIncident(
+                district=report.district,
+                latitude=report.latitude,
+                longitude=report.longitude,
+                grid_cell=grid_cell(report.latitude, report.longitude),
+                report_count=0,
+                unique_user_count=0,
+                first_seen=seen_at,
+                last_seen=seen_at,
+            )
+            db.add(incident)
+            db.flush()
+        else:
+            reachable.sort(key=lambda i: i.report_count, reverse=True)
+            incident = reachable[0]
+            if len(reachable) > 1:
+                IncidentService._merge(db, incident, reachable[1:])
+
+        # Running centroid
+        count = incident.report_count
+        incident.latitude = (incident.latitude * count + report.latitude) / (count + 1)
+        incident.longitude = (incident.longitude * count + report.longitude) / (count + 1)
+        incident.grid_cell = grid_cell(incident.latitude, incident.longitude)
+        incident.report_count = count + 1
+        if IncidentService._add_reporter(db, incident.id, report.user_id):
+            incident.unique_user_count += 1
+        if seen_at > _utc(incident.last_seen):
+            incident.last_seen = seen_at
+        incident.community_multiplier = community_multiplier(incident.report_count, incident.unique_user_count)
+
+        values = {
+            "incident_id": incident.id,
+            "unique_users_count": incident.unique_user_count,
+            "community_multiplier": incident.community_multiplier,
+        }
+        IncidentService._update_reports(db, models.PotholeReport.__table__.c.case_id == report.case_id, values)
+        for key, value in values.items():
+            set_committed_value(report, key, value)  # already written; keeps the ORM from writing it again
+        return incident
+
+    @staticmethod
+    def summary(incident: Optional[models.PotholeIncident]) -> Optional[Dict]:
+        if incident is None:
+            return None
+        return {
+            "incident_id": incident.id,
+            "report_count": incident.report_count,
+            "unique_users": incident.unique_user_count,
+            "community_multiplier": incident.community_multiplier,
+            "first_seen": incident.first_seen,
+            "last_seen": incident.last_seen,
+        }
@@ -0,0 +1,149 @@
+import base64
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from models import PotholeReport
+from .dup_utils import GRID_CELL_DEGREES, GRID_COLUMNS, METERS_PER_DEGREE_LAT, grid_cell, haversine_distances
+
+# Farthest a kNN search looks (keeps the number of scanned cells bounded)
+MAX_SEARCH_RADIUS_METERS = 25000
+MAX_RESULTS = 100
+
+
+def encode_cursor(distance: float, case_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{distance!r}|{case_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        distance, case_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return float(distance), case_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class NearbyService:
+    """
+    k-nearest-neighbour search over the grid_cell column by ring expansion:
+    scan the square of cells around the point, growing it (doubling) until
+    the k-th nearest match is closer than anything outside the square can
+    be. Each ring is a handful of grid_cell range scans on the
+    (grid_cell, date_created) index, so cost depends on local density, not
+    on the size of the table.
+    """
+
+    @staticmethod
+    def _ring_ranges(row: int, column: int, inner: int, outer: int) -> List[Tuple[int, int]]:
+        """grid_cell ranges of the cells with Chebyshev distance in (inner, outer] from (row, column)"""
+        ranges = []
+        for r in range(row - outer, row + outer + 1):
+            base = r * GRID_COLUMNS
+            if inner < 0 or abs(r - row) > inner:
+                ranges.append((base + column - outer, base + column + outer))
+            else:
+                ranges.append((base + column - outer, base + column - inner - 1))
+                ranges.append((base + column + inner + 1, base + column + outer))
+        return [(low, high) for low, high in ranges if low <= high]
+
+    @staticmethod
+    def nearest(
+        db: Session,
+        latitude: float,
+        longitude: float,
+        limit: int = 20,
+        max_distance: Optional[float] = None,
+        status: Optional[str] = None,
+        severity: Optional[str] = None,
+        since_days: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """The `limit` reports closest to a point, nearest first, after `cursor`"""
+        limit = min(limit, MAX_RESULTS)
+        max_distance = min(max_distance or MAX_SEARCH_RADIUS_METERS, MAX_SEARCH_RADIUS_METERS)
+        after = decode_cursor(cursor) if cursor else None
+
+        # Cell size around the point: any cell k rings out is at least k * cell_min away
+        cell_height = GRID_CELL_DEGREES * METERS_PER_DEGREE_LAT
+        cell_width = cell_height * math.cos(math.radians(latitude))
+        cell_min = min(cell_height, cell_width)
+        cell_diagonal = math.hypot(cell_height, cell_width)
+
+        center = grid_cell(latitude, longitude)
+        row, column = divmod(center, GRID_COLUMNS)
+
+        filters = []
+        if status:
+            filters.append(PotholeReport.status == status)
+        if severity:
+            filters.append(PotholeReport.severity == severity)
+        if since_days:
+            filters.append(PotholeReport.date_created >= datetime.utcnow() - timedelta(days=since_days))
+
+        # Rings entirely closer than the cursor hold nothing for this page
+        inner = -1
+        if after:
+            inner = max(-1, int(after[0] // cell_diagonal) - 2)
+        outer = max(inner + 1, 1)
+        max_rings = int(max_distance // cell_min) + 1
+
+        found: List[Tuple[float, str, Any]] = []
+        while True:
+            ranges = NearbyService._ring_ranges(row, column, inner, outer)
+            rows = (
+                db.query(
+                    PotholeReport.case_id,
+                    PotholeReport.user_id,
+                    PotholeReport.latitude,
+                    PotholeReport.longitude,
+                    PotholeReport.location,
+                    PotholeReport.district,
+                    PotholeReport.status,
+                    PotholeReport.severity,
+                    PotholeReport.date_created,
+                )
+                .filter(or_(*(PotholeReport.grid_cell.between(low, high) for low, high in ranges)), *filters)
+                .all()
+            )
+            distances = haversine_distances(latitude, longitude, [r.latitude for r in rows], [r.longitude for r in rows])
+            for report, distance in zip(rows, distances):
+                key = (float(distance), report.case_id)
+                if key[0] <= max_distance and (after is None or key > after):
+                    found.append((key[0], key[1], report))
+
+            found.sort(key=lambda item: (item[0], item[1]))
+            # Everything outside the scanned square is at least outer * cell_min away
+            covered = outer * cell_min
+            if (len(found) >= limit and found[limit - 1][0] <= covered) or covered >= max_distance or outer >= max_rings:
+                break
+            inner, outer = outer, min(outer * 2, max_rings)
+
+        page = found[:limit]
+        has_more = len(found) > limit or (len(page) == limit and covered < max_distance)
+        return {
+            "reports": [NearbyService._serialize(report, distance) for distance, _, report in page],
+            "next_cursor": encode_cursor(page[-1][0], page[-1][1]) if page and has_more else None,
+        }
+
+    @staticmethod
+    def _serialize(report, distance: float) -> Dict[str, Any]:
+        # Field names match what the frontend's duplicate detection reads
+        return {
+            "id": report.case_id,
+            "case_id": report.case_id,
+            "location": {
+                "latitude": report.latitude,
+                "longitude": report.longitude,
+                "address": report.location if isinstance(report.location, str) else None,
+            },
+            "district": report.district,
+            "distance": round(distance, 2),
+            "submissionTime": report.date_created.isoformat() if report.date_created else None,
+            "userId": report.user_id,
+            "status": report.status,
+            "severity": report.severity,
+        }
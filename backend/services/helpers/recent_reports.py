@@ -0,0 +1,238 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from .dup_utils import grid_cell, neighbor_cells
+
+# Oldest report any duplicate check looks at (nearby reports: 30 days)
+WINDOW = timedelta(days=30)
+# Other uvicorn workers insert and update reports too; pick those up at most this often
+REFRESH_SECONDS = 30
+# Rows can commit slightly after their timestamp; re-read this much history on refresh
+REFRESH_OVERLAP = timedelta(minutes=2)
+# Drop reports that aged out of the window (or were deleted) this often
+PURGE_SECONDS = 300
+
+
+class RecentReport(NamedTuple):
+    """The columns duplicate checks read, in place of a full PotholeReport"""
+    case_id: str
+    user_id: int
+    latitude: float
+    longitude: float
+    date_created: datetime
+    status: str
+    severity: str
+    location: object
+    created_ts: float  # epoch seconds, for age checks
+
+    @classmethod
+    def from_row(cls, row) -> "RecentReport":
+        """Build from a projected query row or a PotholeReport"""
+        return cls(
+            case_id=row.case_id,
+            user_id=row.user_id,
+            latitude=row.latitude,
+            longitude=row.longitude,
+            date_created=row.date_created,
+            status=row.status,
+            severity=row.severity,
+            location=row.location,
+            created_ts=_timestamp(row.date_created),
+        )
+
+
+def _timestamp(value: datetime) -> float:
+    # date_created is written as naive UTC but read back timezone-aware
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class RecentReportIndex:
+    """
+    Process-local grid index of the reports from the last WINDOW.
+
+    Reports are bucketed by dup_utils.grid_cell, so a radius query only looks
+    at the few neighboring cells (and a per-user lookup at that user's
+    reports) instead of querying Postgres. Loaded at startup, updated on
+    insert by this worker and by periodic refreshes for the others.
+    """
+
+    def __init__(self):
+        self._reports: Dict[str, RecentReport] = {}
+        self._cells: Dict[int, Set[str]] = {}
+        self._users: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._watermark = None  # newest last_date_status_update loaded
+        self._synced_at = 0.0
+        self._purged_at = 0.0
+        self.loaded = False
+        # Called with every report added or updated after the initial load
+        self.listeners: List[Callable[[RecentReport], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._reports)
+
+    # ---------- Maintenance ----------
+
+    def _remove(self, case_id: str) -> None:
+        report = self._reports.pop(case_id, None)
+        if report is None:
+            return
+        cell = grid_cell(report.latitude, report.longitude)
+        self._cells[cell].discard(case_id)
+        if not self._cells[cell]:
+            del self._cells[cell]
+        self._users[report.user_id].discard(case_id)
+        if not self._users[report.user_id]:
+            del self._users[report.user_id]
+
+    def _put(self, report: RecentReport) -> None:
+        if report.created_ts < time.time() - WINDOW.total_seconds():
+            return
+        self._remove(report.case_id)  # status or location may have changed
+        self._reports[report.case_id] = report
+        self._cells.setdefault(grid_cell(report.latitude, report.longitude), set()).add(report.case_id)
+        self._users.setdefault(report.user_id, set()).add(report.case_id)
+
+    def _notify(self, reports: List[RecentReport]) -> None:
+        for report in reports:
+            for listener in self.listeners:
+                listener(report)
+
+    def add_report(self, report) -> None:
+        """Index a report just saved by this worker (any object with the PotholeReport columns)"""
+        record = RecentReport.from_row(report)
+        with self._lock:
+            self._put(record)
+        self._notify([record])
+
+    def purge(self, db: Optional[Session] = None) -> None:
+        """
+        Drop reports that aged out of the window. With a session, also drop
+        reports deleted from the table (the incremental refresh can't see them).
+        """
+        started = time.time()
+        existing = None
+        if db is not None:
+            import models
+
+            existing = {
+                case_id for (case_id,) in db.query(models.PotholeReport.case_id)
+                .filter(models.PotholeReport.date_created >= datetime.utcnow() - WINDOW)
+                .execution_options(yield_per=10000)
+            }
+        cutoff = started - WINDOW.total_seconds()
+        # Reports created around the id query may have committed after it read
+        settled = started - REFRESH_OVERLAP.total_seconds()
+        with self._lock:
+            stale = [
+                case_id for case_id, report in self._reports.items()
+                if report.created_ts < cutoff
+                or (existing is not None and case_id not in existing and report.created_ts < settled)
+            ]
+            for case_id in stale:
+                self._remove(case_id)
+            self._purged_at = time.monotonic()
+
+    # ---------- Loading ----------
+
+    def _load_rows(self, db: Session, since=None, batch_size: int = 10000):
+        import models
+
+        query = (
+            db.query(
+                models.PotholeReport.case_id,
+                models.PotholeReport.user_id,
+                models.PotholeReport.latitude,
+                models.PotholeReport.longitude,
+                models.PotholeReport.date_created,
+                models.PotholeReport.status,
+                models.PotholeReport.severity,
+                models.PotholeReport.location,
+                models.PotholeReport.last_date_status_update,
+            )
+            .filter(models.PotholeReport.date_created >= datetime.utcnow() - WINDOW)
+        )
+        if since is not None:
+            query = query.filter(models.PotholeReport.last_date_status_update > since - REFRESH_OVERLAP)
+        return query.execution_options(yield_per=batch_size)
+
+    def _apply(self, index: "RecentReportIndex", rows) -> List[RecentReport]:
+        records = []
+        for row in rows:
+            record = RecentReport.from_row(row)
+            index._put(record)
+            records.append(record)
+            if index._watermark is None or row.last_date_status_update > index._watermark:
+                index._watermark = row.last_date_status_update
+        return records
+
+    def load_from_db(self, db: Session) -> None:
+        """(Re)build the index from the reports of the last WINDOW"""
+        fresh = RecentReportIndex()
+        self._apply(fresh, self._load_rows(db))
+        with self._lock:
+            self._reports, self._cells, self._users = fresh._reports, fresh._cells, fresh._users
+            self._watermark = fresh._watermark
+            self._synced_at = self._purged_at = time.monotonic()
+            self.loaded = True
+
+    def refresh(self, db: Session) -> None:
+        """Pick up reports inserted or updated (by any worker) since the last load"""
+        rows = self._load_rows(db, since=self._watermark).all()
+        with self._lock:
+            records = self._apply(self, rows)
+            self._synced_at = time.monotonic()
+        self._notify(records)
+        if time.monotonic() - self._purged_at > PURGE_SECONDS:
+            self.purge(db)
+
+    def sync(self, db: Session) -> bool:
+        """
+        Bring a loaded index up to date. False while the index is still cold
+        (being built by the startup task): callers should query SQL instead.
+        """
+        if not self.loaded:
+            return False
+        if time.monotonic() - self._synced_at > REFRESH_SECONDS:
+            self.refresh(db)
+        return True
+
+    # ---------- Queries ----------
+
+    def user_reports(self, user_id: int, hours_back: int) -> List[RecentReport]:
+        """The user's reports from the last hours_back hours"""
+        cutoff = time.time() - hours_back * 3600
+        with self._lock:
+            reports = [self._reports[c] for c in self._users.get(user_id, ())]
+        return [r for r in reports if r.created_ts >= cutoff]
+
+    def nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_meters: float,
+        days_back: int,
+        exclude_user_id: Optional[int] = None,
+    ) -> List[RecentReport]:
+        """Reports in the grid cells around a point; callers filter by exact distance"""
+        cutoff = time.time() - days_back * 86400
+        with self._lock:
+            reports = [
+                self._reports[case_id]
+                for cell in neighbor_cells(latitude, longitude, radius_meters)
+                for case_id in self._cells.get(cell, ())
+            ]
+        return [
+            r for r in reports
+            if r.created_ts >= cutoff and (exclude_user_id is None or r.user_id != exclude_user_id)
+        ]
+
+
+# Process-wide singleton
+recent_report_index = RecentReportIndex()
@@ -0,0 +1,118 @@
+# backend/services/images/ingest.py
+import os
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterable, Optional, Union
+
+from decouple import config
+from fastapi import HTTPException, UploadFile
+
+MAX_REPORT_PHOTO_SIZE = config('MAX_REPORT_PHOTO_SIZE', default=15 * 1024 * 1024, cast=int)  # 15 MB
+MAX_PROFILE_PICTURE_SIZE = 5 * 1024 * 1024  # 5 MB
+
+REPORT_PHOTO_KINDS = {"jpeg", "png", "webp"}
+PROFILE_PICTURE_KINDS = {"jpeg", "png", "gif", "webp"}
+
+# Bytes needed to identify every supported format
+SIGNATURE_LENGTH = 12
+
+
+def detect_image_kind(header: bytes) -> Optional[str]:
+    """Identify an image format from its magic bytes"""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+@dataclass
+class IngestedImage:
+    """
+    A validated upload, kept in the spool Starlette already wrote it to
+    (in memory, or a temporary file on disk past 1 MB).
+
+    `open()` gives a rewound file object. `source()` is what the image
+    process pool decodes: the content of small uploads, a path to the spool
+    file for the rest, so large photos are never read into this process.
+    """
+    filename: str
+    kind: str
+    size: int
+    _buffer: BinaryIO = field(repr=False)
+
+    @property
+    def spooled_to_disk(self) -> bool:
+        return getattr(self._buffer, "_rolled", False)  # SpooledTemporaryFile moved to disk
+
+    def open(self) -> BinaryIO:
+        """Return the underlying file object, rewound to the start"""
+        self._buffer.seek(0)
+        return self._buffer
+
+    def source(self) -> Union[bytes, str]:
+        """The content (in memory) or a path of the spool file (on disk)"""
+        if self.spooled_to_disk:
+            self._buffer.flush()
+            path = _spool_path(self._buffer)
+            if path is not None:
+                return path
+        return self.open().read()
+
+    def close(self) -> None:
+        self._buffer.close()  # also deletes the spool file
+
+
+def _spool_path(file: BinaryIO) -> Optional[str]:
+    """
+    A path other processes can open the file by. Temporary files are unlinked
+    on creation on Linux; their descriptor stays reachable through /proc.
+    """
+    name = getattr(file, "name", None)
+    if isinstance(name, str) and os.path.exists(name):
+        return name
+    path = f"/proc/{os.getpid()}/fd/{file.fileno()}"
+    return path if os.path.exists(path) else None
+
+
+async def ingest_image(
+    upload: UploadFile,
+    max_size: int = MAX_REPORT_PHOTO_SIZE,
+    allowed_kinds: Iterable[str] = REPORT_PHOTO_KINDS,
+) -> IngestedImage:
+    """
+    Validate an UploadFile in place and wrap its spool as an IngestedImage.
+
+    Only the magic bytes are read; the size comes from the multipart parser,
+    so the photo is never copied again.
+
+    Raises:
+        HTTPException: 400 for unsupported formats, 413 for files over max_size
+    """
+    allowed_kinds = set(allowed_kinds)
+
+    size = upload.size
+    if size is None:  # not created by the multipart parser
+        size = upload.file.seek(0, os.SEEK_END)
+    if size > max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{upload.filename} is too large. Max: {max_size // (1024 * 1024)}MB"
+        )
+
+    await upload.seek(0)
+    header = await upload.read(SIGNATURE_LENGTH)
+    await upload.seek(0)
+    if not header:
+        raise HTTPException(status_code=400, detail=f"{upload.filename} is empty or not an image")
+    kind = detect_image_kind(header)
+    if kind not in allowed_kinds:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type for {upload.filename}. Allowed: {', '.join(sorted(allowed_kinds))}"
+        )
+
+    return IngestedImage(filename=upload.filename or "upload", kind=kind, size=size, _buffer=upload.file)
@@ -0,0 +1,241 @@
+# backend/services/images/phash.py
+import io
+import threading
+import time
+from array import array
+from datetime import timedelta
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image
+from sqlalchemy.orm import Session
+
+HASH_BITS = 64
+
+# Photos whose dHash differs by at most this many bits are treated as the same shot
+DEFAULT_MAX_DISTANCE = 6
+
+IMAGE_TYPES = ("top", "far", "close")
+
+# Other uvicorn workers insert reports too; pick those up at most this often
+REFRESH_SECONDS = 30
+# Rows can commit slightly after their phash_at; re-read this much history
+# on every refresh (already indexed cases are skipped)
+REFRESH_OVERLAP = timedelta(minutes=2)
+
+
+# =========================
+# Hashing
+# =========================
+
+def dhash(img: Image.Image) -> int:
+    """64-bit difference hash: compare horizontally adjacent pixels of a 9x8 grayscale thumbnail"""
+    small = img.convert("L").resize((9, 8), Image.LANCZOS)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def dhash_bytes(data: bytes) -> int:
+    """dHash of an encoded image (used by the backfill job)"""
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("L", (64, 64))
+        return dhash(img)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def to_signed(value: int) -> int:
+    """Store an unsigned 64-bit hash in a signed BIGINT column"""
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+
+# =========================
+# Multi-index hash table
+# =========================
+
+class PhotoHashIndex:
+    """
+    In-memory Hamming-distance index over photo hashes (multi-index hashing).
+
+    Each 64-bit hash is split into BANDS substrings, each with its own hash
+    table. If two hashes are within distance r, at least one band differs by
+    at most r // BANDS bits (pigeonhole), so a query only probes the buckets of
+    each band within that radius and verifies the few candidates it finds.
+    With 16-bit bands and r <= 7 that is 17 probes per band, which keeps
+    lookups in the low milliseconds at millions of photos.
+    """
+
+    BANDS = 4
+    BAND_BITS = HASH_BITS // BANDS
+    BAND_MASK = (1 << BAND_BITS) - 1
+
+    def __init__(self):
+        self._hashes = array("Q")
+        self._owners: List[Tuple[str, str]] = []  # (case_id, image_type), parallel to _hashes
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(self.BANDS)]
+        self._cases = set()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # one full build at a time
+        self._watermark = None    # newest phash_at loaded from the database
+        self._synced_at = 0.0
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _bands(self, value: int) -> Iterable[Tuple[int, int]]:
+        for band in range(self.BANDS):
+            yield band, (value >> (band * self.BAND_BITS)) & self.BAND_MASK
+
+    def _probe_keys(self, key: int, radius: int) -> Iterable[int]:
+        yield key
+        for flips in range(1, radius + 1):
+            for bits in combinations(range(self.BAND_BITS), flips):
+                mask = 0
+                for bit in bits:
+                    mask |= 1 << bit
+                yield key ^ mask
+
+    def add(self, value: int, case_id: str, image_type: str) -> None:
+        value = to_unsigned(value)
+        with self._lock:
+            entry = len(self._hashes)
+            self._hashes.append(value)
+            self._owners.append((case_id, image_type))
+            for band, key in self._bands(value):
+                self._tables[band].setdefault(key, []).append(entry)
+
+    def add_report(self, case_id: str, hashes: Dict[str, Optional[int]]) -> None:
+        if case_id in self._cases:
+            return
+        self._cases.add(case_id)
+        for image_type, value in hashes.items():
+            if value is not None:
+                self.add(value, case_id, image_type)
+
+    def query(self, value: int, max_distance: int = DEFAULT_MAX_DISTANCE) -> List[Dict]:
+        """Return every indexed photo within max_distance bits of value, closest first"""
+        value = to_unsigned(value)
+        radius = max_distance // self.BANDS
+        seen = set()
+        matches = []
+        with self._lock:
+            for band, key in self._bands(value):
+                table = self._tables[band]
+                for probe in self._probe_keys(key, radius):
+                    for entry in table.get(probe, ()):
+                        if entry in seen:
+                            continue
+                        seen.add(entry)
+                        distance = hamming(value, self._hashes[entry])
+                        if distance <= max_distance:
+                            case_id, image_type = self._owners[entry]
+                            matches.append({"case_id": case_id, "image_type": image_type, "distance": distance})
+        matches.sort(key=lambda m: m["distance"])
+        return matches
+
+    def find_matches(self, hashes: Dict[str, int], max_distance: int = DEFAULT_MAX_DISTANCE) -> List[Dict]:
+        """Match every photo of a submission; one entry per (matched case, photo) pair"""
+        results = []
+        for image_type, value in hashes.items():
+            for match in self.query(value, max_distance):
+                results.append({
+                    "case_id": match["case_id"],
+                    "image_type": image_type,
+                    "matched_image_type": match["image_type"],
+                    "distance": match["distance"],
+                })
+        results.sort(key=lambda m: m["distance"])
+        return results
+
+    def _load_rows(self, db: Session, since=None, batch_size: int = 10000):
+        import models
+
+        query = (
+            db.query(
+                models.PotholeReport.case_id,
+                models.PotholeReport.phash_top,
+                models.PotholeReport.phash_far,
+                models.PotholeReport.phash_close,
+                models.PotholeReport.phash_at,
+            )
+            .filter(models.PotholeReport.phash_top.isnot(None))
+        )
+        if since is not None:
+            query = query.filter(models.PotholeReport.phash_at > since - REFRESH_OVERLAP)
+        return query.execution_options(yield_per=batch_size)
+
+    def load_from_db(self, db: Session) -> None:
+        """(Re)build the index from the phash columns of pothole_reports"""
+        fresh = PhotoHashIndex()
+        for case_id, top, far, close, hashed_at in self._load_rows(db):
+            fresh.add_report(case_id, {"top": top, "far": far, "close": close})
+            if hashed_at is not None and (fresh._watermark is None or hashed_at > fresh._watermark):
+                fresh._watermark = hashed_at
+
+        with self._lock:
+            self._hashes, self._owners, self._tables = fresh._hashes, fresh._owners, fresh._tables
+            self._cases, self._watermark = fresh._cases, fresh._watermark
+            self._synced_at = time.monotonic()
+            self.loaded = True
+
+    def refresh(self, db: Session) -> None:
+        """Add reports hashed (on insert by any worker, or by the backfill) since the last load"""
+        watermark = self._watermark
+        for case_id, top, far, close, hashed_at in self._load_rows(db, since=watermark):
+            self.add_report(case_id, {"top": top, "far": far, "close": close})
+            if hashed_at is not None and (watermark is None or hashed_at > watermark):
+                watermark = hashed_at
+        self._watermark = watermark
+        self._synced_at = time.monotonic()
+
+    def load(self) -> None:
+        """
+        Build the index with a session of its own, unless it is loaded or
+        another thread is already building it. Blocking: run it off the event loop.
+        """
+        if not self._load_lock.acquire(blocking=False):
+            return
+        try:
+            if self.loaded:
+                return
+            from services.database.connect import SessionLocal
+
+            db = SessionLocal()
+            try:
+                self.load_from_db(db)
+                print(f"✅ Loaded {len(self)} photo hashes")
+            finally:
+                db.close()
+        except Exception as e:
+            print(f"⚠️ Loading photo hashes failed: {e}")
+        finally:
+            self._load_lock.release()
+
+    def sync(self, db: Session) -> bool:
+        """
+        Bring a loaded index up to date. False while it is cold: the build is
+        started in the background and callers skip photo matching meanwhile.
+        """
+        if not self.loaded:
+            if not self._load_lock.locked():
+                threading.Thread(target=self.load, name="photo-hash-index", daemon=True).start()
+            return False
+        if time.monotonic() - self._synced_at > REFRESH_SECONDS:
+            self.refresh(db)
+        return True
+
+
+# Process-wide singleton
+photo_hash_index = PhotoHashIndex()
@@ -0,0 +1,167 @@
+# backend/services/images/preprocess.py
+import asyncio
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional, Union
+
+from decouple import config
+from fastapi import HTTPException
+from PIL import Image, ImageOps
+
+from services.images.ingest import IngestedImage
+from services.images.phash import dhash
+
+# Report photos are capped to this size on the longest edge and re-encoded as WebP
+MAX_DIMENSION = config('IMAGE_MAX_DIMENSION', default=2048, cast=int)
+PROFILE_MAX_DIMENSION = 512
+
+# Smaller renditions generated eagerly next to the full image ("full" is the image itself)
+VARIANT_DIMENSIONS = {"thumb": 320, "card": 800}
+PROFILE_VARIANT_DIMENSIONS = {"thumb": 128}
+
+OUTPUT_FORMAT = "webp"
+OUTPUT_QUALITY = 80
+VARIANT_QUALITY = 70
+
+PREPROCESS_WORKERS = config('IMAGE_PREPROCESS_WORKERS', default=2, cast=int)
+
+# EXIF tags we keep as metadata before stripping EXIF from the output
+_EXIF_IFD = 0x8769
+_GPS_IFD = 0x8825
+_TAG_DATETIME = 306
+_TAG_DATETIME_ORIGINAL = 36867
+
+
+@dataclass
+class ProcessedImage:
+    """Re-encoded photo plus its smaller variants, with EXIF stripped"""
+    content: bytes
+    variants: Dict[str, bytes]  # {"thumb": ..., "card": ...}
+    width: int
+    height: int
+    original_size: int
+    dhash: int  # 64-bit perceptual hash, see services.images.phash
+    format: str = OUTPUT_FORMAT
+    metadata: Dict[str, Any] = field(default_factory=dict)  # {gps: {latitude, longitude}, taken_at}
+
+
+def _to_degrees(value, ref) -> Optional[float]:
+    """Convert an EXIF (deg, min, sec) rational triple to signed decimal degrees"""
+    try:
+        degrees, minutes, seconds = (float(v) for v in value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    decimal = degrees + minutes / 60 + seconds / 3600
+    return -decimal if ref in ("S", "W") else decimal
+
+
+def _extract_metadata(img: Image.Image) -> Dict[str, Any]:
+    """Pull GPS position and capture time out of EXIF"""
+    metadata: Dict[str, Any] = {}
+    exif = img.getexif()
+    if not exif:
+        return metadata
+
+    gps = exif.get_ifd(_GPS_IFD)
+    if gps.get(2) and gps.get(4):
+        latitude = _to_degrees(gps[2], gps.get(1))
+        longitude = _to_degrees(gps[4], gps.get(3))
+        if latitude is not None and longitude is not None:
+            metadata["gps"] = {"latitude": round(latitude, 7), "longitude": round(longitude, 7)}
+
+    taken_at = exif.get_ifd(_EXIF_IFD).get(_TAG_DATETIME_ORIGINAL) or exif.get(_TAG_DATETIME)
+    if taken_at:
+        try:
+            metadata["taken_at"] = datetime.strptime(str(taken_at).strip("\x00 "), "%Y:%m:%d %H:%M:%S").isoformat()
+        except ValueError:
+            pass
+
+    return metadata
+
+
+def _encode(img: Image.Image, quality: int) -> bytes:
+    output = io.BytesIO()
+    # No exif= argument, so the output carries no EXIF block
+    img.save(output, format=OUTPUT_FORMAT, quality=quality, method=4)
+    return output.getvalue()
+
+
+def process_image_bytes(
+    data: Union[bytes, str],
+    max_dimension: int = MAX_DIMENSION,
+    variant_dimensions: Optional[Dict[str, int]] = None,
+) -> ProcessedImage:
+    """
+    Decode once, cap resolution, strip EXIF, re-encode, build the smaller
+    variants and compute the perceptual hash. `data` is the encoded image or
+    the path of a file holding it (see IngestedImage.source).
+    Runs inside the process pool, so it must stay a module-level function.
+    """
+    if isinstance(data, str):
+        source, original_size = data, os.path.getsize(data)
+    else:
+        source, original_size = io.BytesIO(data), len(data)
+    with Image.open(source) as img:
+        metadata = _extract_metadata(img)
+
+        # Let the JPEG decoder downscale while decoding (DCT scaling)
+        img.draft("RGB", (max_dimension, max_dimension))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGB")
+        img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        content = _encode(img, OUTPUT_QUALITY)
+
+        # Largest first, each variant downscaled from the previous one
+        variants = {}
+        smallest = img
+        for name, dimension in sorted(
+            (variant_dimensions or VARIANT_DIMENSIONS).items(), key=lambda item: -item[1]
+        ):
+            smallest = smallest.copy()
+            smallest.thumbnail((dimension, dimension), Image.LANCZOS)
+            variants[name] = _encode(smallest, VARIANT_QUALITY)
+
+        return ProcessedImage(
+            content=content,
+            variants=variants,
+            width=img.width,
+            height=img.height,
+            original_size=original_size,
+            dhash=dhash(smallest),
+            metadata=metadata,
+        )
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Shared process pool for CPU-bound image work (created on first use)"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PREPROCESS_WORKERS)
+    return _pool
+
+
+async def preprocess_image(
+    image: IngestedImage,
+    max_dimension: int = MAX_DIMENSION,
+    variant_dimensions: Optional[Dict[str, int]] = None,
+) -> ProcessedImage:
+    """Run process_image_bytes for an ingested upload without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            get_process_pool(), process_image_bytes, image.source(), max_dimension, variant_dimensions
+        )
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise HTTPException(status_code=400, detail=f"{image.filename} could not be decoded as an image")
+
+
+async def preprocess_profile_image(image: IngestedImage) -> ProcessedImage:
+    return await preprocess_image(
+        image, max_dimension=PROFILE_MAX_DIMENSION, variant_dimensions=PROFILE_VARIANT_DIMENSIONS
+    )
@@ -0,0 +1,108 @@
+# backend/services/storage/base.py
+import asyncio
+import hashlib
+import urllib.request
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+# Concurrent delete calls per delete_many() on backends without a bulk API
+DELETE_CONCURRENCY = 8
+FETCH_TIMEOUT_SECONDS = 30
+
+
+def content_key(namespace: str, content: bytes, extension: str) -> str:
+    """
+    Content-addressed object key: <namespace>/<sha[:2]>/<sha256>.<ext>
+    Identical bytes always map to the same key, so re-uploads can be skipped.
+    """
+    digest = hashlib.sha256(content).hexdigest()
+    return f"{namespace}/{digest[:2]}/{digest}.{extension}"
+
+
+def variant_key(key: str, variant: str) -> str:
+    """Key of a derived image stored next to the original: <sha>_<variant>.<ext>"""
+    stem, _, extension = key.rpartition(".")
+    return f"{stem}_{variant}.{extension}"
+
+
+class StorageBackend(ABC):
+    """
+    Object storage used for report photos and profile pictures.
+    Keys are relative paths including the file extension.
+    """
+
+    name: str = "storage"
+
+    @abstractmethod
+    async def put(self, key: str, content: bytes) -> Dict[str, Any]:
+        """Store content under key; returns at least {"key", "url"}. Raises on failure."""
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[Dict[str, Any]]:
+        """{"key", "bytes"} of the object under key, or None if it does not exist"""
+
+    async def exists(self, key: str) -> bool:
+        """Whether an object is stored under key"""
+        return await self.stat(key) is not None
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Delete the object under key; True if something was deleted"""
+
+    @abstractmethod
+    def list_keys(self, prefix: str, page_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Async iterator over pages of stored objects whose key starts with prefix.
+        Each object is {"key", "bytes", "created_at"} (timezone-aware datetime).
+        """
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        """Delete several objects; returns how many were deleted"""
+        semaphore = asyncio.Semaphore(DELETE_CONCURRENCY)
+
+        async def delete(key):
+            async with semaphore:
+                return await self.delete(key)
+
+        results = await asyncio.gather(*(delete(key) for key in keys))
+        return sum(1 for deleted in results if deleted)
+
+    def url(self, key: str) -> str:
+        """Public URL of the object under key"""
+
+    @abstractmethod
+    def key_from_url(self, url: str) -> Optional[str]:
+        """Inverse of url(); None for URLs that don't belong to this backend"""
+
+    @abstractmethod
+    def upload_ticket(self, key: str, expires_in: int, max_bytes: int) -> Dict[str, Any]:
+        """
+        Signed instructions that let a client upload one object directly to
+        storage under key, valid for expires_in seconds
+        """
+
+    async def fetch(self, url: str) -> bytes:
+        """Download a delivery URL of this backend (original or variant)"""
+        def download():
+            with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT_SECONDS) as response:
+                return response.read()
+
+        return await asyncio.to_thread(download)
+
+    def transformed_url(self, key: str, width: int = None, height: int = None) -> str:
+        """Resized delivery URL; backends without on-the-fly transforms return the original"""
+        return self.url(key)
+
+    def variant_url(self, key: str, dimension: int) -> str:
+        """URL of key scaled to fit dimension x dimension (see preprocess.VARIANT_DIMENSIONS)"""
+        return self.url(key)
+
+    async def put_if_absent(self, key: str, content: bytes) -> Dict[str, Any]:
+        """
+        Upload only when the key is not stored yet.
+        The result's "created" flag tells whether this call uploaded the object.
+        """
+        if await self.exists(key):
+            return {"key": key, "url": self.url(key), "created": False}
+        result = await self.put(key, content)
+        return {**result, "created": True}
@@ -0,0 +1,109 @@
+# backend/services/storage/direct_upload.py
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from decouple import config
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+import models
+from services.images.ingest import MAX_REPORT_PHOTO_SIZE
+from services.storage.service import get_storage
+
+PHOTO_TYPES = ("top", "far", "close")
+DIRECT_UPLOAD_NAMESPACE = "direct_uploads"
+UPLOAD_TICKET_TTL_SECONDS = config('UPLOAD_TICKET_TTL_SECONDS', default=15 * 60, cast=int)
+# A pending submission outlives its tickets: slow uploads ask for new tickets
+# (renew_upload_tickets) instead of starting over
+PENDING_SUBMISSION_TTL_SECONDS = config('PENDING_SUBMISSION_TTL_SECONDS', default=24 * 3600, cast=int)
+
+
+class DirectUploadService:
+    """
+    Two-phase report submission: issue signed per-photo upload tickets, let
+    the client upload straight to storage, then finalize once the objects exist.
+    """
+
+    @staticmethod
+    def _tickets(pending_id: str, keys: Dict[str, str], session_expires_at: datetime) -> Dict[str, Any]:
+        storage = get_storage()
+        return {
+            "pending_id": pending_id,
+            "expires_at": (datetime.now(timezone.utc) + timedelta(seconds=UPLOAD_TICKET_TTL_SECONDS)).isoformat(),
+            "session_expires_at": session_expires_at.isoformat(),
+            "max_bytes": MAX_REPORT_PHOTO_SIZE,
+            "tickets": {
+                photo_type: {
+                    "key": key,
+                    **storage.upload_ticket(key, UPLOAD_TICKET_TTL_SECONDS, MAX_REPORT_PHOTO_SIZE)
+                }
+                for photo_type, key in keys.items()
+            }
+        }
+
+    @staticmethod
+    def create_pending_submission(db: Session, user_id: int) -> Dict[str, Any]:
+        """Create a pending case and one upload ticket per photo type"""
+        pending_id = str(uuid.uuid4())
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=PENDING_SUBMISSION_TTL_SECONDS)
+        keys = {photo_type: f"{DIRECT_UPLOAD_NAMESPACE}/{pending_id}/{photo_type}" for photo_type in PHOTO_TYPES}
+
+        db.add(models.PendingSubmission(id=pending_id, user_id=user_id, keys=keys, expires_at=expires_at))
+        db.commit()
+
+        return DirectUploadService._tickets(pending_id, keys, expires_at)
+
+    @staticmethod
+    def renew_upload_tickets(db: Session, user_id: int, pending_id: str) -> Dict[str, Any]:
+        """Fresh upload tickets for an open pending submission whose tickets expired"""
+        pending = DirectUploadService.get_open_submission(db, user_id, pending_id)
+        tickets = DirectUploadService._tickets(pending.id, pending.keys, pending.expires_at)
+        db.commit()  # release the row lock, nothing changed
+        return tickets
+
+    @staticmethod
+    def get_open_submission(db: Session, user_id: int, pending_id: str) -> models.PendingSubmission:
+        """The caller's pending submission, if it can still be finalized"""
+        pending = (
+            db.query(models.PendingSubmission)
+            .filter(models.PendingSubmission.id == pending_id, models.PendingSubmission.user_id == user_id)
+            .with_for_update()
+            .first()
+        )
+        if pending is None:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        if pending.case_id is not None:
+            raise HTTPException(
+                status_code=409,
+                detail={"error": "Upload session already finalized", "case_id": pending.case_id}
+            )
+        if pending.expires_at < datetime.now(timezone.utc):
+            raise HTTPException(status_code=410, detail="Upload session expired, start a new submission")
+        return pending
+
+    @staticmethod
+    async def verify_uploads(pending: models.PendingSubmission) -> Dict[str, str]:
+        """
+        Check that every photo was uploaded and is within the size limit.
+        Returns the public URL of each photo.
+        """
+        storage = get_storage()
+        stats = await asyncio.gather(*(storage.stat(pending.keys[t]) for t in PHOTO_TYPES))
+
+        missing = [t for t, stat in zip(PHOTO_TYPES, stats) if stat is None]
+        if missing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Photos not uploaded yet: {', '.join(missing)}"
+            )
+        too_large = [t for t, stat in zip(PHOTO_TYPES, stats) if (stat.get("bytes") or 0) > MAX_REPORT_PHOTO_SIZE]
+        if too_large:
+            await asyncio.gather(*(storage.delete(pending.keys[t]) for t in too_large))
+            raise HTTPException(
+                status_code=413,
+                detail=f"Photos too large: {', '.join(too_large)}. Max: {MAX_REPORT_PHOTO_SIZE // (1024 * 1024)}MB"
+            )
+
+        return {t: storage.url(pending.keys[t]) for t in PHOTO_TYPES}
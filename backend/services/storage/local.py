@@ -0,0 +1,167 @@
+# backend/services/storage/local.py
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from jose import JWTError, jwt
+
+from services.auth.security import SECRET_KEY, ALGORITHM
+from services.storage.base import StorageBackend
+
+UPLOAD_TOKEN_TYPE = "storage_upload"
+
+
+class LocalStorage(StorageBackend):
+    """
+    Stores objects as files under a local directory, served by FastAPI
+    (see main.py). Zero network calls, for development and load testing.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str, base_url: str, upload_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+        self.upload_url = upload_url.rstrip("/")
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def _write(self, key: str, content: bytes) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so readers never see a partial object
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _delete(self, key: str) -> bool:
+        try:
+            os.remove(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def put(self, key: str, content: bytes) -> Dict[str, Any]:
+        await asyncio.to_thread(self._write, key, content)
+        return {"key": key, "url": self.url(key), "bytes": len(content)}
+
+    async def stat(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return {"key": key, "bytes": os.path.getsize(self.path(key))}
+        except FileNotFoundError:
+            return None
+
+    async def delete(self, key: str) -> bool:
+        return await asyncio.to_thread(self._delete, key)
+
+    def _list(self, prefix: str) -> List[Dict[str, Any]]:
+        # Prefixes match whole keys ("pothole_reports/a" finds "pothole_reports/ab/...");
+        # only the directory containing the prefix is walked
+        directory = self.path(prefix.rpartition("/")[0]) if "/" in prefix else self.root
+        objects = []
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    info = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                objects.append({
+                    "key": key,
+                    "bytes": info.st_size,
+                    "created_at": datetime.fromtimestamp(info.st_mtime, timezone.utc)
+                })
+        objects.sort(key=lambda obj: obj["key"])
+        return objects
+
+    async def list_keys(self, prefix: str, page_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+        objects = await asyncio.to_thread(self._list, prefix)
+        for start in range(0, len(objects), page_size):
+            yield objects[start:start + page_size]
+
+    def _read(self, key: str) -> bytes:
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    async def fetch(self, url: str) -> bytes:
+        # Our own URLs are read straight from disk instead of over HTTP
+        key = self.key_from_url(url)
+        if key is None:
+            return await super().fetch(url)
+        return await asyncio.to_thread(self._read, key)
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        prefix = f"{self.base_url}/"
+        return url[len(prefix):] if url and url.startswith(prefix) else None
+
+    # ---------- Direct uploads (stand-in for signed storage uploads) ----------
+
+    def upload_ticket(self, key: str, expires_in: int, max_bytes: int) -> Dict[str, Any]:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+        token = jwt.encode(
+            {"typ": UPLOAD_TOKEN_TYPE, "key": key, "max_bytes": max_bytes, "exp": expires_at},
+            SECRET_KEY,
+            algorithm=ALGORITHM
+        )
+        return {
+            "method": "PUT",
+            "url": f"{self.upload_url}/{token}",
+            "resumable": True,
+            "protocol": "PUT chunks with 'Content-Range: bytes start-end/total'; HEAD returns Upload-Offset to resume"
+        }
+
+    def verify_upload_token(self, token: str) -> Dict[str, Any]:
+        """Claims of a valid upload token; raises ValueError otherwise"""
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError as e:
+            raise ValueError(str(e))
+        if claims.get("typ") != UPLOAD_TOKEN_TYPE or not claims.get("key"):
+            raise ValueError("Not an upload token")
+        return claims
+
+    def partial_path(self, key: str) -> str:
+        return self.path(key) + ".upload"
+
+    def uploaded_offset(self, key: str) -> int:
+        """Bytes received so far for an upload in progress"""
+        try:
+            return os.path.getsize(self.partial_path(key))
+        except FileNotFoundError:
+            return 0
+
+    def write_chunk(self, key: str, offset: int, chunk: bytes) -> int:
+        """Write a chunk at offset into the partial upload; returns the new offset"""
+        path = self.partial_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.seek(offset)
+            f.write(chunk)
+            return f.tell()
+
+    def discard_partial(self, key: str) -> None:
+        try:
+            os.remove(self.partial_path(key))
+        except FileNotFoundError:
+            pass
+
+    def complete_upload(self, key: str) -> None:
+        os.replace(self.partial_path(key), self.path(key))
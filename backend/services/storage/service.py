@@ -0,0 +1,222 @@
+# backend/services/storage/service.py
+import asyncio
+from functools import lru_cache
+from decouple import config
+from typing import Dict, Any, List, Optional
+
+from services.images.preprocess import ProcessedImage, VARIANT_DIMENSIONS
+from services.storage.base import StorageBackend, content_key, variant_key
+
+# "cloudinary" (default) or "local"
+STORAGE_BACKEND = config('STORAGE_BACKEND', default='cloudinary')
+MEDIA_ROOT = config('MEDIA_ROOT', default='media')
+MEDIA_URL_PATH = "/media"
+MEDIA_BASE_URL = config('MEDIA_BASE_URL', default=f"http://localhost:8000{MEDIA_URL_PATH}")
+# Local stand-in for direct-to-storage uploads (routers/storage.py)
+UPLOAD_URL_PATH = "/storage/uploads"
+UPLOAD_BASE_URL = config('UPLOAD_BASE_URL', default=f"http://localhost:8000{UPLOAD_URL_PATH}")
+
+POTHOLE_NAMESPACE = "pothole_reports"
+PROFILE_NAMESPACE = "profile_pictures"
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """The configured storage backend (created on first use)"""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "local":
+            from services.storage.local import LocalStorage
+            _storage = LocalStorage(root=MEDIA_ROOT, base_url=MEDIA_BASE_URL, upload_url=UPLOAD_BASE_URL)
+        elif STORAGE_BACKEND == "cloudinary":
+            from services.cloudinary.service import CloudinaryStorage
+            _storage = CloudinaryStorage()
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    return _storage
+
+
+class StorageService:
+    """Report photo and profile picture storage on top of the configured backend"""
+
+    @staticmethod
+    async def _store_processed(image: ProcessedImage, namespace: str) -> Dict[str, Any]:
+        """
+        Store an image and its variants under content-addressed keys.
+        Objects that already exist (e.g. a retried submission) are not uploaded again.
+        If any of them fails, whatever this call created is deleted again.
+        """
+        storage = get_storage()
+        key = content_key(namespace, image.content, image.format)
+        objects = {"full": (key, image.content)}
+        for name, content in image.variants.items():
+            objects[name] = (variant_key(key, name), content)
+
+        results = await asyncio.gather(
+            *(storage.put_if_absent(k, content) for k, content in objects.values()),
+            return_exceptions=True
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            await StorageService._delete_created([r for r in results if not isinstance(r, BaseException)])
+            raise errors[0]
+
+        stored = dict(zip(objects.keys(), results))
+        return {
+            "success": True,
+            "key": key,
+            "secure_url": stored["full"]["url"],
+            "variants": {name: result["url"] for name, result in stored.items()},
+            "deduplicated": not stored["full"]["created"],
+            "created": [r for r in results if r["created"]],
+        }
+
+    @staticmethod
+    async def _delete_created(results: List[Dict[str, Any]]) -> None:
+        """Delete only objects this request uploaded; deduplicated ones may be shared"""
+        storage = get_storage()
+        await asyncio.gather(
+            *(storage.delete(r["key"]) for r in results if r.get("created")),
+            return_exceptions=True
+        )
+
+    @staticmethod
+    async def upload_profile_image(image: ProcessedImage) -> Dict[str, Any]:
+        """Upload a preprocessed user profile picture (and its variants)"""
+        try:
+            return await StorageService._store_processed(image, PROFILE_NAMESPACE)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    async def upload_pothole_image(image: ProcessedImage, image_type: str) -> Dict[str, Any]:
+        """
+        Upload a preprocessed pothole image (and its variants)
+
+        Args:
+            image: Output of services.images.preprocess (EXIF stripped, resized)
+            image_type: Type of image ('top', 'far', 'close')
+
+        Returns:
+            Dict containing upload result with key and secure_url
+        """
+        try:
+            result = await StorageService._store_processed(image, POTHOLE_NAMESPACE)
+            return {
+                **result,
+                "image_type": image_type,
+                "width": image.width,
+                "height": image.height,
+                "format": image.format,
+                "bytes": len(image.content)
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    async def upload_pothole_images(images: Dict[str, ProcessedImage]) -> Dict[str, Any]:
+        """
+        Upload all images of a case concurrently
+
+        Args:
+            images: Mapping of image type ('top', 'far', 'close') to processed image
+
+        Returns:
+            Dict with per-type upload results. If any upload fails, the remaining
+            uploads are cancelled and the objects this request created are deleted.
+        """
+        tasks = {
+            image_type: asyncio.create_task(StorageService.upload_pothole_image(image, image_type))
+            for image_type, image in images.items()
+        }
+
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = set(tasks.values())
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for image_type, task in tasks.items():
+                    if task in done:
+                        results[image_type] = task.result()
+                failed = [t for t, r in results.items() if not r["success"]]
+                if failed:
+                    await StorageService._abort_uploads(tasks, results)
+                    return {
+                        "success": False,
+                        "failed_type": failed[0],
+                        "error": results[failed[0]].get("error")
+                    }
+        except BaseException:
+            # Request cancelled (client went away) or unexpected error
+            await StorageService._abort_uploads(tasks, results)
+            raise
+
+        return {"success": True, "images": results}
+
+    @staticmethod
+    async def _abort_uploads(tasks: Dict[str, asyncio.Task], results: Dict[str, Dict[str, Any]]) -> None:
+        """Cancel unfinished uploads and delete the objects that already made it to storage"""
+        for task in tasks.values():
+            task.cancel()
+        # Cancelled uploads clean up after themselves
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        await StorageService._delete_created([
+            created
+            for result in results.values()
+            if result.get("success")
+            for created in result["created"]
+        ])
+
+    @staticmethod
+    async def delete_image(key: str) -> Dict[str, Any]:
+        """Delete a stored object by key"""
+        try:
+            deleted = await get_storage().delete(key)
+            return {"success": True, "result": "ok" if deleted else "not found"}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    @staticmethod
+    async def delete_by_url(url: str, with_variants: bool = True) -> Dict[str, Any]:
+        """Delete a stored object (and its variants) given the URL saved in the database"""
+        key = get_storage().key_from_url(url)
+        if key is None:
+            return {"success": False, "error": f"Not a {get_storage().name} URL: {url}"}
+        if with_variants:
+            await asyncio.gather(*(StorageService.delete_image(variant_key(key, name)) for name in VARIANT_DIMENSIONS))
+        return await StorageService.delete_image(key)
+
+    @staticmethod
+    async def fetch_image(url: str) -> bytes:
+        """Download a stored photo (or one of its variants) by URL"""
+        return await get_storage().fetch(url)
+
+    @staticmethod
+    def get_optimized_url(key: str, width: int = None, height: int = None) -> str:
+        """Get optimized image URL with transformations (memoized)"""
+        return _transformed_url(key, width, height)
+
+    @staticmethod
+    def derived_variants(url: str) -> Dict[str, str]:
+        """
+        Variant URLs for a photo stored without eager variants (legacy rows,
+        direct uploads). Backends without on-the-fly resizing return the original.
+        """
+        return dict(_derived_variants(url))
+
+
+# URL building is pure string work but shows up on every list item; cache it
+@lru_cache(maxsize=8192)
+def _transformed_url(key: str, width: Optional[int], height: Optional[int]) -> str:
+    return get_storage().transformed_url(key, width=width, height=height)
+
+
+@lru_cache(maxsize=8192)
+def _derived_variants(url: str) -> Dict[str, str]:
+    storage = get_storage()
+    key = storage.key_from_url(url)
+    variants = {"full": url}
+    for name, dimension in VARIANT_DIMENSIONS.items():
+        variants[name] = storage.variant_url(key, dimension) if key else url
+    return variants
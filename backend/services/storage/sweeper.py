@@ -0,0 +1,156 @@
+"""
+Remove stored report photos that no pothole report references any more
+(failed submissions, abandoned direct uploads, partial local uploads).
+
+Storage is listed page by page, and each page's candidates are looked up in
+the photo columns of pothole_reports in one indexed query (see
+photo_identity_sql), so memory stays bounded by a page however many reports
+there are. Only objects older than the grace period are candidates, so
+uploads whose report is still being saved are never touched.
+
+Usage (from backend/):
+    python -m services.storage.sweeper [--grace-hours 24] [--dry-run]
+"""
+import argparse
+import asyncio
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Set
+
+from decouple import config
+from sqlalchemy import text
+
+import models
+from services.database.connect import SessionLocal, engine
+from services.images.preprocess import VARIANT_DIMENSIONS
+from services.storage.direct_upload import DIRECT_UPLOAD_NAMESPACE
+from services.storage.service import POTHOLE_NAMESPACE, get_storage
+
+SWEEP_PREFIXES = (f"{POTHOLE_NAMESPACE}/", f"{DIRECT_UPLOAD_NAMESPACE}/")
+SWEEP_GRACE_HOURS = config('ORPHAN_SWEEP_GRACE_HOURS', default=24, cast=int)
+SWEEP_INTERVAL_HOURS = config('ORPHAN_SWEEP_INTERVAL_HOURS', default=6, cast=int)  # 0 disables the loop
+SWEEP_CONCURRENCY = config('ORPHAN_SWEEP_CONCURRENCY', default=4, cast=int)
+
+# Only one uvicorn worker runs the periodic sweep (pg_try_advisory_lock key)
+SWEEP_LOCK_ID = 0x5243_0008
+
+_VARIANT_SUFFIX = re.compile(r"_(?:%s)$" % "|".join(map(re.escape, VARIANT_DIMENSIONS)))
+
+
+def _identity(key: str) -> str:
+    """
+    Compare keys without extension and variant suffix: variants belong to
+    their original, and Cloudinary lists direct uploads with the format
+    appended while the report stores the extension-less key.
+    """
+    stem, dot, extension = key.rpartition(".")
+    if dot and "/" not in extension:
+        key = stem
+    return _VARIANT_SUFFIX.sub("", key)
+
+
+def photo_identity_sql(column: str) -> str:
+    """
+    _identity() of the key in a stored photo URL, in SQL: from the namespace
+    to the end of the path, without extension (photo columns hold originals,
+    never variants). The expression indexes in services/database/migrate.py
+    are built on exactly this text.
+    """
+    namespaces = "|".join(prefix.rstrip("/") for prefix in SWEEP_PREFIXES)
+    return rf"regexp_replace(substring({column} from '((?:{namespaces})/[^?#]*)'), '\.[^./]*$', '')"
+
+
+_REFERENCED = text(f"""
+    SELECT identity FROM unnest(CAST(:identities AS text[])) AS identity
+    WHERE EXISTS (SELECT 1 FROM pothole_reports WHERE {photo_identity_sql("photo_top")} = identity)
+       OR EXISTS (SELECT 1 FROM pothole_reports WHERE {photo_identity_sql("photo_far")} = identity)
+       OR EXISTS (SELECT 1 FROM pothole_reports WHERE {photo_identity_sql("photo_close")} = identity)
+""")
+
+
+def _referenced(identities: List[str]) -> Set[str]:
+    """The identities some report's photos point at"""
+    db = SessionLocal()
+    try:
+        return set(db.execute(_REFERENCED, {"identities": identities}).scalars())
+    finally:
+        db.close()
+
+
+def _delete_expired_pending(cutoff: datetime) -> int:
+    """Drop pending submissions that expired unfinalized before cutoff"""
+    db = SessionLocal()
+    try:
+        deleted = (
+            db.query(models.PendingSubmission)
+            .filter(models.PendingSubmission.case_id.is_(None), models.PendingSubmission.expires_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+
+async def sweep_orphans(grace: timedelta = timedelta(hours=SWEEP_GRACE_HOURS), dry_run: bool = False) -> Dict[str, int]:
+    """One full pass over SWEEP_PREFIXES; returns counts of scanned/orphaned/deleted objects"""
+    storage = get_storage()
+    cutoff = datetime.now(timezone.utc) - grace
+    semaphore = asyncio.Semaphore(SWEEP_CONCURRENCY)
+    stats = {"scanned": 0, "orphaned": 0, "deleted": 0, "pending_deleted": 0}
+
+    async def delete_batch(keys):
+        async with semaphore:
+            return await storage.delete_many(keys)
+
+    deletions = []
+    for prefix in SWEEP_PREFIXES:
+        async for page in storage.list_keys(prefix):
+            stats["scanned"] += len(page)
+            candidates = [obj["key"] for obj in page if obj["created_at"] < cutoff]
+            if not candidates:
+                continue
+            # Checked against the reports as they are now, so a retried submission
+            # that reused an existing content-addressed object keeps it
+            referenced = await asyncio.to_thread(_referenced, sorted({_identity(key) for key in candidates}))
+            orphans = [key for key in candidates if _identity(key) not in referenced]
+            stats["orphaned"] += len(orphans)
+            if orphans and not dry_run:
+                deletions.append(asyncio.create_task(delete_batch(orphans)))
+
+    if deletions:
+        stats["deleted"] = sum(await asyncio.gather(*deletions))
+    if not dry_run:
+        stats["pending_deleted"] = await asyncio.to_thread(_delete_expired_pending, cutoff)
+    return stats
+
+
+async def run_periodic_sweep():
+    """Background loop started from main.py; a no-op in workers that don't hold the lock"""
+    if SWEEP_INTERVAL_HOURS <= 0:
+        return
+    # The lock is held by the session, not a transaction: autocommit keeps this
+    # connection from sitting idle in transaction between sweeps
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": SWEEP_LOCK_ID}).scalar():
+            return
+        try:
+            while True:
+                try:
+                    stats = await sweep_orphans()
+                    print(f"🧹 Orphan sweep: {stats}")
+                except Exception as e:
+                    print(f"❌ Orphan sweep failed: {e}")
+                await asyncio.sleep(SWEEP_INTERVAL_HOURS * 3600)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": SWEEP_LOCK_ID})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete stored photos no report references")
+    parser.add_argument("--grace-hours", type=int, default=SWEEP_GRACE_HOURS)
+    parser.add_argument("--dry-run", action="store_true", help="Only count orphans")
+    args = parser.parse_args()
+
+    result = asyncio.run(sweep_orphans(timedelta(hours=args.grace_hours), dry_run=args.dry_run))
+    print(f"✅ Orphan sweep finished: {result}")
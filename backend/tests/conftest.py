@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+
+# services.ai builds the Gemini client at import; the tests never call it
+os.environ.setdefault("GEMINI_API_KEY", "test")
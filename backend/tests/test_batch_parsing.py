@@ -0,0 +1,51 @@
+import json
+
+from services.ai.pothole_analyzer import pothole_analyzer
+
+
+def _case(number=None, depth_cm=10.0):
+    case = {
+        "scores": {"size_vs_road_width": 5, "depth_texture": 5, "cracks_edges": 5, "surface_water": 5},
+        "measurements": {"length_cm": 40, "width_cm": 30, "depth_cm": depth_cm},
+        "confidence": 0.8,
+        "observations": {},
+    }
+    if number is not None:
+        case["case"] = number
+    return case
+
+
+def _parse(answer, case_count):
+    return pothole_analyzer._parse_batch_response(answer if isinstance(answer, str) else json.dumps(answer), case_count)
+
+
+def test_cases_are_matched_by_number_not_position():
+    results = _parse([_case(2, depth_cm=30.0), _case(1, depth_cm=5.0)], 2)
+    assert [r["measurements"]["depth_cm"] for r in results] == [5.0, 30.0]
+    assert results[1]["severity"] == "High"  # depth rule applied like single analyses
+
+
+def test_position_is_used_when_the_case_number_is_missing():
+    results = _parse([_case(depth_cm=5.0), _case(depth_cm=15.0)], 2)
+    assert [r["measurements"]["depth_cm"] for r in results] == [5.0, 15.0]
+
+
+def test_code_fence_and_cases_wrapper_are_accepted():
+    answer = "```json\n" + json.dumps({"cases": [_case(1), _case(2)]}) + "\n```"
+    assert all(result is not None for result in _parse(answer, 2))
+
+
+def test_missing_duplicated_and_invalid_cases_are_none():
+    no_depth = _case(3)
+    del no_depth["measurements"]["depth_cm"]
+    answer = [_case(1), _case(2), _case(2), no_depth, _case(7), "not an object"]
+    results = _parse(answer, 4)
+    assert results[0] is not None
+    assert results[1] is None  # answered twice
+    assert results[2] is None  # no depth estimate
+    assert results[3] is None  # never answered
+
+
+def test_unparseable_answer_fails_every_case():
+    assert _parse("The model is sorry", 3) == [None, None, None]
+    assert _parse({"analysis": "not a list"}, 2) == [None, None]
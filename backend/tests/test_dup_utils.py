@@ -0,0 +1,51 @@
+import random
+
+from services.helpers.dup_utils import (
+    GRID_CELL_DEGREES, GRID_COLUMNS, HAVERSINE_TOLERANCE, calculate_distance, grid_cell,
+    haversine_distances, neighbor_cells,
+)
+
+# Kota Kinabalu
+LATITUDE, LONGITUDE = 5.9804, 116.0735
+
+
+def test_grid_cell_is_row_major_from_the_south_west_corner():
+    assert grid_cell(-90, -180) == 0
+    assert grid_cell(-90, -180 + GRID_CELL_DEGREES) == 1
+    assert grid_cell(-90 + GRID_CELL_DEGREES, -180) == GRID_COLUMNS
+
+
+def test_grid_cell_decodes_to_the_cell_containing_the_point():
+    row, column = divmod(grid_cell(LATITUDE, LONGITUDE), GRID_COLUMNS)
+    assert row * GRID_CELL_DEGREES - 90 <= LATITUDE < (row + 1) * GRID_CELL_DEGREES - 90
+    assert column * GRID_CELL_DEGREES - 180 <= LONGITUDE < (column + 1) * GRID_CELL_DEGREES - 180
+
+
+def test_neighbor_cells_of_100_m_are_the_surrounding_3x3():
+    cells = neighbor_cells(LATITUDE, LONGITUDE, 100)
+    row, column = divmod(grid_cell(LATITUDE, LONGITUDE), GRID_COLUMNS)
+    assert grid_cell(LATITUDE, LONGITUDE) in cells
+    assert set(cells) <= {(row + dr) * GRID_COLUMNS + column + dc for dr in (-1, 0, 1) for dc in (-1, 0, 1)}
+
+
+def test_neighbor_cells_cover_every_point_within_the_radius():
+    rng = random.Random(0)
+    for _ in range(200):
+        latitude = LATITUDE + rng.uniform(-0.01, 0.01)
+        longitude = LONGITUDE + rng.uniform(-0.01, 0.01)
+        cells = set(neighbor_cells(latitude, longitude, 100))
+        others = [(latitude + rng.uniform(-0.001, 0.001), longitude + rng.uniform(-0.001, 0.001)) for _ in range(50)]
+        distances = haversine_distances(latitude, longitude, *zip(*others))
+        for (lat, lon), distance in zip(others, distances):
+            if distance <= 100:
+                assert grid_cell(lat, lon) in cells
+
+
+def test_haversine_stays_within_tolerance_of_the_geodesic():
+    # Sabah spans roughly 4-7.5°N; duplicate radii are tens of metres to a few km
+    for latitude, longitude in ((LATITUDE, LONGITUDE), (4.25, 117.9), (7.0, 116.8)):
+        for offset in (0.0005, 0.01, 0.05):
+            for d_lat, d_lon in ((offset, 0), (0, offset), (offset, offset)):  # N-S, E-W, diagonal
+                expected = calculate_distance(latitude, longitude, latitude + d_lat, longitude + d_lon)
+                actual = haversine_distances(latitude, longitude, [latitude + d_lat], [longitude + d_lon])[0]
+                assert abs(actual - expected) / expected <= HAVERSINE_TOLERANCE
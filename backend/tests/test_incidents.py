@@ -0,0 +1,27 @@
+from services.helpers.incidents import IncidentService, community_multiplier
+import models
+
+
+class RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, *args):
+        self.statements.append(statement)
+
+
+def test_report_updates_keep_last_date_status_update():
+    db = RecordingSession()
+    reports = models.PotholeReport.__table__.c
+    IncidentService._update_reports(db, reports.incident_id == 7, {"unique_users_count": 3})
+    compiled = str(db.statements[0].compile())
+    assert "unique_users_count=:unique_users_count" in compiled
+    assert "last_date_status_update=pothole_reports.last_date_status_update" in compiled
+
+
+def test_community_multiplier_tiers():
+    assert community_multiplier(1, 1) == 1.0
+    assert community_multiplier(2, 1) == 1.5
+    assert community_multiplier(5, 3) == 2.0
+    assert community_multiplier(8, 4) == 2.0
+    assert community_multiplier(8, 5) == 3.0
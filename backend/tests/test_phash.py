@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from services.images.phash import PhotoHashIndex, hamming, to_signed, to_unsigned
+
+
+class FakeSession:
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def slow_index(monkeypatch):
+    """An index whose full build takes a while and counts how often it runs"""
+    from services.database import connect
+
+    monkeypatch.setattr(connect, "SessionLocal", FakeSession)
+    index = PhotoHashIndex()
+    index.builds = 0
+
+    def load_from_db(db):
+        index.builds += 1
+        time.sleep(0.2)
+        index.loaded = True
+
+    index.load_from_db = load_from_db
+    return index
+
+
+def test_cold_index_skips_matching_and_builds_once_in_the_background(slow_index):
+    assert slow_index.sync(FakeSession()) is False
+    assert slow_index.sync(FakeSession()) is False  # build already running
+    deadline = time.monotonic() + 5
+    while not slow_index.loaded and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert slow_index.loaded
+    assert slow_index.builds == 1
+
+
+def test_concurrent_loads_build_once(slow_index):
+    threads = [threading.Thread(target=slow_index.load) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    slow_index.load()
+    assert slow_index.builds == 1
+
+
+def test_query_finds_hashes_within_the_distance():
+    index = PhotoHashIndex()
+    base = 0x0123456789ABCDEF
+    index.add_report("A", {"top": to_signed(base), "far": None, "close": None})
+    index.add_report("B", {"top": to_signed(base ^ 0b111), "far": None, "close": None})
+    index.add_report("C", {"top": to_signed(~base & (1 << 64) - 1), "far": None, "close": None})
+
+    matches = index.query(to_signed(base), max_distance=6)
+    assert [(m["case_id"], m["distance"]) for m in matches] == [("A", 0), ("B", 3)]
+
+
+def test_signed_storage_round_trips():
+    for value in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+        assert to_unsigned(to_signed(value)) == value
+    assert hamming(0b1010, 0b0110) == 2
+
+
+def test_refresh_follows_when_hashes_were_written_not_when_reports_were_created():
+    # The backfill hashes old reports; keying on date_created would never see them
+    from datetime import datetime, timezone
+
+    from sqlalchemy.orm import Session
+
+    sql = str(PhotoHashIndex()._load_rows(Session(), since=datetime.now(timezone.utc)))
+    assert "pothole_reports.phash_at >" in sql
+    assert "date_created >" not in sql
@@ -0,0 +1,120 @@
+import random
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from services.db import recompute_community as recompute
+from services.helpers.dup_utils import grid_cell, haversine_distances
+from services.helpers.incidents import community_multiplier
+
+RADIUS, DAYS = 100, 30
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def filter(self, *criteria):
+        return self
+
+    def order_by(self, *columns):
+        return self
+
+    def execution_options(self, **options):
+        return self
+
+    def count(self):
+        return 0  # every report has a grid cell
+
+    def __iter__(self):
+        return iter(sorted(self.rows, key=lambda row: (row.grid_cell, row.date_created)))
+
+
+class FakeSession:
+    """Reader (query) and writer (execute/commit) for one recompute run"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.written = {}
+
+    def query(self, *columns):
+        return FakeQuery(self.rows)
+
+    def execute(self, statement, params):
+        for mapping in params:
+            self.written[mapping["report_id"]] = mapping
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _reports(count=400, users=25, seed=1):
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    reports = []
+    for n in range(count):
+        # A few blocks of streets spanning several grid rows and columns, with clusters
+        latitude = 5.98 + rng.choice([0, 0.0015, 0.004]) + rng.uniform(-0.0008, 0.0008)
+        longitude = 116.07 + rng.choice([0, 0.002, 0.0045]) + rng.uniform(-0.0008, 0.0008)
+        reports.append(SimpleNamespace(
+            case_id=f"CASE{n:04d}",
+            user_id=rng.randrange(users),
+            latitude=latitude,
+            longitude=longitude,
+            date_created=start + timedelta(hours=rng.uniform(0, 24 * 90)),
+            grid_cell=grid_cell(latitude, longitude),
+        ))
+    return reports
+
+
+def _brute_force(reports):
+    """The submit-time rule, report by report"""
+    latitudes = np.array([r.latitude for r in reports])
+    longitudes = np.array([r.longitude for r in reports])
+    expected = {}
+    for report in reports:
+        distances = haversine_distances(report.latitude, report.longitude, latitudes, longitudes)
+        similar = [
+            other for other, distance in zip(reports, distances)
+            if distance <= RADIUS
+            and other.user_id != report.user_id
+            and report.date_created - timedelta(days=DAYS) <= other.date_created <= report.date_created
+        ]
+        unique_users = len({other.user_id for other in similar}) + 1
+        expected[report.case_id] = {
+            "similar_reports_count": len(similar),
+            "unique_users_count": unique_users,
+            "community_multiplier": community_multiplier(len(similar) + 1, unique_users),
+        }
+    return expected
+
+
+@pytest.mark.parametrize("batch_size", [7, 5000])
+def test_sweep_matches_brute_force(monkeypatch, batch_size):
+    reports = _reports()
+    session = FakeSession(reports)
+    monkeypatch.setattr(recompute, "SessionLocal", lambda: session)
+
+    updated = recompute.recompute_community(radius=RADIUS, days=DAYS, batch_size=batch_size)
+
+    assert updated == len(reports)
+    written = {
+        case_id: {key: mapping[key] for key in ("similar_reports_count", "unique_users_count", "community_multiplier")}
+        for case_id, mapping in session.written.items()
+    }
+    assert written == _brute_force(reports)
+
+
+def test_radius_beyond_one_grid_cell_is_rejected():
+    with pytest.raises(ValueError):
+        recompute.recompute_community(radius=recompute.MAX_RADIUS_METERS + 1)
+
+
+def test_writes_keep_last_date_status_update():
+    compiled = str(recompute._UPDATE.compile())
+    assert "last_date_status_update=pothole_reports.last_date_status_update" in compiled
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from services.ai import scheduler
+from services.ai.scheduler import CircuitBreaker, is_transient
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler.time, "monotonic", clock)
+    return clock
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=60)
+    for _ in range(2):
+        breaker.failure()
+    assert breaker.state == "closed"
+    assert breaker.before_call() is None
+
+    breaker.failure()
+    assert breaker.state == "open"
+    assert breaker.before_call() == pytest.approx(60)
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=60)
+    breaker.failure()
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    breaker.failure()
+    assert breaker.state == "closed"
+
+
+def test_one_probe_after_the_cooldown_and_success_closes(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.failure()
+    clock.now += 30
+    assert breaker.before_call() == pytest.approx(30)
+
+    clock.now += 30
+    assert breaker.before_call() is None  # the probe
+    assert breaker.state == "half_open"
+    assert breaker.before_call() == pytest.approx(60)  # everyone else keeps waiting
+
+    breaker.success()
+    assert breaker.state == "closed"
+    assert breaker.before_call() is None
+
+
+def test_failed_probe_opens_again_for_a_full_cooldown(clock):
+    breaker = CircuitBreaker(threshold=5, cooldown=60)
+    for _ in range(5):
+        breaker.failure()
+    clock.now += 60
+    assert breaker.before_call() is None
+
+    clock.now += 10
+    breaker.failure()  # a single failure is enough while probing
+    assert breaker.state == "open"
+    assert breaker.before_call() == pytest.approx(60)
+
+
+def test_a_probe_that_never_reports_back_lets_another_through(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.failure()
+    clock.now += 60
+    assert breaker.before_call() is None
+    clock.now += 60
+    assert breaker.before_call() is None
+
+
+class HTTPError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+def test_is_transient():
+    assert is_transient(asyncio.TimeoutError())
+    assert is_transient(ConnectionResetError())
+    assert is_transient(HTTPError(429))
+    assert is_transient(HTTPError(503))
+    assert not is_transient(HTTPError(400))
+    assert not is_transient(ValueError("bad JSON"))